@@ -26,11 +26,65 @@ PROVIDER_RATE_LIMITS = {
     'google_cse': 0.1,   # Very conservative, 100 queries/day limit
 }
 
+# Provider burst capacity (token bucket size)
+# Wiki APIs tolerate short bursts; Google CSE stays strict to protect the daily quota
+PROVIDER_BURST_CAPACITY = {
+    'wikipedia': max(3, 2 * PROVIDER_RATE_LIMITS['wikipedia']),
+    'wikidata': max(3, 2 * PROVIDER_RATE_LIMITS['wikidata']),
+    'duckduckgo': 1,
+    'google_cse': 1,
+}
+
 # Backoff configuration
 BACKOFF_BASE_DELAY_MINUTES = 15
 BACKOFF_MAX_DELAY_MINUTES = 60
 BACKOFF_MAX_ATTEMPTS = 5
 
+# Optional Redis for the Google CSE daily counter (e.g. redis://localhost:6379/0)
+REDIS_URL: Optional[str] = os.getenv('REDIS_URL')
+
+# Circuit breaker: after N consecutive failures (429/5xx/network) a provider is
+# skipped locally for min(MAX_OPEN, 2**failures) seconds
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_MAX_OPEN_SECONDS = 300
+
+# Cache TTL per result status (minutes); expired rows are treated as cache misses.
+# Rate-limited rows live as long as the backoff that produced them
+CACHE_TTL_MINUTES = {
+    'ok': 7 * 24 * 60,
+    'empty': 60,
+    'error': 60,
+    'ratelimited': BACKOFF_BASE_DELAY_MINUTES,
+}
+
+# Number of positive search results kept in process memory (LRU)
+RESULT_CACHE_SIZE = 4096
+
+# search_batch loads cached results for this many upcoming entities at once
+PREFETCH_WINDOW = 64
+
+# search_batch runs this many searches concurrently (per-provider pacing is
+# still enforced by the rate limiter)
+SEARCH_BATCH_WORKERS = 8
+
+# Free providers are tried in the order of their cached successes for the
+# entity type; the order is re-learned after this many provider cascades
+PROVIDER_ORDER_REFRESH_QUERIES = 1000
+
+# Negative cache: when every provider returns empty for a query, skip the
+# whole cascade for it during this many minutes
+NEGATIVE_CACHE_TTL_MINUTES = 60
+
+# Hedged requests: head-start of each free provider before the next one is
+# queried in parallel (DuckDuckGo → Wikipedia → Wikidata)
+HEDGE_DELAY_SECONDS = 0.15
+
+# Adaptive rate (AIMD): a 429 halves the provider rate (not below this
+# fraction of the configured rate); after this many successful responses
+# the rate grows back by a tenth of the configured rate
+AIMD_MIN_RATE_FRACTION = 0.125
+AIMD_INCREASE_AFTER_SUCCESSES = 50
+
 # Jitter configuration (±30%)
 JITTER_MIN = 0.7
 JITTER_MAX = 1.3
@@ -38,6 +92,9 @@ JITTER_MAX = 1.3
 # Google CSE daily quota (free tier)
 GOOGLE_CSE_DAILY_LIMIT = 100
 
+# How long a Google CSE daily usage count read from DB stays valid (seconds)
+GOOGLE_CSE_QUOTA_CACHE_SECONDS = 30
+
 # Validate configuration
 if GOOGLE_CSE_API_KEY and not GOOGLE_CSE_ID:
     print("Warning: GOOGLE_CSE_ID not set, Google CSE will not work")
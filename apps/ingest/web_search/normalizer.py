@@ -1,28 +1,35 @@
 """Query normalization for web search"""
 
 import unicodedata
-import re
+from functools import lru_cache
+from typing import Iterable, List
 
 
+@lru_cache(maxsize=65536)
 def normalize_query(s: str) -> str:
     """
     Normalize search query for consistent caching and matching
     
+    Pure function, memoized: entity rosters repeat the same names a lot.
+    
     Args:
         s: Raw query string
         
     Returns:
         Normalized query string (lowercase, NFKC, collapsed whitespace)
     """
-    # Unicode normalization (NFKC - compatibility, composed)
-    s = unicodedata.normalize("NFKC", s)
-    
-    # Strip leading/trailing whitespace
-    s = s.strip()
+    # Unicode normalization (NFKC - compatibility, composed); identity for ASCII
+    if not s.isascii():
+        s = unicodedata.normalize("NFKC", s)
     
-    # Collapse multiple whitespace into single space
-    s = re.sub(r"\s+", " ", s)
+    # Strip and collapse whitespace in one pass (split() uses the same
+    # whitespace definition as re's \s)
+    s = " ".join(s.split())
     
     # Lowercase
     return s.lower()
 
+
+def normalize_batch(queries: Iterable[str]) -> List[str]:
+    """Normalize many queries (same rules as normalize_query)"""
+    return [normalize_query(q) for q in queries]
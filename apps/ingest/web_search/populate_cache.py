@@ -93,6 +93,8 @@ def main():
                        help='Retry entities with these cached statuses (default: skip all cached)')
     parser.add_argument('--check-backoff', action='store_true',
                        help='Check backoff status of providers and exit')
+    parser.add_argument('--quiet', action='store_true',
+                       help='Do not print per-entity progress (summary only)')
     
     args = parser.parse_args()
     
@@ -127,7 +129,8 @@ def main():
         print(f"\nSkipping cache filter, will search all {len(entities)} entities")
     
     # Perform batch search
-    manager.search_batch(entities, max_searches=args.max_searches, start_from=args.start_from)
+    manager.search_batch(entities, max_searches=args.max_searches, start_from=args.start_from,
+                         quiet=args.quiet)
     
     print("\nDone!")
 
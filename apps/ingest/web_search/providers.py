@@ -1,70 +1,344 @@
 """Web search providers (Wikipedia, Wikidata, DuckDuckGo, Google CSE)"""
 
-import requests
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import httpx
 import time
-from typing import List, Dict, Optional, Any
+import orjson
+from dataclasses import dataclass
+from typing import Callable, List, Dict, Optional, Any
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
+from urllib.parse import quote
+from selectolax.parser import HTMLParser
+
+try:
+    import redis  # Optional: shared daily quota counter for Google CSE
+except ImportError:
+    redis = None
 
 from apps.ingest.web_search.config import (
     GOOGLE_CSE_API_KEY,
     GOOGLE_CSE_ID,
     PROVIDER_RATE_LIMITS,
+    PROVIDER_BURST_CAPACITY,
+    JITTER_MIN,
+    JITTER_MAX,
     BACKOFF_BASE_DELAY_MINUTES,
     BACKOFF_MAX_DELAY_MINUTES,
     BACKOFF_MAX_ATTEMPTS,
+    GOOGLE_CSE_DAILY_LIMIT,
+    GOOGLE_CSE_QUOTA_CACHE_SECONDS,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_MAX_OPEN_SECONDS,
+    REDIS_URL,
 )
 from apps.ingest.web_search.rate_limiter import RateLimiter, RateLimitError
 
+# Relevance scores by result rank (floored at 0.1)
+_RANK_SCORES = tuple(max(0.1, 1.0 - i * 0.1) for i in range(10))
+_DDG_RANK_SCORES = tuple(max(0.1, 1.0 - i * 0.15) for i in range(7))
+
+# Errors of searches refused locally (no request made, no HTTP code)
+QUOTA_EXCEEDED_ERROR = 'quota exceeded'  # Client-side quota used up
+CIRCUIT_OPEN_ERROR = 'circuit open'  # Circuit breaker skips the provider
+BACKOFF_ERROR = 'in backoff'  # Rate limiter refused the request (provider in backoff)
+
+# Placeholder for unbound SPARQL variables
+_EMPTY_BINDING = {'value': ''}
+
+# Search-match highlight markup in Wikipedia search snippets
+_WP_SEARCHMATCH_RE = re.compile(r'<span class="searchmatch">|</span>')
+
+# Wikimedia API etiquette: identify the client
+_WIKI_HEADERS = {
+    'User-Agent': 'NewsAI-Trader/1.0 (research project; +https://github.com)',
+}
+
+# Browser-like UA to avoid getting blocked by DuckDuckGo
+_DDG_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
+
+def _rank_score(scores: tuple, i: int) -> float:
+    """Look up relevance score for rank i (last entry is the floor)"""
+    return scores[i] if i < len(scores) else scores[-1]
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Retry-After header in seconds (delta-seconds form only; None if absent or a date)"""
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def make_http_client() -> httpx.Client:
+    """
+    Create persistent HTTP/2 client for search providers
+    
+    Keep-alive connections are reused across searches (no TCP+TLS handshake
+    per request) and concurrent requests to one host are multiplexed.
+    Brotli/gzip responses (SPARQL JSON compresses very well).
+    """
+    return httpx.Client(
+        http2=True,
+        headers={'Accept-Encoding': 'gzip, br'},
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+        follow_redirects=True,
+    )
+
+
+@dataclass(slots=True)
+class SearchResult:
+    """
+    Single provider search result
+    
+    Slots dataclass instead of two nested dicts per result. Supports
+    result['key'] / result.get('key') so it can be used interchangeably
+    with cached results loaded from DB (plain dicts).
+    """
+    title: str
+    url: str
+    snippet: str
+    relevance_score: float
+    fetch_timestamp: str
+    provider: str
+    extra: Dict[str, Any]
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Dict representation stored in web_search_cache.results_json"""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "snippet": self.snippet,
+            "relevance_score": self.relevance_score,
+            "fetch_timestamp": self.fetch_timestamp,
+            "source_metadata": {"provider": self.provider, **self.extra},
+        }
+    
+    def __getitem__(self, key: str) -> Any:
+        if key == "source_metadata":
+            return {"provider": self.provider, **self.extra}
+        if key in ("provider", "extra"):
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
 
 class SearchProvider:
     """Base class for search providers"""
     
-    def __init__(self, name: str, rate_limiter: RateLimiter):
+    # Default headers of provider requests (sent on top of client headers)
+    headers: Dict[str, str] = {}
+    
+    def __init__(self, name: str, rate_limiter: RateLimiter, db=None, client: Optional[httpx.Client] = None):
         self.name = name
+        # Shared client (WebSearchManager) or own one for standalone use
+        self.client = client or make_http_client()
         self.rate_limiter = rate_limiter
+        self.db = db  # Optional database connection (quota tracking, ETag cache)
         self.rps = PROVIDER_RATE_LIMITS.get(name, 0.5)
+        self.burst = PROVIDER_BURST_CAPACITY.get(name, 1)
+        self.rate_limiter.configure(name, self.rps, (JITTER_MIN, JITTER_MAX), self.burst)
+        self._local = threading.local()  # Per-thread state (search_many runs search() in threads)
+        
+        # Circuit breaker: after repeated failures skip the provider without any request
+        self._fail_count = 0
+        self._circuit_open_until = 0.0  # time.monotonic() deadline
+        self._breaker_lock = threading.Lock()  # search() runs in several threads at once
+    
+    @property
+    def _fetch_ts(self) -> Optional[str]:
+        """Fetch timestamp shared by results of one search()"""
+        return getattr(self._local, 'fetch_ts', None)
     
-    def search(self, query: str) -> tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
+    @_fetch_ts.setter
+    def _fetch_ts(self, value: Optional[str]):
+        self._local.fetch_ts = value
+    
+    @property
+    def _retry_after(self) -> Optional[float]:
+        """Retry-After (seconds) of this thread's 429 response, None if not sent"""
+        return getattr(self._local, 'retry_after', None)
+    
+    @_retry_after.setter
+    def _retry_after(self, value: Optional[float]):
+        self._local.retry_after = value
+    
+    def search(self, query: str, on_request_start: Optional[Callable[[], None]] = None
+               ) -> tuple[List[SearchResult], Optional[int], Optional[str], Optional[float]]:
         """
-        Search using provider
+        Search using provider (guarded by circuit breaker)
+        
+        Args:
+            query: Normalized search query
+            on_request_start: Called once when the request is actually sent (after
+                the rate-limit wait), or on return if no request was made
         
         Returns:
-            (results, http_code, error_message)
+            (results, http_code, error_message, retry_after) - retry_after is the
+            Retry-After (seconds) of a 429 response, None if not sent; a search
+            refused locally returns http_code None and one of the *_ERROR
+            constants of this module
         """
+        self._local.on_request_start = on_request_start
+        try:
+            if time.monotonic() < self._circuit_open_until:
+                return [], None, CIRCUIT_OPEN_ERROR, None
+            
+            self._retry_after = None
+            results, http_code, error = self._search(query)
+        finally:
+            self._request_started()
+        
+        # Nothing was sent: neither a throttle signal nor a provider failure
+        if error in (QUOTA_EXCEEDED_ERROR, BACKOFF_ERROR):
+            return results, None, error, None
+        
+        # Adaptive rate: back off on 429, recover on normal responses
+        if http_code == 429:
+            self.rate_limiter.on_throttled(self.name)
+        elif http_code is not None and http_code < 500:
+            self.rate_limiter.on_success(self.name)
+        
+        failed = http_code == 429 or (http_code is not None and http_code >= 500) or (error and http_code is None)
+        with self._breaker_lock:
+            if failed:
+                self._fail_count += 1
+                if self._fail_count >= CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+                    self._circuit_open_until = time.monotonic() + min(
+                        CIRCUIT_BREAKER_MAX_OPEN_SECONDS, 2 ** self._fail_count
+                    )
+            else:
+                self._fail_count = 0
+        
+        return results, http_code, error, self._retry_after
+    
+    def _search(self, query: str) -> tuple[List[SearchResult], Optional[int], Optional[str]]:
+        """Provider-specific search implementation, returns (results, http_code, error_message)"""
         raise NotImplementedError
     
+    def _wait_turn(self):
+        """Wait for the rate limiter right before sending the request"""
+        self.rate_limiter.wait_if_needed(self.name)
+        # One timestamp for all results of this fetch (taken after any rate-limit sleep)
+        self._fetch_ts = datetime.now(timezone.utc).isoformat()
+        self._request_started()
+    
+    def _request_started(self):
+        """Fire this thread's on_request_start callback (at most once per search())"""
+        callback = getattr(self._local, 'on_request_start', None)
+        if callback is not None:
+            self._local.on_request_start = None
+            callback()
+    
+    def has_quota(self) -> bool:
+        """
+        Client-side quota check, made before any request
+        
+        Lets callers skip a provider that would only answer 429 (and count the
+        rejected request against the quota). Providers without a quota always pass.
+        """
+        return True
+    
+    async def search_many(self, queries: List[str]) -> List[tuple[List[SearchResult], Optional[int], Optional[str], Optional[float]]]:
+        """
+        Search several queries concurrently
+        
+        Each query runs the blocking search() in a worker thread. At most `burst`
+        requests are in flight at once and pacing still goes through the rate
+        limiter; the wiki providers share one HTTP/2 connection, so concurrent
+        requests are multiplexed instead of paying a round-trip each.
+        
+        Returns:
+            List of search() tuples in input order
+        """
+        sem = asyncio.Semaphore(max(1, int(self.burst)))
+        
+        async def one(query: str):
+            async with sem:
+                return await asyncio.to_thread(self.search, query)
+        
+        return await asyncio.gather(*(one(q) for q in queries))
+    
     def _make_result(self, title: str, url: str, snippet: str, 
-                     relevance_score: float = 1.0, **metadata) -> Dict[str, Any]:
-        """Create standardized result dict"""
-        return {
-            "title": title,
-            "url": url,
-            "snippet": snippet,
-            "relevance_score": relevance_score,
-            "fetch_timestamp": datetime.now(timezone.utc).isoformat(),
-            "source_metadata": {
-                "provider": self.name,
-                **metadata
-            }
-        }
+                     relevance_score: float = 1.0, **metadata) -> SearchResult:
+        """Create standardized result"""
+        return SearchResult(
+            title, url, snippet, relevance_score,
+            self._fetch_ts or datetime.now(timezone.utc).isoformat(),
+            self.name, metadata
+        )
+    
+    def _get_json(self, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                  timeout: float = 10) -> tuple[Any, int]:
+        """
+        GET a JSON response through self.client with ETag revalidation
+        
+        The last ETag and body per request are kept in web_search_etag_cache; we send
+        If-None-Match and on 304 reuse the stored body.
+        
+        Returns:
+            (parsed JSON, http_code) - a 304 is reported as 200
+        
+        Raises:
+            httpx.HTTPStatusError on 4xx/5xx
+        """
+        request_key = None
+        cached = None
+        if self.db is not None:
+            request_url = str(httpx.URL(url, params=params))
+            request_key = hashlib.blake2b(request_url.encode(), digest_size=16).hexdigest()
+            cached = self.db.get_search_etag(self.name, request_key)
+        
+        request_headers = {**self.headers, **(headers or {})}
+        if cached:
+            request_headers['If-None-Match'] = cached['etag']
+        
+        response = self.client.get(url, params=params, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            return orjson.loads(cached['response_json']), 200
+        response.raise_for_status()
+        
+        data = orjson.loads(response.content)
+        etag = response.headers.get('ETag')
+        if request_key and etag:
+            self.db.save_search_etag(self.name, request_key, etag, response.content)
+        return data, response.status_code
 
 
 class WikipediaProvider(SearchProvider):
     """Wikipedia API search provider"""
     
-    def __init__(self, rate_limiter: RateLimiter):
-        super().__init__('wikipedia', rate_limiter)
+    headers = _WIKI_HEADERS
+    
+    def __init__(self, rate_limiter: RateLimiter, db=None, client: Optional[httpx.Client] = None):
+        super().__init__('wikipedia', rate_limiter, db=db, client=client)
         self.base_url = 'https://en.wikipedia.org/w/api.php'
     
-    def search(self, query: str) -> tuple[List[Dict], Optional[int], Optional[str]]:
+    def _search(self, query: str) -> tuple[List[SearchResult], Optional[int], Optional[str]]:
         """
         Search Wikipedia using Main Search API with snippets
         
         Returns up to 10 results with snippets containing search context
         """
         try:
-            self.rate_limiter.wait_if_needed(self.name, self.rps)
+            self._wait_turn()
             
             # Step 1: Search for pages
             search_params = {
@@ -76,20 +350,13 @@ class WikipediaProvider(SearchProvider):
                 'format': 'json',
             }
             
-            headers = {
-                'User-Agent': 'NewsAI-Trader/1.0 (research project; +https://github.com)'
-            }
-            
-            response = requests.get(self.base_url, params=search_params, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data, http_code = self._get_json(self.base_url, search_params, timeout=10)
             if 'query' not in data or 'search' not in data['query']:
                 return [], None, None
             
             search_results = data['query']['search']
             if not search_results:
-                return [], response.status_code, None
+                return [], http_code, None
             
             # Step 2: Get extracts for top results
             # Get extracts for first 5 results only (to minimize API calls)
@@ -106,18 +373,15 @@ class WikipediaProvider(SearchProvider):
                 'format': 'json',
             }
             
-            response = requests.get(self.base_url, params=extract_params, headers=headers, timeout=10)
-            response.raise_for_status()
-            extract_data = response.json()
+            extract_data, http_code = self._get_json(self.base_url, extract_params, timeout=10)
             
             # Build results
             results = []
             for i, page in enumerate(search_results):
                 title = page['title']
-                snippet = page.get('snippet', '')
                 
-                # Clean snippet HTML
-                snippet = snippet.replace('<span class="searchmatch">', '').replace('</span>', '').strip()
+                # Clean snippet HTML (single pass)
+                snippet = _WP_SEARCHMATCH_RE.sub('', page.get('snippet', '')).strip()
                 
                 # Try to get extract if available (for top results)
                 if i < len(page_titles) and 'pages' in extract_data.get('query', {}):
@@ -130,29 +394,31 @@ class WikipediaProvider(SearchProvider):
                             break
                 
                 # Construct URL from title
-                url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+                url = f"https://en.wikipedia.org/wiki/{quote(title.replace(' ', '_'), safe='/')}"
                 
-                score = 1.0 - (i * 0.1)
                 result = self._make_result(
                     title=title,
                     url=url,
                     snippet=snippet,
-                    relevance_score=max(0.1, score),
+                    relevance_score=_rank_score(_RANK_SCORES, i),
                     wiki_id=None
                 )
                 results.append(result)
             
             # Check for empty results
             if not results:
-                return [], response.status_code, None
+                return [], http_code, None
             
-            return results, response.status_code, None
+            return results, http_code, None
             
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
                 # Rate limited
+                self._retry_after = _retry_after_seconds(e.response)
                 return [], 429, str(e)
-            return [], e.response.status_code if e.response else 500, str(e)
+            return [], e.response.status_code, str(e)
+        except RateLimitError:
+            return [], None, BACKOFF_ERROR
         except Exception as e:
             return [], None, str(e)
 
@@ -160,27 +426,32 @@ class WikipediaProvider(SearchProvider):
 class WikidataProvider(SearchProvider):
     """Wikidata SPARQL search provider"""
     
-    def __init__(self, rate_limiter: RateLimiter):
-        super().__init__('wikidata', rate_limiter)
+    headers = _WIKI_HEADERS
+    
+    def __init__(self, rate_limiter: RateLimiter, db=None, client: Optional[httpx.Client] = None):
+        super().__init__('wikidata', rate_limiter, db=db, client=client)
         self.endpoint = 'https://query.wikidata.org/sparql'
     
-    def search(self, query: str) -> tuple[List[Dict], Optional[int], Optional[str]]:
+    def _search(self, query: str) -> tuple[List[SearchResult], Optional[int], Optional[str]]:
         """
-        Search Wikidata using SPARQL
+        Search Wikidata using SPARQL (EntitySearch over labels and aliases)
         """
         try:
-            self.rate_limiter.wait_if_needed(self.name, self.rps)
+            self._wait_turn()
             
             # SPARQL query to find entities matching the search term
-            # This searches in labels and aliases
+            # EntitySearch (MWAPI) is the indexed wbsearchentities lookup over labels
+            # and aliases, so partial names match and items come back ranked by relevance
+            search_literal = json.dumps(query, ensure_ascii=False)  # escaped SPARQL string literal
             sparql = f"""
-            SELECT DISTINCT ?item ?itemLabel ?itemDescription ?article WHERE {{
-              {{
-                ?item rdfs:label "{query}"@en .
-              }}
-              UNION
-              {{
-                ?item skos:altLabel "{query}"@en .
+            SELECT DISTINCT ?item ?itemLabel ?itemDescription ?article ?ordinal WHERE {{
+              SERVICE wikibase:mwapi {{
+                bd:serviceParam wikibase:api "EntitySearch" ;
+                                wikibase:endpoint "www.wikidata.org" ;
+                                mwapi:search {search_literal} ;
+                                mwapi:language "en" .
+                ?item wikibase:apiOutputItem mwapi:item .
+                ?ordinal wikibase:apiOrdinal true .
               }}
               SERVICE wikibase:label {{ 
                 bd:serviceParam wikibase:language "en" .
@@ -191,103 +462,99 @@ class WikidataProvider(SearchProvider):
                 ?article schema:isPartOf <https://en.wikipedia.org/> .
               }}
             }}
+            ORDER BY ?ordinal
             LIMIT 10
             """
             
             headers = {
-                'User-Agent': 'NewsAI-Trader/1.0 (research project; +https://github.com)',
                 'Accept': 'application/sparql-results+json'
             }
             
-            response = requests.get(
+            data, http_code = self._get_json(
                 self.endpoint,
-                params={'query': sparql, 'format': 'json'},
+                {'query': sparql, 'format': 'json'},
                 headers=headers,
                 timeout=15
             )
-            response.raise_for_status()
-            
-            data = response.json()
             bindings = data.get('results', {}).get('bindings', [])
             
-            results = []
-            for i, binding in enumerate(bindings):
-                item = binding.get('item', {}).get('value', '')
-                label = binding.get('itemLabel', {}).get('value', '')
-                desc = binding.get('itemDescription', {}).get('value', '')
-                article = binding.get('article', {}).get('value', '')
-                
-                # Use Wikipedia URL if available, otherwise Wikidata URL
-                url = article if article else item
-                
-                # If no description, use label as fallback
-                snippet = desc if desc else f"Wikidata entity: {label or item.split('/')[-1]}"
-                
-                score = 1.0 - (i * 0.1)
-                result = self._make_result(
+            make_result = self._make_result
+            
+            def to_result(score: float, binding: Dict[str, Any]) -> SearchResult:
+                get = binding.get
+                item = get('item', _EMPTY_BINDING)['value']
+                label = get('itemLabel', _EMPTY_BINDING)['value']
+                desc = get('itemDescription', _EMPTY_BINDING)['value']
+                article = get('article', _EMPTY_BINDING)['value']
+                return make_result(
                     title=label or 'Unknown',
-                    url=url,
-                    snippet=snippet,
-                    relevance_score=max(0.1, score),
+                    # Use Wikipedia URL if available, otherwise Wikidata URL
+                    url=article or item,
+                    # If no description, use label as fallback
+                    snippet=desc or f"Wikidata entity: {label or item.rsplit('/', 1)[-1]}",
+                    relevance_score=score,
                     wikidata_id=item
                 )
-                results.append(result)
             
-            return results, response.status_code, None
+            # LIMIT 10 in SPARQL, so ranks always fit the score table
+            results = [to_result(score, binding) for score, binding in zip(_RANK_SCORES, bindings)]
+            
+            return results, http_code, None
             
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
+                self._retry_after = _retry_after_seconds(e.response)
                 return [], 429, str(e)
-            return [], e.response.status_code if e.response else 500, str(e)
+            return [], e.response.status_code, str(e)
+        except RateLimitError:
+            return [], None, BACKOFF_ERROR
         except Exception as e:
             return [], None, str(e)
 
 
 class DuckDuckGoProvider(SearchProvider):
-    """DuckDuckGo HTML scraping provider (fallback only)"""
+    """DuckDuckGo Lite scraping provider (fallback only)"""
+    
+    headers = _DDG_HEADERS
     
-    def __init__(self, rate_limiter: RateLimiter):
-        super().__init__('duckduckgo', rate_limiter)
-        self.base_url = 'https://html.duckduckgo.com/html/'
+    def __init__(self, rate_limiter: RateLimiter, client: Optional[httpx.Client] = None):
+        super().__init__('duckduckgo', rate_limiter, client=client)
+        # Lite page is a small fixed table (~10x smaller than html.duckduckgo.com)
+        self.base_url = 'https://lite.duckduckgo.com/lite/'
     
-    def search(self, query: str) -> tuple[List[Dict], Optional[int], Optional[str]]:
+    def _search(self, query: str) -> tuple[List[SearchResult], Optional[int], Optional[str]]:
         """
-        Search DuckDuckGo via HTML scraping
+        Search DuckDuckGo via Lite page scraping
         """
         try:
-            self.rate_limiter.wait_if_needed(self.name, self.rps)
+            self._wait_turn()
             
-            params = {'q': query}
-            
-            # Use headers to avoid getting blocked
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
+            data = {'q': query}
             
-            response = requests.get(self.base_url, params=params, headers=headers, timeout=10)
+            response = self.client.post(self.base_url, data=data, headers=self.headers, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # selectolax accepts raw bytes, so skip the charset decode of response.text
+            tree = HTMLParser(response.content)
+            
+            # DuckDuckGo Lite structure: one row with a.result-link, next rows with
+            # td.result-snippet (may change, so this is fragile)
+            links = tree.css('a.result-link')
+            snippets = tree.css('td.result-snippet')
             
-            # DuckDuckGo HTML structure (may change, so this is fragile)
             results = []
-            for i, result in enumerate(soup.select('.result')):
-                title_elem = result.select_one('.result__a')
-                snippet_elem = result.select_one('.result__snippet')
-                
-                if not title_elem:
-                    continue
+            for i, title_elem in enumerate(links):
+                snippet_elem = snippets[i] if i < len(snippets) else None
                 
-                title = title_elem.get_text(strip=True)
-                url = title_elem.get('href', '')
-                snippet = snippet_elem.get_text(strip=True) if snippet_elem else ''
+                title = title_elem.text(strip=True)
+                url = title_elem.attributes.get('href') or ''
+                snippet = snippet_elem.text(strip=True) if snippet_elem else ''
                 
-                score = 1.0 - (i * 0.15)
                 result_dict = self._make_result(
                     title=title,
                     url=url,
                     snippet=snippet,  # Limit snippet length can be done here [:200]
-                    relevance_score=max(0.1, score)
+                    relevance_score=_rank_score(_DDG_RANK_SCORES, i)
                 )
                 results.append(result_dict)
             
@@ -295,10 +562,13 @@ class DuckDuckGoProvider(SearchProvider):
                 pass
             return results, response.status_code, None
             
-        except requests.exceptions.HTTPError as e:
-            if e.response and e.response.status_code == 429:
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                self._retry_after = _retry_after_seconds(e.response)
                 return [], 429, str(e)
-            return [], e.response.status_code if e.response else 500, str(e)
+            return [], e.response.status_code, str(e)
+        except RateLimitError:
+            return [], None, BACKOFF_ERROR
         except Exception as e:
             return [], None, str(e)
 
@@ -306,8 +576,8 @@ class DuckDuckGoProvider(SearchProvider):
 class GoogleCSEProvider(SearchProvider):
     """Google Custom Search Engine provider (very rare, quota limited)"""
     
-    def __init__(self, rate_limiter: RateLimiter, db=None):
-        super().__init__('google_cse', rate_limiter)
+    def __init__(self, rate_limiter: RateLimiter, db=None, client: Optional[httpx.Client] = None):
+        super().__init__('google_cse', rate_limiter, db=db, client=client)
         
         if not GOOGLE_CSE_API_KEY or not GOOGLE_CSE_ID:
             raise ValueError("Google CSE credentials not configured")
@@ -315,27 +585,85 @@ class GoogleCSEProvider(SearchProvider):
         self.api_key = GOOGLE_CSE_API_KEY
         self.cse_id = GOOGLE_CSE_ID
         self.base_url = 'https://www.googleapis.com/customsearch/v1'
-        self.db = db  # Database connection for persistent quota tracking
+        # Daily usage memoized for a short TTL to avoid a DB query per search
+        self._quota_cache = {'count': None, 'fetched_at': 0.0}
+        
+        # Redis daily counter (INCR per request) if configured, SQL count otherwise
+        self._redis = None
+        if REDIS_URL and redis is not None:
+            self._redis = redis.Redis.from_url(REDIS_URL, socket_timeout=1)
+    
+    def _quota_key(self) -> str:
+        """Redis key of today's (UTC) counter"""
+        return f"quota:{self.name}:{datetime.now(timezone.utc):%Y%m%d}"
+    
+    def _check_quota_redis(self) -> Optional[bool]:
+        """Check quota using Redis counter; None if Redis is unavailable"""
+        try:
+            key = self._quota_key()
+            count = self._redis.get(key)
+            if count is None and self.db:
+                # New day / fresh Redis: seed counter from DB so restarts do not reset quota
+                seed = self.db.get_provider_daily_usage(self.name)
+                self._redis.set(key, seed, ex=90000, nx=True)
+                count = self._redis.get(key)
+            return int(count or 0) < GOOGLE_CSE_DAILY_LIMIT
+        except redis.RedisError as e:
+            print(f"Redis quota check failed, falling back to DB: {e}")
+            return None
+    
+    def _count_request(self):
+        """Account one successful request in quota counters"""
+        self._quota_cache['count'] = (self._quota_cache['count'] or 0) + 1
+        if self._redis is not None:
+            try:
+                key = self._quota_key()
+                pipe = self._redis.pipeline()
+                pipe.incr(key)
+                pipe.expire(key, 90000)
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"Redis quota increment failed: {e}")
+    
+    def has_quota(self) -> bool:
+        """Daily quota left (see _check_quota)"""
+        return self._check_quota()
     
     def _check_quota(self) -> bool:
         """
-        Check if we have quota remaining (persistent via database)
+        Check if we have quota remaining
         Counts Google CSE searches made today (UTC)
+        
+        Uses the Redis counter when REDIS_URL is configured. Otherwise the DB
+        count is reused for GOOGLE_CSE_QUOTA_CACHE_SECONDS and bumped locally
+        after each successful request.
         """
+        if self._redis is not None:
+            has_quota = self._check_quota_redis()
+            if has_quota is not None:
+                return has_quota
+        
         if not self.db:
             # Fallback: allow search if no DB
             return True
         
+        cached_count = self._quota_cache['count']
+        if (cached_count is not None
+                and time.monotonic() - self._quota_cache['fetched_at'] < GOOGLE_CSE_QUOTA_CACHE_SECONDS):
+            return cached_count < GOOGLE_CSE_DAILY_LIMIT
+        
         try:
             # Use database method for consistent quota tracking
             count = self.db.get_provider_daily_usage('google_cse')
-            return count < 100  # 100 queries/day free tier
+            self._quota_cache['count'] = count
+            self._quota_cache['fetched_at'] = time.monotonic()
+            return count < GOOGLE_CSE_DAILY_LIMIT  # 100 queries/day free tier
         except Exception as e:
             print(f"Error checking CSE quota: {e}")
             # Allow search if quota check fails
             return True
     
-    def search(self, query: str) -> tuple[List[Dict], Optional[int], Optional[str]]:
+    def _search(self, query: str) -> tuple[List[SearchResult], Optional[int], Optional[str]]:
         """
         Search using Google Custom Search Engine
         
@@ -343,9 +671,9 @@ class GoogleCSEProvider(SearchProvider):
         """
         try:
             if not self._check_quota():
-                return [], 429, "Daily quota exceeded (100 queries)"
+                return [], None, QUOTA_EXCEEDED_ERROR
             
-            self.rate_limiter.wait_if_needed(self.name, self.rps)
+            self._wait_turn()
             
             params = {
                 'key': self.api_key,
@@ -354,10 +682,11 @@ class GoogleCSEProvider(SearchProvider):
                 'num': 10
             }
             
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.client.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
+            self._count_request()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             items = data.get('items', [])
             
             results = []
@@ -366,23 +695,25 @@ class GoogleCSEProvider(SearchProvider):
                 url = item.get('link', '')
                 snippet = item.get('snippet', '')
                 
-                score = 1.0 - (i * 0.1)
                 result = self._make_result(
                     title=title,
                     url=url,
                     snippet=snippet,
-                    relevance_score=max(0.1, score)
+                    relevance_score=_rank_score(_RANK_SCORES, i)
                 )
                 results.append(result)
             
             return results, response.status_code, None
             
-        except requests.exceptions.HTTPError as e:
-            if e.response and e.response.status_code == 429:
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                # Google says we are out of quota - reload the count from DB next time
+                self._quota_cache['count'] = None
+                self._retry_after = _retry_after_seconds(e.response)
                 return [], 429, str(e)
-            if e.response and e.response.status_code >= 500:
-                return [], e.response.status_code, str(e)
-            return [], e.response.status_code if e.response else 500, str(e)
+            return [], e.response.status_code, str(e)
+        except RateLimitError:
+            return [], None, BACKOFF_ERROR
         except Exception as e:
             return [], None, str(e)
 
@@ -1,81 +1,171 @@
 """Rate limiting for web search providers"""
 
 import time
-import threading
 import random
-from typing import Dict, Optional
-from datetime import datetime, timezone, timedelta
+from typing import Dict, Tuple
+
+from apps.ingest.web_search.config import (
+    AIMD_INCREASE_AFTER_SUCCESSES,
+    AIMD_MIN_RATE_FRACTION,
+)
+
+# Bound once: wait_if_needed runs before every provider request
+_random = random.random
+_monotonic = time.monotonic
 
 
 class RateLimiter:
     """
-    Rate limiter for search providers with jitter and backoff
+    Token-bucket rate limiter for search providers with jitter and backoff
+    
+    The bucket is kept as a single float per provider - the "theoretical
+    arrival time" (GCRA): the moment the bucket would be full again. A call
+    reserves its slot by advancing this value and then sleeps until the slot,
+    so waiting callers do not block new reservations.
+    
+    No locks are used: the state is a plain float per provider and dict
+    reads/writes are atomic under the GIL. Two threads racing on the same
+    provider may occasionally get the same slot - acceptable for pacing
+    requests, the next reservation is pushed further out anyway.
     
     Features:
-    - Configurable RPS per provider
-    - Random jitter (±30%)
-    - Thread-safe
+    - Configurable RPS per provider (bucket refill rate)
+    - Burst capacity: after idle time up to `capacity` requests go through immediately
+    - Random jitter (±30%) on the per-request interval
+    - Thread-safe without locks (GIL-atomic float writes)
     - Exponential backoff tracking
+    - Adaptive rate (AIMD): halved on 429, restored stepwise after a run of successes
     """
     
     def __init__(self):
-        self._locks: Dict[str, threading.Lock] = {}
-        self._last_request: Dict[str, float] = {}
-        self._backoff_until: Dict[str, Optional[datetime]] = {}
+        # Per-provider theoretical arrival time on the time.monotonic() clock (bucket state in one float)
+        self._tat: Dict[str, float] = {}
+        # Backoff deadline per provider as time.monotonic() value (0.0 = no backoff).
+        # Plain float dict reads/writes are atomic under the GIL, so no lock is needed.
+        self._backoff_until: Dict[str, float] = {}
+        # Per-provider constants: (base interval, jitter low, jitter range, capacity - 1)
+        self._config: Dict[str, Tuple[float, float, float, float]] = {}
+        # AIMD state: configured (max) rate, current rate, successes since last change
+        self._max_rps: Dict[str, float] = {}
+        self._rps: Dict[str, float] = {}
+        self._ok_streak: Dict[str, int] = {}
+        
+    def configure(self, provider: str, rps: float, jitter: Tuple[float, float] = (0.7, 1.3),
+                  capacity: float = 1.0):
+        """
+        Register provider and precompute its pacing constants
+        
+        Must be called before the provider is used - done by SearchProvider.__init__,
+        i.e. while WebSearchManager is being set up, before any concurrent access.
+        
+        Args:
+            provider: Provider name
+            rps: Requests per second (bucket refill rate)
+            jitter: Jitter range (min, max) multiplier
+            capacity: Bucket size (burst allowance)
+        """
+        j_lo, j_hi = jitter
+        self._config[provider] = (1.0 / rps, j_lo, j_hi - j_lo, capacity - 1.0)
+        self._max_rps[provider] = self._rps[provider] = rps
+        self._ok_streak[provider] = 0
+        if provider not in self._tat:
+            self._tat[provider] = 0.0  # in the past = full bucket
+            self._backoff_until[provider] = 0.0
+    
+    def _set_rate(self, provider: str, rps: float):
+        """Replace current refill rate of provider (keeps jitter/burst constants)"""
+        _, j_lo, j_range, extra_burst = self._config[provider]
+        self._rps[provider] = rps
+        self._config[provider] = (1.0 / rps, j_lo, j_range, extra_burst)
+    
+    def on_throttled(self, provider: str):
+        """
+        Provider answered 429: halve its rate and empty the bucket
         
-    def _get_lock(self, provider: str) -> threading.Lock:
-        """Get or create lock for provider"""
-        if provider not in self._locks:
-            self._locks[provider] = threading.Lock()
-            self._last_request[provider] = 0.0
-            self._backoff_until[provider] = None
-        return self._locks[provider]
+        Backoff (incl. server's Retry-After) is set separately by the caller.
+        """
+        rps = max(self._rps[provider] / 2, self._max_rps[provider] * AIMD_MIN_RATE_FRACTION)
+        self._set_rate(provider, rps)
+        self._ok_streak[provider] = 0
+        
+        # Empty bucket: next request waits at least one (new) interval
+        base_interval, _, _, extra_burst = self._config[provider]
+        self._tat[provider] = max(self._tat[provider], _monotonic() + (extra_burst + 1.0) * base_interval)
+    
+    def on_success(self, provider: str):
+        """Provider answered normally: raise rate by a tenth of max after a run of successes"""
+        streak = self._ok_streak[provider] + 1
+        rps = self._rps[provider]
+        if streak >= AIMD_INCREASE_AFTER_SUCCESSES and rps < self._max_rps[provider]:
+            max_rps = self._max_rps[provider]
+            self._set_rate(provider, min(max_rps, rps + max_rps / 10))
+            streak = 0
+        self._ok_streak[provider] = streak
     
     def set_backoff(self, provider: str, delay_minutes: int):
         """Set backoff period for provider"""
-        with self._get_lock(provider):
-            self._backoff_until[provider] = datetime.now(timezone.utc) + timedelta(minutes=delay_minutes)
+        self._backoff_until[provider] = time.monotonic() + delay_minutes * 60
+    
+    def extend_backoff(self, provider: str, delay_minutes: float):
+        """Set backoff period for provider unless a longer one is already active"""
+        until = time.monotonic() + delay_minutes * 60
+        if until > self._backoff_until.get(provider, 0.0):
+            self._backoff_until[provider] = until
     
     def clear_backoff(self, provider: str):
         """Clear backoff period for provider"""
-        with self._get_lock(provider):
-            self._backoff_until[provider] = None
+        self._backoff_until[provider] = 0.0
     
-    def wait_if_needed(self, provider: str, rps: float, jitter: tuple[float, float] = (0.7, 1.3)):
+    def in_backoff(self, provider: str) -> bool:
+        """Check in-memory backoff deadline (no DB access)"""
+        return self._backoff_until.get(provider, 0.0) > time.monotonic()
+    
+    def wait_if_needed(self, provider: str):
         """
         Wait if needed to respect rate limit
         
+        Takes one token from the provider bucket. The bucket refills at `rps`
+        tokens per second up to `capacity` (see configure); when it is empty
+        we sleep until the next token is available.
+        
+        Lock-free: backoff check and slot reservation are single float
+        reads/writes on per-provider dicts.
+        
         Args:
-            provider: Provider name
-            rps: Requests per second (rate limit)
-            jitter: Jitter range (min, max) multiplier
+            provider: Provider name (must be configured)
         """
-        with self._get_lock(provider):
-            # Check backoff
-            if self._backoff_until[provider] is not None:
-                if datetime.now(timezone.utc) < self._backoff_until[provider]:
-                    # Still in backoff
-                    raise RateLimitError(
-                        f"Provider {provider} is in backoff until {self._backoff_until[provider]}"
-                    )
-                else:
-                    # Backoff expired, clear it
-                    self._backoff_until[provider] = None
-            
-            # Calculate required wait time
-            now = time.time()
-            elapsed = now - self._last_request[provider]
-            min_interval = 1.0 / rps
-            
-            # Apply jitter
-            jitter_mult = random.uniform(*jitter)
-            target_interval = min_interval * jitter_mult
-            
-            if elapsed < target_interval:
-                wait_time = target_interval - elapsed
-                time.sleep(wait_time)
-            
-            self._last_request[provider] = time.time()
+        now = _monotonic()
+        
+        # Check backoff (lock-free: single float compare)
+        remaining = self._backoff_until[provider] - now
+        if remaining > 0:
+            raise RateLimitError(
+                f"Provider {provider} is in backoff for another {remaining / 60:.1f} min"
+            )
+        
+        base_interval, j_lo, j_range, extra_burst = self._config[provider]
+        
+        # Fast path: provider idle long enough for the bucket to be full -
+        # no wait possible, so skip jitter and slot math
+        tat = self._tat[provider]
+        if tat <= now:
+            self._tat[provider] = now + base_interval
+            return
+        
+        # Interval per request (with jitter); burst tolerance lets
+        # `capacity` requests through back-to-back after idle time
+        interval = base_interval * (j_lo + _random() * j_range)
+        burst_tolerance = extra_burst * interval
+        
+        # Reserve slot: advance theoretical arrival time by one interval
+        self._tat[provider] = tat + interval
+        slot = tat - burst_tolerance
+        
+        # Sleep until our reserved slot; the reservation is already visible to
+        # other callers, so they queue behind it without waiting for us
+        wait_time = slot - _monotonic()
+        if wait_time > 0:
+            time.sleep(wait_time)
 
 
 class RateLimitError(Exception):
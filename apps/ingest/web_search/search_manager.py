@@ -1,24 +1,128 @@
 """Web search manager with cache integration and provider cascade"""
 
+import sys
 import time
+import logging
+import threading
+import statistics
+from collections import Counter, OrderedDict, deque
+from logging.handlers import MemoryHandler
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone, timedelta
 
+try:
+    # Optional: C++ edit distance for the fuzzy in-memory lookup
+    from rapidfuzz import process as rf_process
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    rf_process = None
+
 from libs.database.connection import DatabaseConnection
-from apps.ingest.web_search.normalizer import normalize_query
+from apps.ingest.web_search.normalizer import normalize_query, normalize_batch
 from apps.ingest.web_search.rate_limiter import RateLimiter
 from apps.ingest.web_search.providers import (
     WikipediaProvider,
     WikidataProvider,
     DuckDuckGoProvider,
-    GoogleCSEProvider
+    GoogleCSEProvider,
+    QUOTA_EXCEEDED_ERROR,
+    CIRCUIT_OPEN_ERROR,
+    BACKOFF_ERROR,
+    make_http_client,
 )
 from apps.ingest.web_search.config import (
     BACKOFF_BASE_DELAY_MINUTES,
     BACKOFF_MAX_DELAY_MINUTES,
+    NEGATIVE_CACHE_TTL_MINUTES,
+    CACHE_TTL_MINUTES,
+    HEDGE_DELAY_SECONDS,
+    RESULT_CACHE_SIZE,
+    PREFETCH_WINDOW,
+    SEARCH_BATCH_WORKERS,
+    PROVIDER_ORDER_REFRESH_QUERIES,
 )
 
 
+# Per-entity progress of search_batch. Records are buffered and written to
+# stdout in chunks (on capacity, on warnings and once per prefetch window)
+# instead of a print() call per line.
+log = logging.getLogger('web_search.batch')
+if not log.handlers:
+    _console = logging.StreamHandler(sys.stdout)
+    _console.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(MemoryHandler(capacity=100, flushLevel=logging.WARNING, target=_console))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+def _flush_batch_log():
+    """Write out buffered search_batch progress"""
+    for handler in log.handlers:
+        handler.flush()
+
+
+def _within_edit_distance(a: str, b: str, max_dist: int) -> bool:
+    """Check Levenshtein distance(a, b) <= max_dist (early exit per row)"""
+    if abs(len(a) - len(b)) > max_dist:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_dist:
+            return False
+        prev = cur
+    return prev[-1] <= max_dist
+
+
+# search_batch statistics bucket per result status (anything else counts as error)
+_STATUS_BUCKET = {'ok': 'success', 'empty': 'empty'}
+
+# failed_providers reason (and response status) of a search refused by the provider itself
+_LOCAL_REFUSALS = {
+    QUOTA_EXCEEDED_ERROR: 'quota',
+    CIRCUIT_OPEN_ERROR: 'circuit',
+    BACKOFF_ERROR: 'backoff',
+}
+
+
+class _WindowMinMax:
+    """Min and max of the last `size` appended values, O(1) amortized (monotonic deques)"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._count = 0
+        # (index, value) pairs; values increasing in _lo, decreasing in _hi
+        self._lo: deque = deque()
+        self._hi: deque = deque()
+    
+    def append(self, value: float):
+        i = self._count
+        self._count += 1
+        lo, hi = self._lo, self._hi
+        while lo and lo[-1][1] >= value:
+            lo.pop()
+        lo.append((i, value))
+        while hi and hi[-1][1] <= value:
+            hi.pop()
+        hi.append((i, value))
+        # Drop the head once it falls out of the window
+        if lo[0][0] <= i - self.size:
+            lo.popleft()
+        if hi[0][0] <= i - self.size:
+            hi.popleft()
+    
+    @property
+    def min(self) -> float:
+        return self._lo[0][1]
+    
+    @property
+    def max(self) -> float:
+        return self._hi[0][1]
+
+
 class WebSearchManager:
     """
     Main orchestrator for web search with caching and provider cascade
@@ -26,25 +130,132 @@ class WebSearchManager:
     Search flow:
     1. Normalize query
     2. Check cache (with optional fuzzy matching)
-    3. If miss: cascade through providers (Wikipedia → Wikidata → DuckDuckGo → Google CSE)
+    3. If miss: hedged requests to DuckDuckGo → Wikipedia → Wikidata, then Google CSE
     4. Save result to cache
     5. Return results
     """
     
+    # Default order of free providers (Wikipedia prioritized over Wikidata because of longer snippets)
+    FREE_PROVIDERS = ('duckduckgo', 'wikipedia', 'wikidata')
+    
     def __init__(self, db: DatabaseConnection):
         self.db = db
         self.rate_limiter = RateLimiter()
         
+        # Single-flight: concurrent searches for the same normalized query share one provider cascade
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Consecutive server errors per provider (mirror of provider_state.attempts)
+        self._provider_attempts: Dict[str, int] = {}
+        
+        # Process-local LRU of positive results: normalized query -> {provider, results, status}
+        self._result_cache: OrderedDict = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        
+        # Negative cache mirror: normalized query -> expiry (Unix seconds) of its
+        # 'empty_global' row, so known-dead queries are skipped without a DB query
+        self._empty_until: Dict[str, float] = {}
+        
+        # Worker threads for hedged provider requests (one per free provider)
+        self._executor = ThreadPoolExecutor(max_workers=3 * SEARCH_BATCH_WORKERS, thread_name_prefix='web_search')
+        
+        # Hedge losers still running after a winner: resolved once their response is handled
+        self._hedge_losers: set = set()
+        self._hedge_losers_lock = threading.Lock()
+        
+        # One keep-alive HTTP/2 client shared by all providers
+        self.http_client = make_http_client()
+        
         # Initialize providers
-        self.wikipedia = WikipediaProvider(self.rate_limiter)
-        self.wikidata = WikidataProvider(self.rate_limiter)
-        self.duckduckgo = DuckDuckGoProvider(self.rate_limiter)
+        # Wiki providers get db for ETag revalidation of repeated queries
+        self.wikipedia = WikipediaProvider(self.rate_limiter, db=self.db, client=self.http_client)
+        self.wikidata = WikidataProvider(self.rate_limiter, db=self.db, client=self.http_client)
+        self.duckduckgo = DuckDuckGoProvider(self.rate_limiter, client=self.http_client)
         
         # Google CSE is optional - pass db for persistent quota tracking
         try:
-            self.google_cse = GoogleCSEProvider(self.rate_limiter, db=self.db)
+            self.google_cse = GoogleCSEProvider(self.rate_limiter, db=self.db, client=self.http_client)
         except ValueError:
             self.google_cse = None
+        
+        self._providers = {
+            p.name: p for p in (self.wikipedia, self.wikidata, self.duckduckgo, self.google_cse) if p
+        }
+        
+        # Backoff and negative cache are checked in memory on every search;
+        # DB is read once to survive restarts
+        self._load_backoffs()
+        self._load_negative_cache()
+        
+        # Provider chains precomputed once: (provider, name) pairs of free providers in
+        # search order. Defaults for types without history; learned chains per entity
+        # type are refreshed every PROVIDER_ORDER_REFRESH_QUERIES cascades
+        self._default_chain = self._build_chain(None, self.FREE_PROVIDERS)
+        self._symbol_chain = self._build_chain('symbol', self.FREE_PROVIDERS)
+        self._provider_chains: Dict[Optional[str], tuple] = {}
+        self._cascades_since_order = 0
+        self._load_provider_order()
+    
+    def close(self):
+        """Stop worker threads and close HTTP connections"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.http_client.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _load_backoffs(self):
+        """
+        Merge backoff deadlines from provider_state into the in-memory ones
+        
+        One query for all providers; picks up backoffs set by other processes
+        sharing the database (longer deadline wins).
+        """
+        now = time.time()
+        for provider, until in self.db.get_provider_backoffs().items():
+            remaining_minutes = (until - now) / 60
+            if remaining_minutes > 0:
+                self.rate_limiter.extend_backoff(provider, remaining_minutes)
+    
+    def _load_negative_cache(self):
+        """
+        Rebuild the in-memory negative cache from unexpired 'empty_global' rows
+        
+        Replaces the mirror entirely, so entries dropped or expired in the DB
+        do not linger in memory.
+        """
+        self._empty_until = self.db.get_globally_empty()
+    
+    def _build_chain(self, entity_type: Optional[str], order) -> tuple:
+        """(provider, name) pairs for the given provider order and entity type"""
+        # Skip wiki providers for symbols (they don't work well for stock symbols)
+        return tuple(
+            (self._providers[name], name) for name in order
+            if not (entity_type == 'symbol' and name in ('wikipedia', 'wikidata'))
+        )
+    
+    def _load_provider_order(self):
+        """
+        Learn per-entity-type order of free providers from cached successes
+        
+        Providers with more 'ok' rows for the entity type go first; ties and
+        providers without data keep the FREE_PROVIDERS order. One query for all
+        types; the resulting chains are swapped in as one dict.
+        """
+        self._provider_chains = {
+            entity_type: self._build_chain(
+                entity_type, sorted(self.FREE_PROVIDERS, key=lambda name: -counts.get(name, 0)))
+            for entity_type, counts in self.db.get_provider_success_counts().items()
+        }
+        self._cascades_since_order = 0
+    
+    def _is_globally_empty(self, normalized_query: str) -> bool:
+        """Check in-memory negative cache (all providers returned empty recently)"""
+        return self._empty_until.get(normalized_query, 0.0) > time.time()
     
     def search(self, query: str, force_refresh: bool = False, fuzzy: bool = False, 
                entity_type: Optional[str] = None) -> Dict[str, Any]:
@@ -69,10 +280,16 @@ class WebSearchManager:
         """
         normalized = normalize_query(query)
         
-        # Check cache first (unless force_refresh)
+        # Check cache first (unless force_refresh): memory, then DB
         # Only return cached if it's a valid result (filter out empty/error/ratelimited)
         if not force_refresh:
-            cached = self.db.get_cached_search(normalized, fuzzy=fuzzy, filter_empty=True)
+            cached = self._memory_get(normalized)
+            if cached is None and fuzzy:
+                cached = self._memory_get_similar(normalized)
+            if cached is None:
+                cached = self.db.get_cached_search(normalized, fuzzy=fuzzy, filter_empty=True)
+                if cached and not fuzzy:
+                    self._memory_put(normalized, cached)
             if cached:
                 # Valid cached result - return it
                 return {
@@ -83,9 +300,22 @@ class WebSearchManager:
                     'status': cached['status'],
                     'cached': True
                 }
+            
+            # Negative cache: every provider returned empty recently - don't cascade again
+            if self._is_globally_empty(normalized):
+                return {
+                    'query': query,
+                    'normalized_query': normalized,
+                    'provider': 'none',
+                    'results': [],
+                    'status': 'empty',
+                    'cached': True
+                }
         
-        # Cache miss or force_refresh - perform search
-        result = self._search_through_providers(normalized, entity_type=entity_type)
+        # Cache miss or force_refresh - perform search (or wait for the same search in flight)
+        result = self._search_single_flight(normalized, entity_type=entity_type)
+        if result['status'] == 'ok':
+            self._memory_put(normalized, result)
         
         return {
             'query': query,
@@ -95,141 +325,402 @@ class WebSearchManager:
             'status': result['status'],
             'cached': False
         }
+
+    def _memory_get(self, normalized_query: str) -> Optional[Dict[str, Any]]:
+        """Exact lookup in the in-memory result cache"""
+        with self._result_cache_lock:
+            entry = self._result_cache.get(normalized_query)
+            if entry is not None:
+                self._result_cache.move_to_end(normalized_query)
+            return entry
+    
+    def _memory_put(self, normalized_query: str, result: Dict[str, Any]):
+        """Store (or replace) positive result in the in-memory cache, evicting the oldest"""
+        entry = {'provider': result['provider'], 'results': result['results'], 'status': result['status']}
+        with self._result_cache_lock:
+            self._result_cache[normalized_query] = entry
+            self._result_cache.move_to_end(normalized_query)
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+    
+    def _prefetch(self, queries: List[str]):
+        """Load valid cached results of queries into the in-memory cache (single IN query)"""
+        normalized = normalize_batch(q for q in queries if q.strip())
+        for norm, cached in self.db.get_cached_searches(normalized, filter_empty=True).items():
+            self._memory_put(norm, cached)
+    
+    def _memory_get_similar(self, normalized_query: str) -> Optional[Dict[str, Any]]:
+        """
+        Fuzzy lookup in the in-memory cache
+        
+        Reuses the result of a cached query that is a word prefix of this one
+        ("apple" for "apple inc") or within edit distance 2 ("apple inc."),
+        keeping only results whose title contains the query.
+        """
+        with self._result_cache_lock:
+            items = list(self._result_cache.items())
+        
+        if rf_process is not None:
+            # One vectorized pass over all cached keys instead of a Python DP per key
+            close = {key for key, _, _ in rf_process.extract(
+                normalized_query, [key for key, _ in items],
+                scorer=Levenshtein.distance, score_cutoff=2, limit=None)}
+            is_close = close.__contains__
+        else:
+            is_close = lambda key: _within_edit_distance(normalized_query, key, 2)
+        
+        for key, entry in reversed(items):  # most recently used first
+            if not (normalized_query.startswith(key + ' ') or is_close(key)):
+                continue
+            results = [r for r in entry['results'] if normalized_query in (r['title'] or '').lower()]
+            if results:
+                return {'provider': entry['provider'], 'results': results, 'status': entry['status']}
+        return None
     
+    def _search_single_flight(self, normalized_query: str, entity_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run provider cascade once per normalized query across concurrent callers
+        
+        The first caller performs the search; others arriving meanwhile block on
+        its Future and get the same result (or exception).
+        """
+        with self._inflight_lock:
+            fut = self._inflight.get(normalized_query)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[normalized_query] = fut
+        
+        if not leader:
+            return fut.result()
+        
+        try:
+            result = self._search_through_providers(normalized_query, entity_type=entity_type)
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(normalized_query, None)
+
+    def search_many(self, queries: List[str], entity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search many queries with a single batched cache lookup
+
+        Cache hits are resolved with one SQL query (see get_cached_searches);
+        only misses go through the provider cascade, one by one.
+
+        Args:
+            queries: Search query strings
+            entity_type: Type of entity (applies to all queries)
+
+        Returns:
+            List of result dicts (same shape as search()) in input order
+        """
+        normalized = normalize_batch(queries)
+        cached = self.db.get_cached_searches(normalized, filter_empty=True)
+
+        results = []
+        for query, norm in zip(queries, normalized):
+            hit = cached.get(norm)
+            if hit:
+                results.append({
+                    'query': query,
+                    'normalized_query': norm,
+                    'provider': hit['provider'],
+                    'results': hit['results'],
+                    'status': hit['status'],
+                    'cached': True
+                })
+                continue
+
+            if self._is_globally_empty(norm):
+                results.append({
+                    'query': query,
+                    'normalized_query': norm,
+                    'provider': 'none',
+                    'results': [],
+                    'status': 'empty',
+                    'cached': True
+                })
+                continue
+
+            result = self._search_through_providers(norm, entity_type=entity_type)
+            if result['status'] == 'ok':
+                # Duplicates later in the batch reuse this result
+                cached[norm] = result
+            results.append({
+                'query': query,
+                'normalized_query': norm,
+                'provider': result['provider'],
+                'results': result['results'],
+                'status': result['status'],
+                'cached': False
+            })
+
+        return results
+
     def _search_through_providers(self, normalized_query: str, entity_type: Optional[str] = None) -> Dict[str, Any]:
         """
-        Cascade through search providers until we get results
+        Search providers until we get results
         
-        Provider order: DuckDuckGo → Google CSE → Wikidata → Wikipedia
-        Financial/business queries work better with DuckDuckGo and Google CSE
+        Free providers are queried as hedged requests: the provider with most
+        cached successes for the entity type starts at once, the others follow
+        after HEDGE_DELAY_SECONDS head-starts (or as soon as nothing is in
+        flight). The first 'ok' response wins.
+        Google CSE is queried only if all of them failed (daily quota).
         
         Args:
             normalized_query: Normalized search query
             entity_type: Type of entity to determine which providers to use
         """
-        # Provider order: DuckDuckGo, Google CSE, Wikipedia, Wikidata
-        # Wikipedia has better snippets (5 sentences), Wikidata has short descriptions
-        providers = [
-            (self.duckduckgo, 'duckduckgo'),
-        ]
+        # Re-learn provider order now and then (counter races between threads are harmless)
+        self._cascades_since_order += 1
+        if self._cascades_since_order >= PROVIDER_ORDER_REFRESH_QUERIES:
+            self._load_provider_order()
         
-        # Add Google CSE if available (second priority)
-        if self.google_cse:
-            providers.append((self.google_cse, 'google_cse'))
-        
-        # Add Wikipedia and Wikidata as fallback
-        # Wikipedia prioritized over Wikidata because of longer snippets
-        providers.extend([
-            (self.wikipedia, 'wikipedia'),
-            (self.wikidata, 'wikidata'),
-        ])
-        
-        # Skip wiki providers for symbols (they don't work well for stock symbols)
-        if entity_type == 'symbol':
-            providers = [(p, n) for p, n in providers if n not in ('wikipedia', 'wikidata')]
+        providers = self._provider_chains.get(entity_type)
+        if providers is None:
+            providers = self._symbol_chain if entity_type == 'symbol' else self._default_chain
         
         # Track failed providers
         failed_providers = []
         
+        # Skip providers in backoff or out of client-side quota (no request, no 429)
+        active = []
         for provider, name in providers:
-            # Skip if provider is in backoff
-            if self.db.is_provider_in_backoff(name):
+            if self.rate_limiter.in_backoff(name):
                 failed_providers.append({'name': name, 'reason': 'backoff'})
-                continue
-            
-            # Perform search
-            results, http_code, error = provider.search(normalized_query)
-            
-            # Handle rate limiting
-            if http_code == 429:
-                failed_providers.append({'name': name, 'reason': 'ratelimited'})
-                # Set backoff
-                self._set_backoff(name)
-                self.db.save_search_result(
-                    provider=name,
-                    normalized_query=normalized_query,
-                    results_json=[],
-                    status='ratelimited',
-                    http_code=429,
-                    error=error
-                )
-                continue
+            elif not provider.has_quota():
+                failed_providers.append({'name': name, 'reason': 'quota'})
+            else:
+                active.append((provider, name))
+        
+        result = self._hedged_search(active, normalized_query, failed_providers, entity_type)
+        if result:
+            return result
+        
+        # Google CSE as last resort
+        if self.google_cse:
+            if self.rate_limiter.in_backoff('google_cse'):
+                failed_providers.append({'name': 'google_cse', 'reason': 'backoff'})
+            elif not self.google_cse.has_quota():
+                # Daily quota used up: don't spend a request on a guaranteed 429
+                failed_providers.append({'name': 'google_cse', 'reason': 'quota'})
+            else:
+                results, http_code, error, retry_after = self.google_cse.search(normalized_query)
+                status = self._handle_provider_response('google_cse', normalized_query, results, http_code,
+                                                        error, retry_after, failed_providers, entity_type)
+                if status == 'ok':
+                    return {
+                        'provider': 'google_cse',
+                        'results': results,
+                        'status': status,
+                        'failed_providers': failed_providers
+                    }
+        
+        # All providers exhausted
+        # If every one of them answered "empty" (not backoff/error), remember the
+        # query as unresolvable for a while so repeated searches skip the cascade
+        if failed_providers and all(f['reason'] == 'empty' for f in failed_providers):
+            self.db.record_failure('none', normalized_query, 'empty_global',
+                                   valid_until_utc=self._valid_until('empty_global', NEGATIVE_CACHE_TTL_MINUTES))
+            self._empty_until[normalized_query] = time.time() + NEGATIVE_CACHE_TTL_MINUTES * 60
+        
+        return {
+            'provider': 'none',
+            'results': [],
+            'status': 'empty',
+            'failed_providers': failed_providers
+        }
+    
+    def _hedged_search(self, providers: List[tuple], normalized_query: str,
+                       failed_providers: List[Dict[str, Any]],
+                       entity_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Query providers in parallel with staggered starts, first 'ok' wins
+        
+        The head-start of a provider is counted from the moment its request is
+        actually sent, not from submission: time spent waiting for the rate
+        limiter doesn't make the next provider start early.
+        
+        Responses are handled in this thread as they complete. Providers still
+        running when a winner is found are not waited for; their responses are
+        handled (and cached) from the worker thread when they arrive.
+        
+        Returns:
+            Result dict of the winning provider or None if all failed
+        """
+        pending = list(providers)
+        in_flight = {}
+        started = None  # Future with send time (time.monotonic()) of the last started provider
+        
+        while pending or in_flight:
+            # Start next provider when the last one has been on the network for
+            # its head-start or nothing else is running
+            while pending and (not in_flight or (
+                    started.done() and time.monotonic() >= started.result() + HEDGE_DELAY_SECONDS)):
+                provider, name = pending.pop(0)
+                started = Future()
+                in_flight[self._executor.submit(
+                    provider.search, normalized_query,
+                    lambda s=started: s.set_result(time.monotonic())
+                )] = name
             
-            # Handle server errors (5xx)
-            if http_code and 500 <= http_code < 600:
-                # Exponential backoff
-                attempts = self.db.update_search_attempts(name, normalized_query)
-                if attempts < 5:  # Don't backoff forever
-                    self._set_backoff(name, exponential=True, attempts=attempts)
-                    self.db.save_search_result(
-                        provider=name,
-                        normalized_query=normalized_query,
-                        results_json=[],
-                        status='error',
-                        http_code=http_code,
-                        error=error
-                    )
-                continue
+            waiting = set(in_flight)
+            timeout = None
+            if pending:
+                if started.done():
+                    timeout = max(0.0, started.result() + HEDGE_DELAY_SECONDS - time.monotonic())
+                else:
+                    waiting.add(started)
+            done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
             
-            # Determine status
-            if error:
-                status = 'error'
-                failed_providers.append({'name': name, 'reason': 'error', 'error': error})
-            elif not results:
-                status = 'empty'
-                failed_providers.append({'name': name, 'reason': 'empty'})
-                
-                # Check for consecutive empty responses from DuckDuckGo
-                # If multiple empty responses in recent time, it might be temporarily blocked
-                if name == 'duckduckgo':
-                    recent_empty = self.db.get_recent_empty_count('duckduckgo', minutes=30)
-                    if recent_empty >= 3:
-                        # Multiple empty responses - likely temporary block
-                        # Set short backoff (5 minutes) to let it recover
-                        print(f"  DuckDuckGo returned {recent_empty} empty responses in last 30 min, setting short backoff")
-                        self._set_backoff(name, delay_minutes=5)
-                        backoff_until = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
-                        self.db.save_search_result(
-                            provider=name,
-                            normalized_query=normalized_query,
-                            results_json=[],
-                            status='empty',
-                            http_code=http_code,
-                            error=None,
-                            backoff_until_utc=backoff_until
+            for fut in done:
+                if fut not in in_flight:
+                    continue  # Request of the last provider was sent
+                name = in_flight.pop(fut)
+                results, http_code, error, retry_after = self._future_response(fut)
+                status = self._handle_provider_response(name, normalized_query, results, http_code,
+                                                        error, retry_after, failed_providers, entity_type)
+                if status == 'ok':
+                    # Losers not started yet (executor busy with other searches) are
+                    # cancelled; running ones still get cached when they finish
+                    for other, other_name in in_flight.items():
+                        if other.cancel():
+                            continue
+                        handled = Future()
+                        with self._hedge_losers_lock:
+                            self._hedge_losers.add(handled)
+                        other.add_done_callback(
+                            lambda f, n=other_name, h=handled: self._finish_hedge_loser(
+                                f, n, normalized_query, entity_type, h)
                         )
-                        continue  # Skip to next provider
-            else:
-                status = 'ok'
+                    return {
+                        'provider': name,
+                        'results': results,
+                        'status': status,
+                        'failed_providers': failed_providers
+                    }
+        
+        return None
+    
+    def _finish_hedge_loser(self, fut: Future, name: str, normalized_query: str,
+                            entity_type: Optional[str], handled: Future):
+        """Handle (cache) the response of a hedge loser, then resolve its `handled` future"""
+        try:
+            self._handle_provider_response(name, normalized_query, *self._future_response(fut), [], entity_type)
+        finally:
+            with self._hedge_losers_lock:
+                self._hedge_losers.discard(handled)
+            handled.set_result(None)
+    
+    def _wait_hedge_losers(self):
+        """Wait until the responses of all running hedge losers are handled"""
+        with self._hedge_losers_lock:
+            handled = list(self._hedge_losers)
+        wait(handled)
+    
+    @staticmethod
+    def _future_response(fut: Future) -> tuple:
+        """(results, http_code, error, retry_after) of a provider search future"""
+        try:
+            return fut.result()
+        except Exception as e:
+            return [], None, str(e), None
+    
+    def _handle_provider_response(self, name: str, normalized_query: str, results: list,
+                                  http_code: Optional[int], error: Optional[str],
+                                  retry_after: Optional[float],
+                                  failed_providers: List[Dict[str, Any]],
+                                  entity_type: Optional[str] = None) -> str:
+        """
+        Apply backoff rules to a provider response and save it to cache
+        
+        Returns:
+            Status of the response: 'ok' | 'empty' | 'error' | 'ratelimited' | 'quota' | 'circuit' | 'backoff'
+        """
+        # Refused locally: no request was made, nothing to back off or cache
+        reason = _LOCAL_REFUSALS.get(error)
+        if reason:
+            failed_providers.append({'name': name, 'reason': reason})
+            return reason
+        
+        # Handle rate limiting
+        if http_code == 429:
+            failed_providers.append({'name': name, 'reason': 'ratelimited'})
+            # Set backoff and record once per backoff window
+            # (a concurrent search may have hit the same 429 already)
+            if not self.rate_limiter.in_backoff(name):
+                # Respect server's Retry-After if it sent one
+                self._set_backoff(name, delay_minutes=retry_after / 60 if retry_after else None)
+                self.db.record_failure(name, normalized_query, 'ratelimited', http_code=429, error=error,
+                                       valid_until_utc=self._valid_until('ratelimited'))
+            return 'ratelimited'
+        
+        # Handle server errors (5xx)
+        if http_code and 500 <= http_code < 600:
+            failed_providers.append({'name': name, 'reason': 'error', 'error': error})
+            # Exponential backoff on consecutive server errors of the provider (capped delay)
+            attempts = self.db.increment_provider_attempts(name)
+            self._provider_attempts[name] = attempts
+            self._set_backoff(name, exponential=True, attempts=attempts)
+            self.db.record_failure(name, normalized_query, 'error', http_code=http_code, error=error,
+                                   valid_until_utc=self._valid_until('error'))
+            return 'error'
+        
+        # Determine status
+        if error:
+            status = 'error'
+            failed_providers.append({'name': name, 'reason': 'error', 'error': error})
+        elif not results:
+            status = 'empty'
+            failed_providers.append({'name': name, 'reason': 'empty'})
             
-            # Save to cache
+            # Check for consecutive empty responses from DuckDuckGo
+            # If multiple empty responses in recent time, it might be temporarily blocked
+            if name == 'duckduckgo':
+                recent_empty = self.db.get_recent_empty_count('duckduckgo', minutes=30)
+                if recent_empty >= 3:
+                    # Multiple empty responses - likely temporary block
+                    # Set short backoff (5 minutes) to let it recover
+                    print(f"  DuckDuckGo returned {recent_empty} empty responses in last 30 min, setting short backoff")
+                    self._set_backoff(name, delay_minutes=5)
+        else:
+            status = 'ok'
+        
+        # Save to cache (failures only need the status row, no results payload)
+        if status == 'ok':
+            if self._provider_attempts.get(name):
+                # Provider recovered - next server error starts backoff from scratch
+                self._provider_attempts[name] = 0
+                self.db.reset_provider_attempts(name)
             self.db.save_search_result(
                 provider=name,
                 normalized_query=normalized_query,
                 results_json=results,
                 status=status,
                 http_code=http_code,
-                error=error
+                error=error,
+                valid_until_utc=self._valid_until(status),
+                entity_type=entity_type
             )
-            
-            # Return first non-empty result with failed providers info
-            if status == 'ok':
-                return {
-                    'provider': name,
-                    'results': results,
-                    'status': status,
-                    'failed_providers': failed_providers
-                }
+        else:
+            self.db.record_failure(name, normalized_query, status, http_code=http_code, error=error,
+                                   valid_until_utc=self._valid_until(status))
         
-        # All providers exhausted
-        return {
-            'provider': 'none',
-            'results': [],
-            'status': 'empty',
-            'failed_providers': failed_providers
-        }
+        return status
+    
+    @staticmethod
+    def _valid_until(status: str, minutes: Optional[int] = None) -> str:
+        """Expiry timestamp for a cache row with given status (TTL from CACHE_TTL_MINUTES)"""
+        if minutes is None:
+            minutes = CACHE_TTL_MINUTES.get(status, CACHE_TTL_MINUTES['error'])
+        return (datetime.now(timezone.utc) + timedelta(minutes=minutes)).isoformat()
     
-    def _set_backoff(self, provider: str, exponential: bool = False, attempts: int = 1, delay_minutes: Optional[int] = None):
+    def _set_backoff(self, provider: str, exponential: bool = False, attempts: int = 1, delay_minutes: Optional[float] = None):
         """
         Set backoff period for provider
         
@@ -252,40 +743,23 @@ class WebSearchManager:
         
         self.rate_limiter.set_backoff(provider, delay)
         
-        # Also update in database
-        backoff_until = (datetime.now(timezone.utc) + timedelta(minutes=delay)).isoformat()
-        with self.db.get_cursor() as cursor:
-            cursor.execute("""
-                UPDATE web_search_cache 
-                SET backoff_until_utc = ? 
-                WHERE provider = ? AND backoff_until_utc IS NULL
-            """, (backoff_until, provider))
+        # Also update in database (one row per provider, Unix seconds)
+        self.db.set_provider_backoff(provider, int(time.time() + delay * 60))
     
     def check_backoff_status(self, silence: bool = False):
         """Check which providers are in backoff"""
         providers = ['wikipedia', 'wikidata', 'duckduckgo', 'google_cse']
         in_backoff = []
         
+        backoffs = self.db.get_provider_backoffs()
+        now = time.time()
+        
         for provider in providers:
-            if self.db.is_provider_in_backoff(provider):
-                # Get backoff until time
-                with self.db.get_cursor() as cursor:
-                    cursor.execute("""
-                        SELECT backoff_until_utc FROM web_search_cache 
-                        WHERE provider = ? AND backoff_until_utc IS NOT NULL
-                        LIMIT 1
-                    """, (provider,))
-                    row = cursor.fetchone()
-                    if row:
-                        backoff_until = row[0]
-                        try:
-                            backoff_dt = datetime.fromisoformat(backoff_until)
-                            now = datetime.now(timezone.utc).replace(tzinfo=None)
-                            if backoff_dt > now:
-                                remaining = (backoff_dt - now).total_seconds() / 60  # minutes
-                                in_backoff.append((provider, backoff_until, remaining))
-                        except:
-                            pass
+            backoff_until = backoffs.get(provider)
+            if backoff_until and backoff_until > now:
+                until = datetime.fromtimestamp(backoff_until, timezone.utc).isoformat()
+                remaining = (backoff_until - now) / 60  # minutes
+                in_backoff.append((provider, until, remaining))
         
         if in_backoff:
             print("\n⚠️  Providers in backoff:")
@@ -297,14 +771,19 @@ class WebSearchManager:
         
         return in_backoff
     
-    def search_batch(self, entities: List[Dict[str, Any]], max_searches: Optional[int] = None, start_from: int = 0):
+    def search_batch(self, entities: List[Dict[str, Any]], max_searches: Optional[int] = None, start_from: int = 0,
+                     quiet: bool = False):
         """
         Search multiple entities in batch with progress tracking and statistics
         
+        Per-entity progress goes to the buffered 'web_search.batch' logger;
+        the final summary is always printed.
+        
         Args:
             entities: List of entity dictionaries with 'name', 'type', 'role' keys
             max_searches: Maximum number of searches to perform (None = all)
             start_from: Start from this index (useful for resuming)
+            quiet: Drop per-entity progress output (only warnings and summary)
             
         Returns:
             Dictionary with statistics about the batch search
@@ -315,19 +794,27 @@ class WebSearchManager:
         print(f"\nStarting search for {min(max_searches, total)} entities...")
         print(f"Starting from index {start_from}")
         
+        log.setLevel(logging.WARNING if quiet else logging.INFO)
+        
+        # Refresh backoff states and negative cache once per batch (single query each),
+        # then only in-memory checks
+        self._load_backoffs()
+        self._load_negative_cache()
+        
         # Track statistics
         stats = {
             'total': 0,
             'success': 0,
             'empty': 0,
             'error': 0,
-            'by_provider': {},
+            'by_provider': Counter(),
             'failed_searches': []
         }
         
         # Time tracking
         start_time = time.time()
-        task_times = []  # Track time for each task
+        task_times = deque(maxlen=512)  # Durations of the most recent tasks
+        task_range = _WindowMinMax(512)  # Their fastest/slowest without rescanning
         
         end_index = min(start_from + max_searches, total)
         entities_to_search = entities[start_from:end_index]
@@ -341,108 +828,139 @@ class WebSearchManager:
             else:
                 return f"{int(seconds / 3600)}h {int((seconds % 3600) / 60)}m"
         
-        for i, entity in enumerate(entities_to_search, start=start_from):
+        def search_entity(entity):
+            """Run a single search in a worker thread, returning (result or exception, duration)"""
             task_start = time.time()
-            
-            name = entity.get('name', '').strip()
-            if not name:
-                continue
-            
-            stats['total'] += 1
-            
-            # Calculate elapsed time and ETA
-            elapsed_time = time.time() - start_time
-            remaining = total - stats['total'] + 1
-            
-            if task_times:
-                fastest_time = min(task_times)
-                slowest_time = max(task_times)
-                eta_best = fastest_time * remaining
-                eta_worst = slowest_time * remaining
-            else:
-                eta_best = eta_worst = 0
-            
-            print(f"\n[{i+1}/{total}] Searching: {name}")
-            print(f"  Type: {entity.get('type', 'unknown')}, Role: {entity.get('role', 'unknown')}")
-            print(f"  Elapsed: {format_time(elapsed_time)} | Remaining: {remaining} tasks")
-            if task_times:
-                print(f"  ETA (best/worst): {format_time(eta_best)} / {format_time(eta_worst)}")
-            
             try:
-                entity_type = entity.get('type', None)
-                
-                # Check if all providers are in backoff for this entity type
-                if entity_type != 'symbol':
-                    # Non-symbols can use all providers
-                    providers_to_check = ['wikipedia', 'wikidata', 'duckduckgo']
-                else:
-                    # Symbols skip wiki providers
-                    providers_to_check = ['duckduckgo']
-                
-                if self.google_cse:
-                    providers_to_check.append('google_cse')
-                
-                all_blocked = True
-                for provider in providers_to_check:
-                    # If ANY provider is NOT in backoff, we can try
-                    if not self.db.is_provider_in_backoff(provider):
-                        all_blocked = False
-                        break
-                
-                if all_blocked:
-                    print(f"  ⚠️  All available providers are in backoff, skipping for now")
-                    stats['error'] += 1
-                    continue
-                
-                result = self.search(name, force_refresh=False, entity_type=entity_type)
+                result = self.search(entity['name'].strip(), force_refresh=False, entity_type=entity.get('type'))
+            except Exception as e:
+                result = e
+            return result, time.time() - task_start
+        
+        # Searches run on a bounded pool; the rate limiter keeps each provider within its RPS.
+        # Printing and statistics stay in this (main) thread, so no extra locking is needed.
+        with ThreadPoolExecutor(max_workers=SEARCH_BATCH_WORKERS, thread_name_prefix='search_batch') as pool:
+            for offset in range(0, len(entities_to_search), PREFETCH_WINDOW):
+                window = entities_to_search[offset:offset + PREFETCH_WINDOW]
                 
-                # Track task time
-                task_time = time.time() - task_start
-                task_times.append(task_time)
+                # Warm in-memory cache for this window of entities with one SQL query
+                self._prefetch([e.get('name', '') for e in window])
                 
-                # Update statistics
-                stats['by_provider'][result['provider']] = stats['by_provider'].get(result['provider'], 0) + 1
+                # Cache writes are committed once per finished entity instead of per
+                # statement; no write transaction stays open across the whole window
+                with self.db.batch():
+                    futures = {}
+                    for i, entity in enumerate(window, start=start_from + offset):
+                        name = entity.get('name', '').strip()
+                        if not name:
+                            continue
+                    
+                        entity_type = entity.get('type', None)
+                    
+                        # Check if all providers are in backoff for this entity type
+                        if entity_type != 'symbol':
+                            # Non-symbols can use all providers
+                            providers_to_check = ['wikipedia', 'wikidata', 'duckduckgo']
+                        else:
+                            # Symbols skip wiki providers
+                            providers_to_check = ['duckduckgo']
+                    
+                        if self.google_cse:
+                            providers_to_check.append('google_cse')
+                    
+                        # If ANY provider is NOT in backoff, we can try
+                        if all(self.rate_limiter.in_backoff(provider) for provider in providers_to_check):
+                            stats['total'] += 1
+                            stats['error'] += 1
+                            log.warning(f"\n[{i+1}/{total}] {name}\n  ⚠️  All available providers are in backoff, skipping for now")
+                            continue
+                    
+                        futures[pool.submit(search_entity, entity)] = (i, entity, name)
                 
-                status = result['status']
-                if status == 'ok':
-                    stats['success'] += 1
-                elif status == 'empty':
-                    stats['empty'] += 1
-                else:
-                    stats['error'] += 1
-                    stats['failed_searches'].append({
-                        'name': name,
-                        'provider': result['provider'],
-                        'status': status,
-                        'results_count': len(result['results'])
-                    })
+                    for fut in as_completed(futures):
+                        i, entity, name = futures[fut]
+                        result, task_time = fut.result()
+                        self.db.commit()
+                    
+                        stats['total'] += 1
+                    
+                        # Update statistics (always, independent of log level)
+                        if isinstance(result, Exception):
+                            stats['error'] += 1
+                            stats['failed_searches'].append({
+                                'name': name,
+                                'error': str(result)
+                            })
+                        else:
+                            # Track task time
+                            task_times.append(task_time)
+                            task_range.append(task_time)
+                        
+                            stats['by_provider'][result['provider']] += 1
+                        
+                            status = result['status']
+                            bucket = _STATUS_BUCKET.get(status, 'error')
+                            stats[bucket] += 1
+                            if bucket == 'error':
+                                stats['failed_searches'].append({
+                                    'name': name,
+                                    'provider': result['provider'],
+                                    'status': status,
+                                    'results_count': len(result['results'])
+                                })
+                    
+                        if not log.isEnabledFor(logging.INFO):
+                            continue
+                    
+                        # Calculate elapsed time and ETA
+                        elapsed_time = time.time() - start_time
+                        remaining = end_index - start_from - stats['total']
+                    
+                        # One log record per entity instead of a print() per line
+                        lines = [
+                            f"\n[{i+1}/{total}] Searched: {name}",
+                            f"  Type: {entity.get('type', 'unknown')}, Role: {entity.get('role', 'unknown')}",
+                            f"  Elapsed: {format_time(elapsed_time)} | Remaining: {remaining} tasks",
+                        ]
+                        if task_times:
+                            eta_best = task_range.min * remaining / SEARCH_BATCH_WORKERS
+                            eta_median = statistics.median(task_times) * remaining / SEARCH_BATCH_WORKERS
+                            eta_worst = task_range.max * remaining / SEARCH_BATCH_WORKERS
+                            lines.append(f"  ETA (best/median/worst): {format_time(eta_best)} / {format_time(eta_median)} / {format_time(eta_worst)}")
+                    
+                        if isinstance(result, Exception):
+                            lines.append(f"  Error: {result}")
+                            log.info("\n".join(lines))
+                            continue
+                    
+                        lines.append(f"  Status: {result['status']}")
+                        lines.append(f"  Provider: {result['provider']}")
+                        lines.append(f"  Results found: {len(result['results'])}")
+                    
+                        # Show failed providers if any
+                        if 'failed_providers' in result and result['failed_providers']:
+                            failed = result['failed_providers']
+                            failed_names = [f"{f['name']} ({f['reason']})" for f in failed]
+                            lines.append(f"  Failed providers: {', '.join(failed_names)}")
+                    
+                        if result['results']:
+                            first = result['results'][0]
+                            lines.append(f"  Top result: {first['title'][:80]}")
+                            if first.get('snippet'):
+                                lines.append(f"  Top snippet: {first['snippet'][:200]}...")
+                        else:
+                            lines.append(f"  No results found from {result['provider']}")
+                    
+                        log.info("\n".join(lines))
+                    
+                    # Hedge losers of this window must not write after its batch ended
+                    self._wait_hedge_losers()
                 
-                print(f"  Status: {status}")
-                print(f"  Provider: {result['provider']}")
-                print(f"  Results found: {len(result['results'])}")
-                
-                # Show failed providers if any
-                if 'failed_providers' in result and result['failed_providers']:
-                    failed = result['failed_providers']
-                    failed_names = [f"{f['name']} ({f['reason']})" for f in failed]
-                    print(f"  Failed providers: {', '.join(failed_names)}")
-                
-                if result['results']:
-                    first = result['results'][0]
-                    print(f"  Top result: {first['title'][:80]}")
-                    if first.get('snippet'):
-                        print(f"  Top snippet: {first['snippet'][:200]}...")
-                else:
-                    print(f"  No results found from {result['provider']}")
-            except Exception as e:
-                stats['error'] += 1
-                stats['failed_searches'].append({
-                    'name': name,
-                    'error': str(e)
-                })
-                print(f"  Error: {e}")
+                # Write out buffered progress once per window
+                _flush_batch_log()
         
         # Print statistics summary
+        _flush_batch_log()
         total_time = time.time() - start_time
         
         print("\n" + "=" * 60)
@@ -53,10 +53,12 @@ def test_single_provider(provider_name: str, query: str, db=None):
     
     # Perform search
     try:
-        results, http_code, error = provider.search(normalized)
+        results, http_code, error, retry_after = provider.search(normalized)
         
         print(f"\nHTTP Code: {http_code}")
         print(f"Error: {error if error else 'None'}")
+        if retry_after:
+            print(f"Retry-After: {retry_after}s")
         print(f"Results found: {len(results)}")
         
         if results:
@@ -3,65 +3,474 @@
 """
 
 import json
+import os
 import sqlite3
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from pathlib import Path
-from datetime import datetime, timedelta, time
-from typing import List, Dict, Tuple, Optional
+from datetime import datetime, time, timezone
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, NamedTuple, Tuple, Optional
+from zoneinfo import ZoneInfo
 import logging
 
+try:
+    import orjson  # Быстрый разбор symbols_json и запись результатов (C-реализация)
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+try:
+    from numba import njit  # Опционально: JIT-компиляция числового ядра анализа
+except ImportError:
+    njit = None
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Сколько дней свечей (символ, дата) держать в памяти: одна новость на символ-день
+# не должна заново читать parquet, если этот день уже читался для другой новости
+CANDLES_CACHE_SIZE = 1024
+
+# Торговые сессии считаются по времени Нью-Йорка (EST/EDT с учетом перехода)
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# Кэш разобранных новостей news_raw на диске (дописывается по news_id > максимального в кэше).
+# symbols: null - symbols_json не разобрался, [] - символов нет
+NEWS_CACHE_SCHEMA = pa.schema([
+    ('news_id', pa.int64()),
+    ('created_at_utc', pa.string()),
+    ('symbols', pa.list_(pa.string())),
+    ('headline', pa.string()),
+    ('source', pa.string()),
+])
+
+# Сколько разных времен новостей держать в кэше статуса торговой сессии
+SESSION_CACHE_SIZE = 8192
+
+# Сколько групп (символ, дата) отдавать процессу-воркеру за раз
+ANALYSIS_CHUNKSIZE = 16
+
+# Время свечей хранится как int64 наносекунд от эпохи
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+# Границы окон относительно времени новости, нс
+_PRE_START_NS = -60 * _NS_PER_MINUTE
+_PRE_END_NS = -5 * _NS_PER_MINUTE
+_POST_15_NS = 15 * _NS_PER_MINUTE
+_POST_60_NS = 60 * _NS_PER_MINUTE
+_POST_180_NS = 180 * _NS_PER_MINUTE
+
+
+# Границы сессий, микросекунды от полуночи ET
+_US_PER_MINUTE = 60 * 1_000_000
+_PRE_MARKET_START_US = (4 * 60) * _US_PER_MINUTE       # 4:00
+_REGULAR_START_US = (9 * 60 + 30) * _US_PER_MINUTE     # 9:30
+_REGULAR_END_US = (16 * 60) * _US_PER_MINUTE           # 16:00
+_AFTER_MARKET_END_US = (20 * 60) * _US_PER_MINUTE      # 20:00
+
+
+@lru_cache(maxsize=SESSION_CACHE_SIZE)
+def _session_info(utc_time: str) -> Tuple[bool, str]:
+    """Статус рынка и тип торговой сессии для времени новости (кэш по строке ISO)"""
+    # Парсим UTC время (Python 3.11+ сам разбирает суффикс 'Z')
+    dt = datetime.fromisoformat(utc_time)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    
+    # Конвертируем в ET (Eastern Time)
+    et_time = dt.astimezone(MARKET_TZ)
+    
+    # Проверяем, что это рабочий день (понедельник-пятница)
+    if et_time.weekday() >= 5:  # 5=суббота, 6=воскресенье
+        return False, "weekend"
+    
+    # Время дня в мкс от полуночи ET: те же границы, что у _session_info_batch
+    tod = ((et_time.hour * 60 + et_time.minute) * 60 + et_time.second) * 1_000_000 + et_time.microsecond
+    
+    # Определяем тип торговой сессии
+    if _PRE_MARKET_START_US <= tod < _REGULAR_START_US:
+        return True, "pre_market"
+    elif _REGULAR_START_US <= tod <= _REGULAR_END_US:
+        return True, "regular_hours"
+    elif _REGULAR_END_US < tod <= _AFTER_MARKET_END_US:
+        return True, "after_hours"
+    else:
+        return False, "closed"
+
+
+def _parse_utc_batch(utc_times: List[str]) -> pd.Series:
+    """Разобрать времена новостей (ISO 8601) одним вызовом: UTC-aware, неразбираемые - NaT"""
+    return pd.to_datetime(pd.Series(utc_times, dtype=object), utc=True, format='ISO8601', errors='coerce')
+
+
+def _session_info_batch(parsed: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    То же, что _session_info, сразу для всех времен новостей (из _parse_utc_batch)
+    
+    Returns:
+        (рынок открыт - bool, тип сессии - str) по позициям parsed;
+        неразбираемое время - (False, "unknown")
+    """
+    et = parsed.dt.tz_convert(MARKET_TZ)
+    # Поля времени без NaT приходят как int32: считаем во float64, иначе мкс переполняются
+    hour, minute, second, microsecond, weekday = (
+        part.to_numpy(dtype=np.float64, na_value=np.nan)
+        for part in (et.dt.hour, et.dt.minute, et.dt.second, et.dt.microsecond, et.dt.weekday)
+    )
+    tod = ((hour * 60 + minute) * 60 + second) * 1_000_000 + microsecond
+    
+    session = np.select(
+        [np.isnan(tod),
+         weekday >= 5,
+         (tod >= _PRE_MARKET_START_US) & (tod < _REGULAR_START_US),
+         (tod >= _REGULAR_START_US) & (tod <= _REGULAR_END_US),
+         (tod > _REGULAR_END_US) & (tod <= _AFTER_MARKET_END_US)],
+        ["unknown", "weekend", "pre_market", "regular_hours", "after_hours"],
+        default="closed",
+    )
+    is_open = np.isin(session, ("pre_market", "regular_hours", "after_hours"))
+    return is_open, session
+
+
+# Из parquet читаются только колонки, нужные анализу (плюс время)
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+class DayCandles(NamedTuple):
+    """Свечи символа за день: время в нс от эпохи (int64, по возрастанию) и цены float64"""
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+def _table_to_candles(table: pa.Table, time_column: str) -> DayCandles:
+    """Arrow-таблица свечей -> DayCandles (строковое время приводится к timestamp)"""
+    time_values = table.column(time_column)
+    if not pa.types.is_timestamp(time_values.type):
+        time_values = pc.cast(time_values, pa.timestamp('ns'))
+    ts = time_values.to_numpy().astype('datetime64[ns]').view('i8')
+    prices = [table.column(name).to_numpy().astype(np.float64, copy=False) for name in CANDLE_COLUMNS]
+    if ts.size > 1 and not (ts[1:] >= ts[:-1]).all():
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        prices = [column[order] for column in prices]
+    return DayCandles(ts, *prices)
+
+
+@lru_cache(maxsize=CANDLES_CACHE_SIZE)
+def _read_day_candles(market_data_path: str, symbol: str, date_str: str) -> Optional[DayCandles]:
+    """
+    Свечи символа за UTC-день (кэш по (путь, символ, дата))
+    
+    Хранилище пишет по файлу на UTC-день, поэтому читается только сам файл дня
+    и только колонки CANDLE_COLUMNS плюс время. Колонка времени - первая с типом
+    timestamp, иначе строковая колонка timestamp.
+    """
+    file_path = Path(market_data_path) / symbol / f"{date_str}.parquet"
+    if not file_path.exists():
+        return None
+    
+    parquet_file = pq.ParquetFile(file_path)
+    time_column = next((field.name for field in parquet_file.schema_arrow
+                        if pa.types.is_timestamp(field.type)), 'timestamp')
+    table = parquet_file.read(columns=[time_column] + CANDLE_COLUMNS, use_threads=True)
+    return _table_to_candles(table, time_column)
+
+
+@lru_cache(maxsize=CANDLES_CACHE_SIZE)
+def _day_arrays(market_data_path: str, symbol: str, date_str: str) -> Tuple[np.ndarray, ...]:
+    """Массивы свечей дня (см. AnomalyNewsFinder._day_arrays), считаются один раз на (символ, дата)"""
+    return AnomalyNewsFinder._day_arrays(_read_day_candles(market_data_path, symbol, date_str))
+
+
+# Поля результата _price_window_kernel
+(_K_PRICE_AT_NEWS, _K_MAX_HIGH, _K_MIN_LOW, _K_PRE_CAR_60M, _K_POST_CAR_15M,
+ _K_POST_CAR_60M, _K_POST_CAR_180M, _K_PRE_RV_60M, _K_POST_RV_60M,
+ _K_PRE_YZ_60M, _K_POST_YZ_60M) = range(11)
+_K_COUNT = 11
+
+# Строки массива компонент Янга-Чжана (AnomalyNewsFinder._yang_zhang_components)
+_YZ_OVERNIGHT, _YZ_OPEN_CLOSE, _YZ_ROGERS_SATCHELL = range(3)
+
+# Смещения границ окон от времени новости, для которых нужна последняя свеча <= t
+(_B_PRE_START, _B_PRE_END, _B_NEWS, _B_POST_15, _B_POST_60, _B_POST_180) = range(6)
+_RIGHT_BOUND_OFFSETS_NS = np.array(
+    [_PRE_START_NS, _PRE_END_NS, 0, _POST_15_NS, _POST_60_NS, _POST_180_NS], dtype=np.int64)
+
+
+def _price_window_kernel(ts, high, low, tp, log_r, yz, news_ns):
+    """
+    Числовое ядро find_price_changes: все метрики окна новости за один вызов
+    
+    ts - время свечей в нс (по возрастанию, непустой), yz - компоненты Янга-Чжана
+    по свечам (строки _YZ_*), news_ns - время новости в нс.
+    Returns:
+        (число свечей в 3-часовом окне, массив метрик по индексам _K_*);
+        метрика, которую нельзя посчитать, - NaN
+    """
+    out = np.full(_K_COUNT, np.nan)
+    n = ts.size
+
+    # Все границы окон "по правому краю" - одним бинарным поиском, каждая ровно один раз
+    right = np.searchsorted(ts, news_ns + _RIGHT_BOUND_OFFSETS_NS, side='right')
+    i_pre_start = right[_B_PRE_START]
+    i_pre_end = right[_B_PRE_END]
+    i_after_news = right[_B_NEWS]
+    i_post_15 = right[_B_POST_15]
+    i_post_60 = right[_B_POST_60]
+    i_post_180 = right[_B_POST_180]
+    # Первая свеча >= news
+    i_news = np.searchsorted(ts, news_ns)
+
+    # Базовое 3-часовое окно после новости (или последние 3 часа данных)
+    if news_ns > ts[n - 1]:
+        i0 = np.searchsorted(ts, ts[n - 1] - _POST_180_NS)
+        i1 = n
+    else:
+        i0 = i_news
+        i1 = i_post_180
+    if i1 <= i0:
+        return 0, out
+
+    # Цена в момент новости: первая свеча >= news, иначе последняя перед ней
+    p_news = tp[i_news] if i_news < n else tp[n - 1]
+    out[_K_PRICE_AT_NEWS] = p_news
+
+    # max(high)/min(low) по окну, NaN пропускаются
+    out[_K_MAX_HIGH] = np.nanmax(high[i0:i1])
+    out[_K_MIN_LOW] = np.nanmin(low[i0:i1])
+
+    # Точки цен для CAR: концы окон "не позже" (последняя свеча <= t), начало post - первая свеча >= news
+    if i_pre_start > 0 and i_pre_end > 0:
+        out[_K_PRE_CAR_60M] = _cum_change_pct(tp[i_pre_start - 1], tp[i_pre_end - 1])
+    if i_news < n:
+        p0_post = tp[i_news]
+        # Нет свечи <= news+X (новость задолго до первой свечи дня) - индекс -1, метрика остается NaN
+        if i_post_15 > 0:
+            out[_K_POST_CAR_15M] = _cum_change_pct(p0_post, tp[i_post_15 - 1])
+        if i_post_60 > 0:
+            out[_K_POST_CAR_60M] = _cum_change_pct(p0_post, tp[i_post_60 - 1])
+        if i_post_180 > 0:
+            out[_K_POST_CAR_180M] = _cum_change_pct(p0_post, tp[i_post_180 - 1])
+
+    # Реализованная волатильность: (pre_start, pre_end] и (news, news+60m]
+    out[_K_PRE_RV_60M] = _realized_vol_pct(log_r, i_pre_start, i_pre_end)
+    out[_K_POST_RV_60M] = _realized_vol_pct(log_r, i_after_news, i_post_60)
+    # То же окно, оценка Янга-Чжана по OHLC
+    out[_K_PRE_YZ_60M] = _yang_zhang_vol_pct(yz, i_pre_start, i_pre_end)
+    out[_K_POST_YZ_60M] = _yang_zhang_vol_pct(yz, i_after_news, i_post_60)
+
+    return i1 - i0, out
+
+
+def _cum_change_pct(p_start, p_end):
+    """Кумулятивное изменение в процентах между двумя ценами, NaN если не определено"""
+    if not (p_start > 0 and p_end > 0):
+        return np.nan
+    return (p_end / p_start - 1.0) * 100.0
+
+
+def _realized_vol_pct(log_r, a, b):
+    """Реализованная волатильность на log_r[a:b]: sqrt(sum r_t^2) в процентах (NaN пропускаются)"""
+    if b <= a:
+        return np.nan
+    return np.sqrt(np.nansum(log_r[a:b] ** 2)) * 100.0
+
+
+def _sample_var(x):
+    """Выборочная дисперсия (ddof=1) без NaN, NaN - если значений меньше двух"""
+    valid = x[~np.isnan(x)]
+    if valid.size < 2:
+        return np.nan
+    return np.sum((valid - valid.mean()) ** 2) / (valid.size - 1)
+
+
+def _yang_zhang_vol_pct(yz, a, b):
+    """
+    Волатильность Янга-Чжана на свечах [a, b), в процентах за окно
+    
+    Дисперсия на свечу sigma^2 = sigma_o^2 + k*sigma_c^2 + (1-k)*sigma_RS^2,
+    k = 0.34 / (1.34 + (n+1)/(n-1)), затем умножается на n свечей окна, чтобы
+    быть в одном масштабе с _realized_vol_pct. NaN, если свечей меньше двух.
+    """
+    n = b - a
+    if n < 2:
+        return np.nan
+    var_o = _sample_var(yz[_YZ_OVERNIGHT, a:b])
+    var_c = _sample_var(yz[_YZ_OPEN_CLOSE, a:b])
+    rs = yz[_YZ_ROGERS_SATCHELL, a:b]
+    rs = rs[~np.isnan(rs)]
+    if rs.size == 0:
+        return np.nan
+    k = 0.34 / (1.34 + (n + 1) / (n - 1))
+    var = var_o + k * var_c + (1.0 - k) * rs.mean()
+    return np.sqrt(max(var, 0.0) * n) * 100.0
+
+
+if njit is not None:
+    # Помощники компилируются первыми: ядро вызывает уже скомпилированные версии
+    _cum_change_pct = njit(cache=True)(_cum_change_pct)
+    _realized_vol_pct = njit(cache=True)(_realized_vol_pct)
+    _sample_var = njit(cache=True)(_sample_var)
+    _yang_zhang_vol_pct = njit(cache=True)(_yang_zhang_vol_pct)
+    _price_window_kernel = njit(cache=True)(_price_window_kernel)
+    # Компилируем при импорте, а не на первой новости
+    _price_window_kernel(np.zeros(1, dtype=np.int64), np.ones(1), np.ones(1),
+                         np.ones(1), np.zeros(1), np.zeros((3, 1)), 0)
+
+
+# Направление движения: код из _movement_metrics -> строка в результатах
+MOVEMENT_DIRECTIONS = ("up", "down")
+
+
+def _movement_metrics(price_at_news, max_high, min_low) -> Tuple[np.ndarray, ...]:
+    """
+    Движение от цены новости до экстремумов окна (скаляры или массивы по всем новостям)
+    
+    Returns:
+        (max_up_pct, max_down_pct, max_movement_pct, код направления по
+        MOVEMENT_DIRECTIONS, movement_pct, is_anomaly)
+    """
+    max_up_pct = ((max_high - price_at_news) / price_at_news) * 100.0
+    max_down_pct = ((min_low - price_at_news) / price_at_news) * 100.0
+    abs_up = np.abs(max_up_pct)
+    abs_down = np.abs(max_down_pct)
+    # Без ветвлений: модуль - fmax (NaN одной из сторон не перекрывает другую),
+    # направление - код из сравнения (0 - up, 1 - down)
+    max_movement_pct = np.fmax(abs_up, abs_down)
+    is_anomaly = max_movement_pct >= 0.5
+    is_up = abs_up > abs_down
+    direction = (~is_up).astype(np.uint8)
+    movement_pct = np.where(is_up, max_up_pct, max_down_pct)
+    return max_up_pct, max_down_pct, max_movement_pct, direction, movement_pct, is_anomaly
+
+
 class AnomalyNewsFinder:
-    def __init__(self, db_path: str = "data/db/news.db", market_data_path: str = "data/market_data/yahoo/1m"):
+    def __init__(self, db_path: str = "data/db/news.db", market_data_path: str = "data/market_data/yahoo/1m",
+                 news_cache_path: Optional[str] = "data/cache/news_index.parquet"):
         self.db_path = db_path
         self.market_data_path = Path(market_data_path)
+        # None - не кэшировать новости на диске
+        self.news_cache_path = Path(news_cache_path) if news_cache_path else None
         
         # Часовые пояса для определения торговых сессий
         self.market_open = time(9, 30)  # 9:30 AM ET
         self.market_close = time(16, 0)  # 4:00 PM ET
         
+    def _load_news_cache(self) -> Tuple[pa.Table, int]:
+        """
+        Прочитать кэш новостей
+        
+        Returns:
+            (таблица NEWS_CACHE_SCHEMA, максимальный уже прочитанный news_id);
+            пустая таблица и 0, если кэша нет или он построен по другой БД
+        """
+        empty = NEWS_CACHE_SCHEMA.empty_table(), 0
+        if self.news_cache_path is None or not self.news_cache_path.exists():
+            return empty
+        try:
+            table = pq.read_table(self.news_cache_path)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать кэш новостей {self.news_cache_path}: {e}")
+            return empty
+        
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'db_path') != str(Path(self.db_path).resolve()).encode('utf-8'):
+            return empty
+        table = table.replace_schema_metadata(None)
+        if not table.schema.equals(NEWS_CACHE_SCHEMA):
+            return empty
+        return table, int(metadata[b'max_news_id'])
+    
+    def _save_news_cache(self, table: pa.Table, max_news_id: int):
+        """Записать кэш новостей (через временный файл, чтобы не оставить битый кэш)"""
+        try:
+            self.news_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            table = table.replace_schema_metadata({
+                'db_path': str(Path(self.db_path).resolve()),
+                'max_news_id': str(max_news_id),
+            })
+            tmp = self.news_cache_path.with_suffix('.parquet.tmp')
+            pq.write_table(table, tmp)
+            os.replace(tmp, self.news_cache_path)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить кэш новостей {self.news_cache_path}: {e}")
+    
     def get_all_news_with_symbols(self, limit: int = None) -> List[Dict]:
-        """Получить все новости с их символами из базы данных"""
+        """
+        Получить все новости с их символами из базы данных
+        
+        Из SQLite читаются только новости новее кэша (news_id > максимального в
+        кэше), symbols_json разбирается один раз и хранится в кэше списком.
+        """
         try:
+            cached, max_news_id = self._load_news_cache()
+            
             conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            
+            # Только чтение большой таблицы: mmap, кэш страниц 64 МБ, временные данные в памяти
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("PRAGMA temp_store=MEMORY")
             
             cursor = conn.cursor()
-            if limit:
-                cursor.execute("""
-                    SELECT news_id, created_at_utc, symbols_json, headline, source
-                    FROM news_raw
-                    ORDER BY created_at_utc DESC
-                    LIMIT ?
-                """, (limit,))
-            else:
-                cursor.execute("""
-                    SELECT news_id, created_at_utc, symbols_json, headline, source
-                    FROM news_raw
-                    ORDER BY created_at_utc
-                """)
+            cursor.arraysize = 10000
+            # news_id - INTEGER PRIMARY KEY (rowid): дочитка идет диапазоном по ключу, без
+            # сортировки; порядок по created_at_utc строится уже по таблице кэша
+            cursor.execute("""
+                SELECT news_id, created_at_utc, symbols_json, headline, source
+                FROM news_raw
+                WHERE news_id > ?
+                ORDER BY news_id
+            """, (max_news_id,))
             
-            news_list = []
-            for row in cursor.fetchall():
-                try:
-                    symbols = json.loads(row['symbols_json'])
-                    if isinstance(symbols, list) and symbols:
-                        news_list.append({
-                            'news_id': row['news_id'],
-                            'created_at_utc': row['created_at_utc'],
-                            'symbols': symbols,
-                            'headline': row['headline'],
-                            'source': row['source']
-                        })
-                except (json.JSONDecodeError, TypeError):
-                    logger.warning(f"Ошибка парсинга JSON для новости {row['news_id']}")
-                    continue
+            # Кортежи вместо sqlite3.Row, порциями по arraysize строк
+            columns = {name: [] for name in NEWS_CACHE_SCHEMA.names}
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for news_id, created_at_utc, symbols_json, headline, source in rows:
+                    try:
+                        symbols = _json_loads(symbols_json)
+                        symbols = [str(symbol) for symbol in symbols] if isinstance(symbols, list) else []
+                    except (ValueError, TypeError):
+                        logger.warning("Ошибка парсинга JSON для новости %s", news_id)
+                        symbols = None
+                    columns['news_id'].append(news_id)
+                    columns['created_at_utc'].append(created_at_utc)
+                    columns['symbols'].append(symbols)
+                    columns['headline'].append(headline)
+                    columns['source'].append(source)
             
             conn.close()
+            
+            table = cached
+            if columns['news_id']:
+                table = pa.concat_tables([cached, pa.table(columns, schema=NEWS_CACHE_SCHEMA)])
+                if self.news_cache_path is not None:
+                    self._save_news_cache(table, columns['news_id'][-1])
+            logger.info(f"Новостей из кэша: {cached.num_rows}, новых из БД: {len(columns['news_id'])}")
+            
+            # Порядок и лимит - как ORDER BY created_at_utc [DESC LIMIT ?] по всей таблице
+            if limit:
+                order = pc.sort_indices(table, sort_keys=[('created_at_utc', 'descending')])[:limit]
+            else:
+                order = pc.sort_indices(table, sort_keys=[('created_at_utc', 'ascending')])
+            table = table.take(order)
+            has_symbols = pc.fill_null(pc.greater(pc.list_value_length(table['symbols']), 0), False)
+            news_list = table.filter(has_symbols).to_pylist()
+            
             logger.info(f"Найдено {len(news_list)} новостей с символами")
             return news_list
             
@@ -70,251 +479,180 @@ class AnomalyNewsFinder:
             return []
     
     def is_market_open(self, utc_time: str) -> bool:
-        """Определить, был ли открыт рынок в момент выхода новости"""
-        try:
-            # Парсим UTC время
-            dt = datetime.fromisoformat(utc_time.replace('Z', '+00:00'))
-            
-            # Конвертируем в ET (Eastern Time)
-            # Для простоты используем UTC-5 (EST) или UTC-4 (EDT)
-            # В реальном проекте лучше использовать pytz или zoneinfo
-            et_time = dt - timedelta(hours=5)  # UTC-5
-            
-            # Проверяем, что это рабочий день (понедельник-пятница)
-            if et_time.weekday() >= 5:  # 5=суббота, 6=воскресенье
-                return False
-            
-            # Проверяем время торговой сессии
-            current_time = et_time.time()
-            
-            # Расширяем торговые часы для учета пре-маркета и после-маркета
-            # Pre-market: 4:00 AM - 9:30 AM ET
-            # Regular hours: 9:30 AM - 4:00 PM ET  
-            # After-hours: 4:00 PM - 8:00 PM ET
-            pre_market_start = time(4, 0)
-            after_market_end = time(20, 0)
-            
-            return (pre_market_start <= current_time <= after_market_end)
-            
-        except Exception as e:
-            logger.error(f"Ошибка при определении торговой сессии: {e}")
-            return False
+        """Определить, был ли открыт рынок в момент выхода новости (пре-маркет 4:00 - после-маркет 20:00 ET)"""
+        return self.get_market_session_info(utc_time)[0]
     
     def get_market_session_info(self, utc_time: str) -> Tuple[bool, str]:
         """Определить статус рынка и тип торговой сессии"""
         try:
-            # Парсим UTC время
-            dt = datetime.fromisoformat(utc_time.replace('Z', '+00:00'))
-            
-            # Конвертируем в ET (Eastern Time)
-            et_time = dt - timedelta(hours=5)  # UTC-5
-            
-            # Проверяем, что это рабочий день (понедельник-пятница)
-            if et_time.weekday() >= 5:  # 5=суббота, 6=воскресенье
-                return False, "weekend"
-            
-            current_time = et_time.time()
-            
-            # Определяем тип торговой сессии
-            if time(4, 0) <= current_time < time(9, 30):
-                return True, "pre_market"
-            elif time(9, 30) <= current_time <= time(16, 0):
-                return True, "regular_hours"
-            elif time(16, 0) < current_time <= time(20, 0):
-                return True, "after_hours"
-            else:
-                return False, "closed"
-                
+            return _session_info(utc_time)
         except Exception as e:
             logger.error(f"Ошибка при определении торговой сессии: {e}")
             return False, "unknown"
     
-    def get_candles_for_symbol_date(self, symbol: str, date_str: str) -> Optional[pd.DataFrame]:
-        """Получить свечи для символа на конкретную дату"""
+    def get_candles_for_symbol_date(self, symbol: str, date_str: str) -> Optional[DayCandles]:
+        """
+        Получить свечи для символа на конкретную дату
+        
+        Файл читается один раз на (символ, дата), дальше массивы берутся из
+        кэша - их нельзя изменять на месте.
+        """
         try:
-            # Формируем путь к файлу
-            symbol_path = self.market_data_path / symbol
-            if not symbol_path.exists():
-                return None
-            
-            file_path = symbol_path / f"{date_str}.parquet"
-            if not file_path.exists():
-                return None
-            
-            # Читаем parquet файл
-            df = pd.read_parquet(file_path)
-            
-            # Убеждаемся, что есть колонка времени
-            if 'timestamp' not in df.columns and df.index.name == 'timestamp':
-                df = df.reset_index()
-            
-            # Конвертируем время в datetime если нужно
-            if 'timestamp' in df.columns:
-                if df['timestamp'].dtype == 'object':
-                    df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df = df.set_index('timestamp')
-            
-            return df
-            
+            return _read_day_candles(str(self.market_data_path), symbol, date_str)
         except Exception as e:
             logger.error(f"Ошибка при чтении свечей для {symbol} на {date_str}: {e}")
             return None
 
     @staticmethod
-    def _typical_price(df: pd.DataFrame) -> pd.Series:
-        """Типичная цена свечи: (H+L+C)/3. Требуются колонки high, low, close."""
-        if not {'high', 'low', 'close'}.issubset(df.columns):
-            raise ValueError("Ожидаются колонки: high, low, close")
-        tp = (df['high'] + df['low'] + df['close']) / 3.0
-        tp.name = 'typical_price'
-        return tp
-
-    @staticmethod
-    def _price_at_or_before(series: pd.Series, t: datetime) -> Optional[float]:
-        """Цена на последней свече не позже t (<= t)."""
-        s = series.loc[series.index <= pd.Timestamp(t)]
-        return None if s.empty else float(s.iloc[-1])
-
-    @staticmethod
-    def _price_at_or_after(series: pd.Series, t: datetime) -> Optional[float]:
-        """Цена на первой свече не раньше t (>= t)."""
-        s = series.loc[series.index >= pd.Timestamp(t)]
-        return None if s.empty else float(s.iloc[0])
+    def _tp_and_logret(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Типичная цена свечи (H+L+C)/3 и ее лог-доходности (первая - NaN), без промежуточных массивов."""
+        tp = np.add(high, low)
+        tp += close
+        tp /= 3.0
+        log_r = np.log(tp)
+        np.subtract(log_r[1:], log_r[:-1], out=log_r[1:])
+        log_r[:1] = np.nan
+        return tp, log_r
 
     @staticmethod
-    def _log_returns(series: pd.Series) -> pd.Series:
-        """Лог-доходности из последовательности цен."""
-        return np.log(series).diff()
+    def _yang_zhang_components(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                               close: np.ndarray) -> np.ndarray:
+        """
+        Покомпонентные лог-величины оценки Янга-Чжана по свечам, массив [3, N]:
+        ln(O_t/C_{t-1}) (первая - NaN), ln(C_t/O_t) и слагаемое Роджерса-Сатчелла
+        ln(H/C)*ln(H/O) + ln(L/C)*ln(L/O).
+        """
+        yz = np.empty((3, open_.size))
+        yz[_YZ_OVERNIGHT, :1] = np.nan
+        np.log(open_[1:] / close[:-1], out=yz[_YZ_OVERNIGHT, 1:])
+        np.log(close / open_, out=yz[_YZ_OPEN_CLOSE])
+        yz[_YZ_ROGERS_SATCHELL] = (np.log(high / close) * np.log(high / open_)
+                                   + np.log(low / close) * np.log(low / open_))
+        return yz
 
     @staticmethod
-    def _cum_change_pct(p_start: Optional[float], p_end: Optional[float]) -> Optional[float]:
-        """Кумулятивное изменение в процентах (из лог-формы) между двумя ценами."""
-        if p_start is None or p_end is None or p_start <= 0 or p_end <= 0:
-            return None
-        return float((np.exp(np.log(p_end) - np.log(p_start)) - 1.0) * 100.0)
+    def _day_arrays(candles: DayCandles) -> Tuple[np.ndarray, ...]:
+        """
+        Массивы свечей дня для бинарного поиска по времени
+        
+        Returns:
+            (ts - время свечей в нс int64 (по возрастанию), high, low, типичная цена,
+            лог-доходности, компоненты Янга-Чжана [3, N])
+        """
+        tp, log_r = AnomalyNewsFinder._tp_and_logret(candles.high, candles.low, candles.close)
+        yz = AnomalyNewsFinder._yang_zhang_components(candles.open, candles.high, candles.low, candles.close)
+        return candles.ts, candles.high, candles.low, tp, log_r, yz
 
     @staticmethod
-    def _realized_vol_pct(log_ret: pd.Series) -> Optional[float]:
-        """Реализованная волатильность на окне: sqrt(sum r_t^2), в процентах."""
-        if log_ret.empty:
-            return None
-        return float(np.sqrt((log_ret ** 2).sum()) * 100.0)
-
-    def find_price_changes(self, symbol: str, news_time: str, candles_df: pd.DataFrame) -> Optional[Dict]:
-        """Найти движения цены вокруг новости + добавить pre/post CAR и RV без бенчмарков."""
+    def _to_ns(utc_time: str) -> int:
+        """Время ISO 8601 -> нс от эпохи UTC (как в ts)"""
+        t = pd.Timestamp(utc_time)
+        if t.tzinfo is not None:
+            t = t.tz_convert(None)
+        return t.value
+
+    def _window_metrics(self, symbol: str, news_ns: int, candles: DayCandles,
+                        date_str: Optional[str] = None) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Метрики окна новости из _price_window_kernel
+        
+        news_ns: время новости в нс от эпохи UTC (см. _to_ns)
+        Returns:
+            (число свечей в 3-часовом окне, массив метрик по индексам _K_*) или
+            None, если в окне нет свечей
+        """
         try:
-            news_dt = datetime.fromisoformat(news_time.replace('Z', '+00:00')).replace(tzinfo=None)
-
-            # Диапазон данных
-            data_start = candles_df.index.min().replace(tzinfo=None)
-            data_end = candles_df.index.max().replace(tzinfo=None)
-
-            # Типичная цена на всех свечах дня
-            tp = self._typical_price(candles_df)
-            log_r = self._log_returns(tp)
-
-            # --- расчет базового 3-часового окна после новости (как у вас было) ---
-            if news_dt > data_end:
-                start_time = data_end - timedelta(hours=3)
-                end_time = data_end
-                logger.info("Новость после закрытия рынка, анализирую последние 3 часа данных")
+            # Время, high/low, типичная цена, лог-доходности и компоненты Янга-Чжана на всех свечах дня
+            if date_str is not None:
+                ts, high, low, tp, log_r, yz = _day_arrays(str(self.market_data_path), symbol, date_str)
             else:
-                start_time = news_dt
-                end_time = news_dt + timedelta(hours=3)
-
-            start_time_pd = pd.Timestamp(start_time)
-            end_time_pd = pd.Timestamp(end_time)
-
-            mask_3h = (candles_df.index >= start_time_pd) & (candles_df.index <= end_time_pd)
-            relevant_candles = candles_df[mask_3h]
-
-            if relevant_candles.empty:
+                ts, high, low, tp, log_r, yz = self._day_arrays(candles)
+            if ts.size == 0:
                 return None
 
-            # Цена в момент новости (берем первую свечу >= news_dt, типичная цена)
-            price_at_news = self._price_at_or_after(tp, news_dt)
-            if price_at_news is None:
-                # fallback: если нет свечей после, возьмем последнюю перед событием
-                price_at_news = self._price_at_or_before(tp, news_dt)
-            if price_at_news is None:
-                return None
+            if news_ns > ts[-1]:
+                logger.debug("Новость после закрытия рынка, анализирую последние 3 часа данных")
 
-            # --- Старые метрики (сохраняем совместимость) ---
-            max_high = relevant_candles['high'].max()
-            min_low = relevant_candles['low'].min()
-            max_up_pct = ((max_high - price_at_news) / price_at_news) * 100.0
-            max_down_pct = ((min_low - price_at_news) / price_at_news) * 100.0
-            max_movement_pct = max(abs(max_up_pct), abs(max_down_pct))
-            is_anomaly = max_movement_pct >= 0.5
-            if abs(max_up_pct) > abs(max_down_pct):
-                movement_direction = "up"
-                movement_pct = max_up_pct
-            else:
-                movement_direction = "down"
-                movement_pct = max_down_pct
-
-            # --- NEW: окна для pre/post CAR (в процентах) ---
-            # Определения окон:
-            pre_start = news_dt - timedelta(minutes=60)
-            pre_end   = news_dt - timedelta(minutes=5)
-            post_15   = news_dt + timedelta(minutes=15)
-            post_60   = news_dt + timedelta(minutes=60)
-            post_180  = news_dt + timedelta(minutes=180)
-
-            # Точки цен для окон (концы берем "не позже", начало pre тоже "не позже")
-            p_pre_start = self._price_at_or_before(tp, pre_start)
-            p_pre_end   = self._price_at_or_before(tp, pre_end)
-
-            p0_post = self._price_at_or_after(tp, news_dt)  # price_at_news уже подобран аналогично
-            p_15 = self._price_at_or_before(tp, post_15)
-            p_60 = self._price_at_or_before(tp, post_60)
-            p_180 = self._price_at_or_before(tp, post_180)
-
-            pre_car_60m_pct = self._cum_change_pct(p_pre_start, p_pre_end)
-            post_car_15m_pct = self._cum_change_pct(p0_post, p_15)
-            post_car_60m_pct = self._cum_change_pct(p0_post, p_60)
-            post_car_180m_pct = self._cum_change_pct(p0_post, p_180)
-
-            # --- NEW: реализованная волатильность на окнах (опционально) ---
-            # Предокно: (pre_start, pre_end]
-            pre_mask = (log_r.index > pd.Timestamp(pre_start)) & (log_r.index <= pd.Timestamp(pre_end))
-            pre_rv_60m = self._realized_vol_pct(log_r.loc[pre_mask])
-
-            # Постокно: (news_dt, news_dt+60m]
-            post_mask_60 = (log_r.index > pd.Timestamp(news_dt)) & (log_r.index <= pd.Timestamp(post_60))
-            post_rv_60m = self._realized_vol_pct(log_r.loc[post_mask_60])
-
-            return {
-                'symbol': symbol,
-                'price_at_news': float(price_at_news),
-                'max_high': float(max_high),
-                'min_low': float(min_low),
-                'max_up_pct': float(max_up_pct),
-                'max_down_pct': float(max_down_pct),
-                'max_movement_pct': float(max_movement_pct),
-                'movement_direction': movement_direction,
-                'movement_pct': float(movement_pct),
-                'is_anomaly': is_anomaly,
-                'candles_count': int(len(relevant_candles)),
-
-                # NEW: «чистые» pre/post CAR без бенчмарков (в процентах)
-                'pre_car_60m_pct': pre_car_60m_pct,
-                'post_car_15m_pct': post_car_15m_pct,
-                'post_car_60m_pct': post_car_60m_pct,
-                'post_car_180m_pct': post_car_180m_pct,
-
-                # NEW (опционально полезно для фильтрации шума)
-                'pre_rv_60m': pre_rv_60m,
-                'post_rv_60m': post_rv_60m,
-            }
+            candles_count, m = _price_window_kernel(ts, high, low, tp, log_r, yz, news_ns)
+            if candles_count == 0:
+                return None
+            return int(candles_count), m
 
         except Exception as e:
             logger.error(f"Ошибка при анализе изменений цены для {symbol}: {e}")
             return None
 
-    
-    def analyze_news_impact(self, limit: int = None) -> List[Dict]:
-        """Основной метод анализа влияния новостей на цены"""
+    @staticmethod
+    def _price_analysis(symbol: str, candles_count: int, metrics: List[float], movement: Tuple) -> Dict:
+        """Словарь price_analysis из метрик ядра (список по _K_*) и строки _movement_metrics"""
+        max_up_pct, max_down_pct, max_movement_pct, direction, movement_pct, is_anomaly = movement
+
+        # CAR/RV, которые не удалось посчитать (нет свечей в окне), - None
+        def metric(k: int) -> Optional[float]:
+            v = metrics[k]
+            return None if v != v else v
+
+        return {
+            'symbol': symbol,
+            'price_at_news': metrics[_K_PRICE_AT_NEWS],
+            'max_high': metrics[_K_MAX_HIGH],
+            'min_low': metrics[_K_MIN_LOW],
+            'max_up_pct': max_up_pct,
+            'max_down_pct': max_down_pct,
+            'max_movement_pct': max_movement_pct,
+            'movement_direction': MOVEMENT_DIRECTIONS[direction],
+            'movement_pct': movement_pct,
+            'is_anomaly': is_anomaly,
+            'candles_count': candles_count,
+
+            # NEW: «чистые» pre/post CAR без бенчмарков (в процентах)
+            'pre_car_60m_pct': metric(_K_PRE_CAR_60M),
+            'post_car_15m_pct': metric(_K_POST_CAR_15M),
+            'post_car_60m_pct': metric(_K_POST_CAR_60M),
+            'post_car_180m_pct': metric(_K_POST_CAR_180M),
+
+            # NEW (опционально полезно для фильтрации шума)
+            'pre_rv_60m': metric(_K_PRE_RV_60M),
+            'post_rv_60m': metric(_K_POST_RV_60M),
+
+            # Волатильность Янга-Чжана по OHLC на тех же окнах (в процентах за окно)
+            'pre_yz_vol_60m': metric(_K_PRE_YZ_60M),
+            'post_yz_vol_60m': metric(_K_POST_YZ_60M),
+        }
+
+    def find_price_changes(self, symbol: str, news_time: str, candles: DayCandles,
+                           date_str: Optional[str] = None) -> Optional[Dict]:
+        """
+        Найти движения цены вокруг новости + добавить pre/post CAR и RV без бенчмарков.
+        
+        Свечи должны быть отсортированы по времени: границы всех окон ищутся
+        бинарным поиском по int64-массиву времени, сами метрики считает
+        _price_window_kernel (с numba - скомпилированный).
+        
+        date_str: дата файла свечей (из get_candles_for_symbol_date) - тогда массивы
+        дня берутся из кэша, а не строятся заново.
+        """
+        try:
+            news_ns = self._to_ns(news_time)
+        except ValueError as e:
+            logger.error(f"Ошибка при анализе изменений цены для {symbol}: {e}")
+            return None
+        window = self._window_metrics(symbol, news_ns, candles, date_str)
+        if window is None:
+            return None
+        candles_count, m = window
+        movement = [v.item() for v in _movement_metrics(m[_K_PRICE_AT_NEWS], m[_K_MAX_HIGH], m[_K_MIN_LOW])]
+        return self._price_analysis(symbol, candles_count, m.tolist(), movement)
+
+    def analyze_news_impact(self, limit: int = None, workers: Optional[int] = None) -> List[Dict]:
+        """
+        Основной метод анализа влияния новостей на цены
+        
+        Новости группируются по (символ, дата): каждая группа - одно чтение свечей
+        и расчеты по всем ее новостям в отдельном процессе.
+        
+        workers: число процессов (по умолчанию os.cpu_count()); 1 - без пула
+        """
         logger.info("Начинаю анализ влияния новостей на цены...")
         
         # Получаем новости (с лимитом если указан)
@@ -324,17 +662,23 @@ class AnomalyNewsFinder:
             return []
         
         results = []
+        # (символ, дата) -> {время новости в нс: строка в результате группы}
+        groups: Dict[Tuple[str, str], Dict[int, int]] = {}
+        # Слоты (новость, символ) по порядку: группа и строка в ней
+        slot_groups: List[Tuple[str, str]] = []
+        slot_rows: List[int] = []
         
-        for news in news_list:
-            logger.info(f"Анализирую новость {news['news_id']}: {news['headline'][:50]}...")
-            
-            # Определяем, был ли открыт рынок и тип торговой сессии
-            market_open, session_type = self.get_market_session_info(news['created_at_utc'])
-            
-            # Получаем дату для поиска свечей
-            news_date = datetime.fromisoformat(news['created_at_utc'].replace('Z', '+00:00')).strftime('%Y-%m-%d')
-            
-            news_result = {
+        # Время всех новостей разбирается один раз: статус рынка и тип торговой сессии,
+        # время в нс UTC (как ts свечей) и UTC-дата файла свечей ('NaT' - свечей не будет)
+        created = _parse_utc_batch([news['created_at_utc'] for news in news_list])
+        is_open, sessions = _session_info_batch(created)
+        created_ns = created.dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+        news_dates = np.datetime_as_string(created_ns.astype('datetime64[D]')).tolist()
+        created_ns = created_ns.view(np.int64).tolist()
+        
+        for news, market_open, session_type, news_ns, news_date in zip(
+                news_list, is_open.tolist(), sessions.tolist(), created_ns, news_dates):
+            results.append({
                 'news_id': news['news_id'],
                 'headline': news['headline'],
                 'source': news['source'],
@@ -342,73 +686,129 @@ class AnomalyNewsFinder:
                 'market_open': market_open,
                 'session_type': session_type,
                 'symbols_analysis': []
-            }
+            })
+            for symbol in news['symbols']:
+                rows = groups.setdefault((symbol, news_date), {})
+                slot_groups.append((symbol, news_date))
+                slot_rows.append(rows.setdefault(news_ns, len(rows)))
+        
+        tasks = [(str(self.market_data_path), symbol, news_date, list(rows))
+                 for (symbol, news_date), rows in groups.items()]
+        logger.info(f"Групп (символ, дата) для анализа: {len(tasks)}")
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            group_results = list(map(_analyze_symbol_day, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                group_results = list(executor.map(_analyze_symbol_day, tasks, chunksize=ANALYSIS_CHUNKSIZE))
+        
+        # Результаты групп - в заранее выделенные массивы, каждая группа в свой срез
+        group_index = {key: g for g, key in enumerate(groups)}
+        offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum([len(rows) for rows in groups.values()], out=offsets[1:])
+        group_has_candles = np.zeros(len(groups), dtype=bool)
+        counts = np.zeros(offsets[-1], dtype=np.int64)
+        metrics = np.full((offsets[-1], _K_COUNT), np.nan)
+        for g, group_result in enumerate(group_results):
+            if group_result is not None:
+                group_has_candles[g] = True
+                counts[offsets[g]:offsets[g + 1]], metrics[offsets[g]:offsets[g + 1]] = group_result
+        
+        # Колонки по слотам (новость, символ) и производные метрики - векторно
+        slot_group_ids = np.fromiter((group_index[key] for key in slot_groups), dtype=np.int64, count=len(slot_groups))
+        slot_idx = offsets[slot_group_ids] + np.asarray(slot_rows, dtype=np.int64)
+        has_candles = group_has_candles[slot_group_ids].tolist()
+        slot_counts = counts[slot_idx]
+        slot_metrics = metrics[slot_idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            movement = _movement_metrics(slot_metrics[:, _K_PRICE_AT_NEWS],
+                                         slot_metrics[:, _K_MAX_HIGH], slot_metrics[:, _K_MIN_LOW])
+        movement_rows = list(zip(*(column.tolist() for column in movement)))
+        slot_counts = slot_counts.tolist()
+        slot_metrics = slot_metrics.tolist()
+        
+        # Раскладываем по новостям, в порядке их символов. Построчный лог - на DEBUG
+        # (ленивое форматирование), на INFO - прогресс примерно каждый процент
+        debug = logger.isEnabledFor(logging.DEBUG)
+        progress_every = max(1, len(news_list) // 100)
+        slot = 0
+        for n, (news, news_result) in enumerate(zip(news_list, results), 1):
+            if debug:
+                logger.debug("Анализирую новость %s: %.50s...", news['news_id'], news['headline'])
             
             for symbol in news['symbols']:
-                logger.info(f"  Анализирую символ: {symbol}")
-                
-                # Получаем свечи для символа
-                candles_df = self.get_candles_for_symbol_date(symbol, news_date)
-                
-                if candles_df is None or candles_df.empty:
-                    logger.info(f"    Свечи для {symbol} не найдены, пропускаю")
+                i = slot
+                slot += 1
+                if not has_candles[i]:
+                    if debug:
+                        logger.debug("    Свечи для %s не найдены, пропускаю", symbol)
                     continue
                 
-                # Анализируем изменения цены
-                price_analysis = self.find_price_changes(symbol, news['created_at_utc'], candles_df)
-                
-                if price_analysis:
-                    symbol_result = {
-                        'symbol': symbol,
-                        'has_candles': True,
-                        'price_analysis': price_analysis
-                    }
-                else:
-                    symbol_result = {
-                        'symbol': symbol,
-                        'has_candles': True,
-                        'price_analysis': None
-                    }
-                
-                news_result['symbols_analysis'].append(symbol_result)
+                news_result['symbols_analysis'].append({
+                    'symbol': symbol,
+                    'has_candles': True,
+                    'price_analysis': (self._price_analysis(symbol, slot_counts[i], slot_metrics[i], movement_rows[i])
+                                       if slot_counts[i] else None)
+                })
             
-            results.append(news_result)
+            if n % progress_every == 0 or n == len(news_list):
+                logger.info("Обработано новостей: %d/%d", n, len(news_list))
         
         return results
     
     def find_anomalies(self, results: List[Dict]) -> List[Dict]:
-        """Найти аномальные новости (с изменением цены >= 1%)"""
-        anomalies = []
-        
-        for news_result in results:
-            for symbol_analysis in news_result['symbols_analysis']:
-                if (symbol_analysis['has_candles'] and 
-                    symbol_analysis['price_analysis'] and 
-                    symbol_analysis['price_analysis']['is_anomaly']):
-                    
-                    anomaly = {
-                        'news_id': news_result['news_id'],
-                        'headline': news_result['headline'],
-                        'symbol': symbol_analysis['symbol'],
-                        'created_at_utc': news_result['created_at_utc'],
-                        'market_open': news_result['market_open'],
-                        'session_type': news_result.get('session_type', 'unknown'),
-                        'max_movement_pct': symbol_analysis['price_analysis']['max_movement_pct'],
-                        'movement_direction': symbol_analysis['price_analysis']['movement_direction'],
-                        'movement_pct': symbol_analysis['price_analysis']['movement_pct'],
-                        'price_at_news': symbol_analysis['price_analysis']['price_at_news'],
-                        'max_high': symbol_analysis['price_analysis']['max_high'],
-                        'min_low': symbol_analysis['price_analysis']['min_low']
-                    }
-                    anomalies.append(anomaly)
-        
-        return anomalies
+        """Найти аномальные новости (с изменением цены >= 0.5%) - один проход по парам (новость, символ)"""
+        return [
+            {
+                'news_id': news_result['news_id'],
+                'headline': news_result['headline'],
+                'symbol': symbol_analysis['symbol'],
+                'created_at_utc': news_result['created_at_utc'],
+                'market_open': news_result['market_open'],
+                'session_type': news_result.get('session_type', 'unknown'),
+                'max_movement_pct': analysis['max_movement_pct'],
+                'movement_direction': analysis['movement_direction'],
+                'movement_pct': analysis['movement_pct'],
+                'price_at_news': analysis['price_at_news'],
+                'max_high': analysis['max_high'],
+                'min_low': analysis['min_low']
+            }
+            for news_result in results
+            for symbol_analysis in news_result['symbols_analysis']
+            if symbol_analysis['has_candles']
+            and (analysis := symbol_analysis['price_analysis'])
+            and analysis['is_anomaly']
+        ]
+    
+    @staticmethod
+    def _dump_record(record: Dict) -> bytes:
+        """Одна запись результатов в JSON (numpy-скаляры пишутся как числа/bool)"""
+        if orjson is not None:
+            return orjson.dumps(record, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(record, ensure_ascii=False,
+                          default=lambda o: o.item() if isinstance(o, np.generic) else str(o)).encode('utf-8')
     
     def save_results(self, results: List[Dict], output_file: str = "anomaly_analysis_results.json"):
-        """Сохранить результаты анализа в JSON файл"""
+        """
+        Сохранить результаты анализа в JSON файл
+        
+        Записи пишутся потоком, по одной новости на строку: *.jsonl - JSON Lines
+        (для построчного чтения), иначе - обычный JSON-массив.
+        """
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+            as_array = not output_file.endswith('.jsonl')
+            with open(output_file, 'wb') as f:
+                if as_array:
+                    f.write(b'[\n')
+                for i, news_result in enumerate(results):
+                    if as_array and i:
+                        f.write(b',\n')
+                    f.write(self._dump_record(news_result))
+                    if not as_array:
+                        f.write(b'\n')
+                if as_array:
+                    f.write(b'\n]\n')
             logger.info(f"Результаты сохранены в {output_file}")
         except Exception as e:
             logger.error(f"Ошибка при сохранении результатов: {e}")
@@ -429,10 +829,7 @@ class AnomalyNewsFinder:
         total_anomalies = len(anomalies)
         
         # Статистика по торговым сессиям
-        session_stats = {}
-        for news in results:
-            session = news.get('session_type', 'unknown')
-            session_stats[session] = session_stats.get(session, 0) + 1
+        session_stats = Counter(news.get('session_type', 'unknown') for news in results)
         
         print(f"Всего новостей: {total_news}")
         print(f"Всего символов: {total_symbols}")
@@ -457,16 +854,24 @@ class AnomalyNewsFinder:
             print(f"\nТОП-10 АНОМАЛЬНЫХ ДВИЖЕНИЙ:")
             print("-" * 80)
             
-            # Сортируем по максимальному движению цены
-            sorted_anomalies = sorted(anomalies, key=lambda x: x['max_movement_pct'], reverse=True)
+            # Топ по максимальному движению цены: порог 10-го значения - np.partition
+            # за O(M), сортируются только попавшие в топ (равные - в исходном порядке)
+            magnitudes = np.fromiter((a['max_movement_pct'] for a in anomalies),
+                                     dtype=np.float64, count=len(anomalies))
+            top = min(10, len(anomalies))
+            kth = np.partition(magnitudes, magnitudes.size - top)[magnitudes.size - top]
+            above = np.flatnonzero(magnitudes > kth)
+            ties = np.flatnonzero(magnitudes == kth)[:top - above.size]
+            top_idx = np.concatenate([above, ties])
+            top_idx = top_idx[np.lexsort((top_idx, -magnitudes[top_idx]))]
              
-            for i, anomaly in enumerate(sorted_anomalies[:10], 1):
+            for i, anomaly in enumerate((anomalies[j] for j in top_idx), 1):
                  direction = "↗️" if anomaly['movement_direction'] == "up" else "↘️"
                  market_status = "🟢 РЫНОК ОТКРЫТ" if anomaly['market_open'] else "🔴 РЫНОК ЗАКРЫТ"
                  session_info = anomaly.get('session_type', 'unknown')
                  
                  # Форматируем время новости для удобства
-                 news_time = datetime.fromisoformat(anomaly['created_at_utc'].replace('Z', '+00:00'))
+                 news_time = datetime.fromisoformat(anomaly['created_at_utc'])
                  formatted_time = news_time.strftime('%Y-%m-%d %H:%M:%S UTC')
                  
                  print(f"{i:2d}. {anomaly['symbol']:6s} {direction} {anomaly['max_movement_pct']:6.2f}% "
@@ -475,6 +880,33 @@ class AnomalyNewsFinder:
         print("="*80)
 
 
+def _analyze_symbol_day(task: Tuple[str, str, str, List[int]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Воркер analyze_news_impact: свечи символа за день читаются один раз
+    
+    Args:
+        task: (путь к свечам, символ, дата, времена новостей в нс UTC)
+    
+    Returns:
+        (число свечей в окне - 0, если окно пустое; метрики ядра [новость, _K_*])
+        по строкам news_times_ns или None, если свечей нет
+    """
+    market_data_path, symbol, date_str, news_times_ns = task
+    finder = AnomalyNewsFinder(market_data_path=market_data_path)
+    
+    candles = finder.get_candles_for_symbol_date(symbol, date_str)
+    if candles is None or candles.ts.size == 0:
+        return None
+    
+    counts = np.zeros(len(news_times_ns), dtype=np.int64)
+    metrics = np.full((len(news_times_ns), _K_COUNT), np.nan)
+    for row, news_ns in enumerate(news_times_ns):
+        window = finder._window_metrics(symbol, news_ns, candles, date_str)
+        if window is not None:
+            counts[row], metrics[row] = window
+    return counts, metrics
+
+
 def main():
     """Основная функция"""
     try:
@@ -4,7 +4,12 @@
 """
 
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 from pathlib import Path
+from typing import Dict
 
 # Добавляем корневую папку проекта в путь
 project_root = Path(__file__).parent.parent.parent
@@ -13,389 +18,531 @@ sys.path.insert(0, str(project_root))
 from libs.database.connection import DatabaseConnection
 
 
-def test_basic_search():
+# Число потоков для параллельного запуска независимых тестов
+PARALLEL_WORKERS = 4
+
+# Сколько результатов FTS поиска показывать в базовом тесте
+SHOWN_RESULTS = 5
+
+# Сколько персон держит LRU-кэш аффилиаций (интерактивная сессия может длиться долго)
+AFFILIATIONS_CACHE_SIZE = 256
+
+# Поиск организаций по именам: VALUES (имя, FTS запрос) и первый org-алиас для каждого имени
+_ORG_LOOKUP_SQL = """
+    WITH probe(name, q) AS (VALUES {values})
+    SELECT probe.name, e.entity_id, e.display_name
+    FROM probe
+    LEFT JOIN entities e ON e.entity_id = (
+        SELECT a.entity_id
+        FROM alias_fts fts
+        JOIN aliases a ON a.alias_id = fts.rowid
+        JOIN entities o ON o.entity_id = a.entity_id
+        WHERE alias_fts MATCH probe.q AND o.entity_type = 'org'
+        LIMIT 1
+    )
+"""
+
+
+def _normalize(s: str) -> str:
+    """
+    Ключ кэша и готовый для БД запрос: та же нормализация, что у DatabaseConnection
+    (регистр и диакритика в БД все равно не важны), так что "apple", "Apple" и "APPLE" совпадают
+    """
+    return DatabaseConnection._normalize_text(s)
+
+
+# Playground только читает БД, поэтому одинаковые запросы между тестами отдаем из кэша.
+# Ключ - только нормализованные аргументы (не подключение): записи общие для всех потоков
+# _run_parallel, а закрытые подключения кэш не удерживает. Очищаются в конце main()
+_alias_cache: Dict[tuple, list] = {}
+_person_cache: Dict[tuple, list] = {}
+_affiliations_cache: "OrderedDict[int, list]" = OrderedDict()
+_affiliations_lock = threading.Lock()  # OrderedDict меняется при каждом чтении (move_to_end)
+
+
+def _clear_caches():
+    """Сбросить кэши запросов (конец запуска playground)"""
+    _alias_cache.clear()
+    _person_cache.clear()
+    _affiliations_cache.clear()
+
+
+def _cached_find(db: DatabaseConnection, query: str, fuzzy: bool, limit: int = None) -> list:
+    """Кэшированный db.find_entity_by_alias: "apple", "Apple" и "APPLE" дают одну запись кэша"""
+    key = (_normalize(query), fuzzy, limit)
+    results = _alias_cache.get(key)
+    if results is None:
+        # Запрос уже нормализован один раз - и для точного, и для FTS поиска
+        results = _alias_cache[key] = db.find_entity_by_alias(key[0], fuzzy=fuzzy, limit=limit,
+                                                              pre_normalized=True)
+    return results
+
+
+def _cached_find_person(db: DatabaseConnection, family: str, given: str, given_prefix: str) -> list:
+    """Кэшированный db.find_person_by_name с ключом по нормализованным частям имени"""
+    key = (_normalize(family), _normalize(given), _normalize(given_prefix))
+    results = _person_cache.get(key)
+    if results is None:
+        results = _person_cache[key] = db.find_person_by_name(*key)
+    return results
+
+
+def _cached_affiliations(db: DatabaseConnection, person_id: int) -> list:
+    """
+    Кэшированный db.find_person_affiliations(active_only=True): в интерактиве одну фамилию ищут повторно
+    
+    LRU на AFFILIATIONS_CACHE_SIZE персон, вытесняется самая давно запрошенная
+    """
+    with _affiliations_lock:
+        results = _affiliations_cache.get(person_id)
+        if results is not None:
+            _affiliations_cache.move_to_end(person_id)
+            return results
+    
+    results = db.find_person_affiliations(person_id, active_only=True)
+    with _affiliations_lock:
+        _affiliations_cache[person_id] = results
+        if len(_affiliations_cache) > AFFILIATIONS_CACHE_SIZE:
+            _affiliations_cache.popitem(last=False)
+    return results
+
+
+def _looks_like_ticker(query: str) -> bool:
+    """Быстрая проверка, что запрос похож на тикер: до 5 символов, все буквы заглавные"""
+    return len(query) <= 5 and query.isupper()
+
+
+def _buffered_output(test):
+    """
+    Вывод теста копится в список строк и печатается одним sys.stdout.write в конце
+    (в том числе при исключении) вместо отдельного print на каждую строку
+    """
+    @wraps(test)
+    def wrapper(db: DatabaseConnection):
+        out = []
+        try:
+            test(db, out)
+        finally:
+            if out:
+                sys.stdout.write("\n".join(map(str, out)) + "\n")
+    return wrapper
+
+
+@_buffered_output
+def test_basic_search(db: DatabaseConnection, out: list):
     """Базовый тест поиска по алиасам"""
-    print("=" * 50)
-    print("БАЗОВЫЙ ТЕСТ ПОИСКА ПО АЛИАСАМ")
-    print("=" * 50)
+    out.append("=" * 50)
+    out.append("БАЗОВЫЙ ТЕСТ ПОИСКА ПО АЛИАСАМ")
+    out.append("=" * 50)
+    
+    test_queries = ["AAPL", "Apple", "apple", "MSFT", "Microsoft", "Tesla", "Daily MSFT Bear Direxion 1X"]
     
-    with DatabaseConnection() as db:
-        test_queries = ["AAPL", "Apple", "apple", "MSFT", "Microsoft", "Tesla", "Daily MSFT Bear Direxion 1X"]
+    for query in test_queries:
+        out.append(f"\n--- Поиск: '{query}' ---")
         
-        for query in test_queries:
-            print(f"\n--- Поиск: '{query}' ---")
-            
-            # Точный поиск
-            exact_results = db.find_entity_by_alias(query, fuzzy=False)
-            print(f"Точный поиск: {len(exact_results)} результатов")
-            
-            # FTS поиск
-            fts_results = db.find_entity_by_alias(query, fuzzy=True)
-            print(f"FTS поиск: {len(fts_results)} результатов")
-            
-            if fts_results:
-                for result in fts_results[:5]:  # Показываем первые 5
-                    entity = result['entity']
-                    print(f"  - {entity['display_name']} ({entity['entity_type']})")
-                    print(f"    Alias: '{result['alias_text']}' ({result['alias_type']})")
+        # Точный поиск
+        exact_results = _cached_find(db, query, False)
+        out.append(f"Точный поиск: {len(exact_results)} результатов")
+        
+        # FTS поиск: из БД берем на одну строку больше показываемых, чтобы знать, что есть еще
+        fts_results = _cached_find(db, query, True, limit=SHOWN_RESULTS + 1)
+        fts_count = f"{SHOWN_RESULTS}+" if len(fts_results) > SHOWN_RESULTS else len(fts_results)
+        out.append(f"FTS поиск: {fts_count} результатов")
+        
+        if fts_results:
+            out.extend(
+                f"  - {r['entity']['display_name']} ({r['entity']['entity_type']})\n"
+                f"    Alias: '{r['alias_text']}' ({r['alias_type']})"
+                for r in fts_results[:SHOWN_RESULTS]
+            )
 
 
-def test_fts_operators():
+@_buffered_output
+def test_fts_operators(db: DatabaseConnection, out: list):
     """Тест FTS операторов"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ FTS ОПЕРАТОРОВ")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ FTS ОПЕРАТОРОВ")
+    out.append("=" * 50)
+    
+    # Тестируем различные варианты поиска
+    test_cases = [
+        "apple",
+        "microsoft", 
+        "tesla",
+        "AAPL",
+        "MSFT",
+        "TSLA"
+    ]
     
-    with DatabaseConnection() as db:
-        # Тестируем различные варианты поиска
-        test_cases = [
-            "apple",
-            "microsoft", 
-            "tesla",
-            "AAPL",
-            "MSFT",
-            "TSLA"
-        ]
+    for query in test_cases:
+        out.append(f"\n--- FTS поиск: '{query}' ---")
+        results = _cached_find(db, query, True)
         
-        for query in test_cases:
-            print(f"\n--- FTS поиск: '{query}' ---")
-            results = db.find_entity_by_alias(query, fuzzy=True)
-            
-            if results:
-                print(f"Найдено {len(results)} результатов:")
-                for result in results:
-                    entity = result['entity']
-                    print(f"  ✓ {entity['display_name']} - '{result['alias_text']}' ({result['alias_type']})")
-            else:
-                print("  ✗ Результаты не найдены")
+        if results:
+            out.append(f"Найдено {len(results)} результатов:")
+            out.extend(f"  ✓ {r['entity']['display_name']} - '{r['alias_text']}' ({r['alias_type']})" for r in results)
+        else:
+            out.append("  ✗ Результаты не найдены")
 
 
-def compare_search_methods():
+@_buffered_output
+def compare_search_methods(db: DatabaseConnection, out: list):
     """Сравнение точного и FTS поиска"""
-    print("\n" + "=" * 50)
-    print("СРАВНЕНИЕ МЕТОДОВ ПОИСКА")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("СРАВНЕНИЕ МЕТОДОВ ПОИСКА")
+    out.append("=" * 50)
+    
+    test_cases = [
+        "Apple",
+        "apple",  # строчные
+        "APPLE",  # заглавные
+        "AAPL",   # тикер
+        "Microsoft",
+        "microsoft",
+        "MSFT"
+    ]
     
-    with DatabaseConnection() as db:
-        test_cases = [
-            "Apple",
-            "apple",  # строчные
-            "APPLE",  # заглавные
-            "AAPL",   # тикер
-            "Microsoft",
-            "microsoft",
-            "MSFT"
-        ]
+    for query in test_cases:
+        out.append(f"\n--- Тест: '{query}' ---")
         
-        for query in test_cases:
-            print(f"\n--- Тест: '{query}' ---")
-            
-            # Точный поиск
-            exact_results = db.find_entity_by_alias(query, fuzzy=False)
-            print(f"Точный поиск: {len(exact_results)} результатов")
-            
-            # FTS поиск
-            fts_results = db.find_entity_by_alias(query, fuzzy=True)
-            print(f"FTS поиск: {len(fts_results)} результатов")
-            
-            # Показываем разницу
-            if len(exact_results) != len(fts_results):
-                print(f"  ⚠ Разница в количестве результатов!")
-                if fts_results and not exact_results:
-                    print(f"  → FTS нашел то, что точный поиск пропустил")
-                elif exact_results and not fts_results:
-                    print(f"  → Точный поиск нашел то, что FTS пропустил")
+        # Точный поиск
+        exact_results = _cached_find(db, query, False)
+        out.append(f"Точный поиск: {len(exact_results)} результатов")
+        
+        # FTS поиск; для тикеров (до 5 заглавных символов) точное совпадение авторитетно и FTS пропускаем
+        if exact_results and _looks_like_ticker(query):
+            fts_results = exact_results
+            out.append("FTS поиск: пропущен (тикер найден точным поиском)")
+        else:
+            fts_results = _cached_find(db, query, True)
+            out.append(f"FTS поиск: {len(fts_results)} результатов")
+        
+        # Показываем разницу
+        if len(exact_results) != len(fts_results):
+            out.append(f"  ⚠ Разница в количестве результатов!")
+            if fts_results and not exact_results:
+                out.append(f"  → FTS нашел то, что точный поиск пропустил")
+            elif exact_results and not fts_results:
+                out.append(f"  → Точный поиск нашел то, что FTS пропустил")
 
 
-def test_person_search():
+@_buffered_output
+def test_person_search(db: DatabaseConnection, out: list):
     """Тест поиска персон по имени"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ ПОИСКА ПЕРСОН ПО ИМЕНИ")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ ПОИСКА ПЕРСОН ПО ИМЕНИ")
+    out.append("=" * 50)
+    
+    # Тестируем различные варианты поиска персон
+    test_cases = [
+        # (family, given, given_prefix)
+        ("Cook", None, None),           # Только фамилия
+        ("Cook", "Timothy", None),      # Фамилия + имя
+        ("Cook", None, "T"),            # Фамилия + префикс имени (1 символ)
+        ("Cook", None, "Ti"),           # Фамилия + префикс имени (2 символа)
+        ("Cook", None, "Tim"),          # Фамилия + префикс имени (3 символа)
+        ("Smith", None, None),          # Популярная фамилия
+        ("Gates", None, None),          # Другая известная фамилия
+        ("Jobs", None, None),           # Еще одна известная фамилия
+        ("Nadella", None, None),        # Современная фамилия
+    ]
     
-    with DatabaseConnection() as db:
-        # Тестируем различные варианты поиска персон
-        test_cases = [
-            # (family, given, given_prefix)
-            ("Cook", None, None),           # Только фамилия
-            ("Cook", "Timothy", None),      # Фамилия + имя
-            ("Cook", None, "T"),            # Фамилия + префикс имени (1 символ)
-            ("Cook", None, "Ti"),           # Фамилия + префикс имени (2 символа)
-            ("Cook", None, "Tim"),          # Фамилия + префикс имени (3 символа)
-            ("Smith", None, None),          # Популярная фамилия
-            ("Gates", None, None),          # Другая известная фамилия
-            ("Jobs", None, None),           # Еще одна известная фамилия
-            ("Nadella", None, None),        # Современная фамилия
-        ]
+    for family, given, given_prefix in test_cases:
+        out.append(f"\n--- Поиск персоны: family='{family}', given='{given}', prefix='{given_prefix}' ---")
         
-        for family, given, given_prefix in test_cases:
-            print(f"\n--- Поиск персоны: family='{family}', given='{given}', prefix='{given_prefix}' ---")
+        try:
+            results = _cached_find_person(db, family, given, given_prefix)
             
-            try:
-                results = db.find_person_by_name(family, given, given_prefix)
+            if results:
+                out.append(f"Найдено {len(results)} персон:")
+                # Показываем только первые 5 результатов
+                for i, person in enumerate(results[:5], 1):
+                    out.append(f"  {i}. {person['given']} {person['family']}")
+                    out.append(f"     Display: {person['display_name']} (id: {person['entity_id']})")
+                    if person.get('given_norm'):
+                        out.append(f"     Given norm: {person['given_norm']}")
+                    if person.get('family_norm'):
+                        out.append(f"     Family norm: {person['family_norm']}")
                 
-                if results:
-                    print(f"Найдено {len(results)} персон:")
-                    # Показываем только первые 5 результатов
-                    for i, person in enumerate(results[:5], 1):
-                        print(f"  {i}. {person['given']} {person['family']}")
-                        print(f"     Display: {person['display_name']} (id: {person['entity_id']})")
-                        if person.get('given_norm'):
-                            print(f"     Given norm: {person['given_norm']}")
-                        if person.get('family_norm'):
-                            print(f"     Family norm: {person['family_norm']}")
-                    
-                    if len(results) > 5:
-                        print(f"  ... и еще {len(results) - 5} персон")
-                else:
-                    print("  ✗ Персоны не найдены")
-                    
-            except Exception as e:
-                print(f"  ❌ Ошибка при поиске: {e}")
+                if len(results) > 5:
+                    out.append(f"  ... и еще {len(results) - 5} персон")
+            else:
+                out.append("  ✗ Персоны не найдены")
+                
+        except Exception as e:
+            out.append(f"  ❌ Ошибка при поиске: {e}")
 
 
-def test_person_search_variations():
+@_buffered_output
+def test_person_search_variations(db: DatabaseConnection, out: list):
     """Тест поиска персон с различными вариантами написания"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ ПОИСКА ПЕРСОН - ВАРИАНТЫ НАПИСАНИЯ")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ ПОИСКА ПЕРСОН - ВАРИАНТЫ НАПИСАНИЯ")
+    out.append("=" * 50)
+    
+    # Тестируем нормализацию имен
+    test_cases = [
+        ("cook", None, None),           # строчные
+        ("COOK", None, None),           # заглавные
+        ("Cook", None, None),           # правильный регистр
+        ("cOoK", None, None),           # смешанный регистр
+        ("Cook", "timothy", None),      # строчное имя
+        ("Cook", "TIMOTHY", None),      # заглавное имя
+        ("Cook", None, "t"),            # строчная буква (1 символ)
+        ("Cook", None, "T"),            # заглавная буква (1 символ)
+        ("Cook", None, "ti"),           # строчные 2 символа
+        ("Cook", None, "TI"),           # заглавные 2 символа
+        ("Cook", None, "tim"),          # строчные 3 символа
+        ("Cook", None, "TIM"),          # заглавные 3 символа
+    ]
+    
+    # Варианты регистра сводятся к одному нормализованному запросу: повторы не ищем и не печатаем заново
+    seen = {}
     
-    with DatabaseConnection() as db:
-        # Тестируем нормализацию имен
-        test_cases = [
-            ("cook", None, None),           # строчные
-            ("COOK", None, None),           # заглавные
-            ("Cook", None, None),           # правильный регистр
-            ("cOoK", None, None),           # смешанный регистр
-            ("Cook", "timothy", None),      # строчное имя
-            ("Cook", "TIMOTHY", None),      # заглавное имя
-            ("Cook", None, "t"),            # строчная буква (1 символ)
-            ("Cook", None, "T"),            # заглавная буква (1 символ)
-            ("Cook", None, "ti"),           # строчные 2 символа
-            ("Cook", None, "TI"),           # заглавные 2 символа
-            ("Cook", None, "tim"),          # строчные 3 символа
-            ("Cook", None, "TIM"),          # заглавные 3 символа
-        ]
+    for family, given, given_prefix in test_cases:
+        out.append(f"\n--- Поиск: family='{family}', given='{given}', prefix='{given_prefix}' ---")
         
-        for family, given, given_prefix in test_cases:
-            print(f"\n--- Поиск: family='{family}', given='{given}', prefix='{given_prefix}' ---")
+        key = (_normalize(family), _normalize(given), _normalize(given_prefix))
+        if key in seen:
+            first_case, count = seen[key]
+            out.append(f"  [cached] как {first_case}: {count} персон")
+            continue
+        
+        try:
+            results = _cached_find_person(db, family, given, given_prefix)
+            seen[key] = (f"family='{family}', given='{given}', prefix='{given_prefix}'", len(results))
             
-            try:
-                results = db.find_person_by_name(family, given, given_prefix)
+            if results:
+                out.append(f"✓ Найдено {len(results)} персон:")
+                # Показываем только первые 3 результата
+                out.extend(f"    - {person['given']} {person['family']}" for person in results[:3])
+                if len(results) > 3:
+                    out.append(f"    ... и еще {len(results) - 3} персон")
+            else:
+                out.append("  ✗ Персоны не найдены")
                 
-                if results:
-                    print(f"✓ Найдено {len(results)} персон:")
-                    # Показываем только первые 3 результата
-                    for person in results[:3]:
-                        print(f"    - {person['given']} {person['family']}")
-                    if len(results) > 3:
-                        print(f"    ... и еще {len(results) - 3} персон")
-                else:
-                    print("  ✗ Персоны не найдены")
-                    
-            except Exception as e:
-                print(f"  ❌ Ошибка: {e}")
+        except Exception as e:
+            out.append(f"  ❌ Ошибка: {e}")
 
 
-def test_person_affiliations():
+@_buffered_output
+def test_person_affiliations(db: DatabaseConnection, out: list):
     """Тест поиска аффилиаций персон"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ АФФИЛИАЦИЙ ПЕРСОН")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ АФФИЛИАЦИЙ ПЕРСОН")
+    out.append("=" * 50)
     
-    with DatabaseConnection() as db:
-        # Сначала найдем несколько персон
-        test_families = ["Cook", "Smith", "Gates", "Jobs"]
+    # Сначала найдем несколько персон
+    test_families = ["Cook", "Smith", "Gates", "Jobs"]
+    
+    for family in test_families:
+        out.append(f"\n--- Поиск аффилиаций для фамилии '{family}' ---")
         
-        for family in test_families:
-            print(f"\n--- Поиск аффилиаций для фамилии '{family}' ---")
+        try:
+            persons = _cached_find_person(db, family, None, None)
             
-            try:
-                persons = db.find_person_by_name(family)
+            if persons:
+                # Берем первую найденную персону
+                person = persons[0]
+                person_id = person['entity_id']
                 
-                if persons:
-                    # Берем первую найденную персону
-                    person = persons[0]
-                    person_id = person['entity_id']
-                    
-                    print(f"Персона: {person['given']} {person['family']}")
-                    
-                    # Ищем аффилиации
-                    affiliations = db.find_person_affiliations(person_id, active_only=True)
-                    
-                    if affiliations:
-                        print(f"Найдено {len(affiliations)} аффилиаций:")
-                        for aff in affiliations:
-                            org = aff['org']
-                            print(f"  - {aff['role_title']} в {org['display_name']}")
-                            if aff['symbol']:
-                                print(f"    Символ: {aff['symbol']}")
-                            if aff['valid_from']:
-                                print(f"    С: {aff['valid_from']}")
-                            if aff['valid_to']:
-                                print(f"    По: {aff['valid_to']}")
-                    else:
-                        print("  ✗ Аффилиации не найдены")
+                out.append(f"Персона: {person['given']} {person['family']}")
+                
+                # Ищем аффилиации
+                affiliations = _cached_affiliations(db, person_id)
+                
+                if affiliations:
+                    out.append(f"Найдено {len(affiliations)} аффилиаций:")
+                    for aff in affiliations:
+                        org = aff['org']
+                        out.append(f"  - {aff['role_title']} в {org['display_name']}")
+                        if aff['symbol']:
+                            out.append(f"    Символ: {aff['symbol']}")
+                        if aff['valid_from']:
+                            out.append(f"    С: {aff['valid_from']}")
+                        if aff['valid_to']:
+                            out.append(f"    По: {aff['valid_to']}")
                 else:
-                    print(f"  ✗ Персоны с фамилией '{family}' не найдены")
-                    
-            except Exception as e:
-                print(f"  ❌ Ошибка при поиске аффилиаций: {e}")
+                    out.append("  ✗ Аффилиации не найдены")
+            else:
+                out.append(f"  ✗ Персоны с фамилией '{family}' не найдены")
+                
+        except Exception as e:
+            out.append(f"  ❌ Ошибка при поиске аффилиаций: {e}")
 
 
-def test_person_context():
+@_buffered_output
+def test_person_context(db: DatabaseConnection, out: list):
     """Тест получения полного контекста персоны"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ КОНТЕКСТА ПЕРСОН")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ КОНТЕКСТА ПЕРСОН")
+    out.append("=" * 50)
+    
+    # Найдем несколько персон для тестирования
+    test_families = ["Cook", "Smith"]
+    
+    # Контексты всех первых найденных персон получаем одним пакетом
+    first_ids = []
+    for family in test_families:
+        persons = _cached_find_person(db, family, None, None)
+        if persons:
+            first_ids.append(persons[0]['entity_id'])
+    contexts = db.get_entity_contexts(first_ids)
     
-    with DatabaseConnection() as db:
-        # Найдем несколько персон для тестирования
-        test_families = ["Cook", "Smith"]
+    for family in test_families:
+        out.append(f"\n--- Контекст для фамилии '{family}' ---")
         
-        for family in test_families:
-            print(f"\n--- Контекст для фамилии '{family}' ---")
+        try:
+            persons = _cached_find_person(db, family, None, None)
             
-            try:
-                persons = db.find_person_by_name(family)
+            if persons:
+                # Берем первую найденную персону
+                person = persons[0]
+                person_id = person['entity_id']
                 
-                if persons:
-                    # Берем первую найденную персону
-                    person = persons[0]
-                    person_id = person['entity_id']
+                out.append(f"Персона: {person['given']} {person['family']}")
+                
+                # Полный контекст из пакета
+                context = contexts.get(person_id)
+                
+                if context:
+                    entity = context['entity']
+                    aliases = context['aliases']
+                    affiliations = context['affiliations']
                     
-                    print(f"Персона: {person['given']} {person['family']}")
+                    out.append(f"Контекст:")
+                    out.append(f"  Entity ID: {entity['entity_id']}")
+                    out.append(f"  Type: {entity['entity_type']}")
+                    out.append(f"  Canonical: {entity['canonical_full']}")
+                    out.append(f"  Display: {entity['display_name']}")
                     
-                    # Получаем полный контекст
-                    context = db.get_entity_context(person_id)
+                    if aliases:
+                        out.append(f"  Алиасы ({len(aliases)}):")
+                        out.extend(
+                            f"    {'⭐' if alias['is_primary'] else '  '} {alias['alias_type']}: {alias['alias_text']}"
+                            for alias in aliases
+                        )
                     
-                    if context:
-                        entity = context['entity']
-                        aliases = context['aliases']
-                        affiliations = context['affiliations']
-                        
-                        print(f"Контекст:")
-                        print(f"  Entity ID: {entity['entity_id']}")
-                        print(f"  Type: {entity['entity_type']}")
-                        print(f"  Canonical: {entity['canonical_full']}")
-                        print(f"  Display: {entity['display_name']}")
-                        
-                        if aliases:
-                            print(f"  Алиасы ({len(aliases)}):")
-                            for alias in aliases:
-                                primary_mark = "⭐" if alias['is_primary'] else "  "
-                                print(f"    {primary_mark} {alias['alias_type']}: {alias['alias_text']}")
-                        
-                        if affiliations:
-                            print(f"  Аффилиации ({len(affiliations)}):")
-                            for aff in affiliations:
-                                print(f"    - {aff['role_title']} в {aff['org']['display_name']}")
-                                if aff['symbol']:
-                                    print(f"      Символ: {aff['symbol']}")
-                    else:
-                        print("  ✗ Контекст не найден")
+                    if affiliations:
+                        out.append(f"  Аффилиации ({len(affiliations)}):")
+                        for aff in affiliations:
+                            out.append(f"    - {aff['role_title']} в {aff['org']['display_name']}")
+                            if aff['symbol']:
+                                out.append(f"      Символ: {aff['symbol']}")
                 else:
-                    print(f"  ✗ Персоны с фамилией '{family}' не найдены")
-                    
-            except Exception as e:
-                print(f"  ❌ Ошибка при получении контекста: {e}")
+                    out.append("  ✗ Контекст не найден")
+            else:
+                out.append(f"  ✗ Персоны с фамилией '{family}' не найдены")
+                
+        except Exception as e:
+            out.append(f"  ❌ Ошибка при получении контекста: {e}")
 
 
-def test_organization_context():
+@_buffered_output
+def test_organization_context(db: DatabaseConnection, out: list):
     """Тест получения полного контекста организаций"""
-    print("\n" + "=" * 50)
-    print("ТЕСТ КОНТЕКСТА ОРГАНИЗАЦИЙ")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ТЕСТ КОНТЕКСТА ОРГАНИЗАЦИЙ")
+    out.append("=" * 50)
+    
+    # Тестируем с известными организациями
+    test_orgs = [
+        {"name": "Apple", "entity_id": 183},
+        {"name": "Microsoft", "entity_id": None},  # Найдем по имени
+        {"name": "Tesla", "entity_id": None}       # Найдем по имени
+    ]
+    
+    # Организации без entity_id ищем по имени одним запросом: VALUES со всеми именами
+    # и FTS поиском по алиасам для каждого (display_name организаций тоже хранится алиасом)
+    names = [o['name'] for o in test_orgs if o['entity_id'] is None]
+    found_orgs = {}
+    if names:
+        with db.get_cursor() as cursor:
+            # Текст запроса зависит только от числа имен, так что sqlite3 берет его план из кэша выражений
+            cursor.execute(_ORG_LOOKUP_SQL.format(values=", ".join(["(?, ?)"] * len(names))),
+                           [param for name in names for param in (name, db._escape_fts5_query(name))])
+            found_orgs = {row['name']: row for row in cursor.fetchall()}
     
-    with DatabaseConnection() as db:
-        # Тестируем с известными организациями
-        test_orgs = [
-            {"name": "Apple", "entity_id": 183},
-            {"name": "Microsoft", "entity_id": None},  # Найдем по имени
-            {"name": "Tesla", "entity_id": None}       # Найдем по имени
-        ]
+    # Контексты всех известных и найденных организаций получаем одним пакетом
+    org_ids = [o['entity_id'] for o in test_orgs if o['entity_id']]
+    org_ids += [row['entity_id'] for row in found_orgs.values() if row['entity_id'] is not None]
+    contexts = db.get_entity_contexts(org_ids)
+    
+    for org_info in test_orgs:
+        out.append(f"\n--- Контекст для '{org_info['name']}' ---")
         
-        for org_info in test_orgs:
-            print(f"\n--- Контекст для '{org_info['name']}' ---")
+        try:
+            entity_id = org_info['entity_id']
             
-            try:
-                entity_id = org_info['entity_id']
-                
-                # Если entity_id не указан, ищем по имени
-                if not entity_id:
-                    # Ищем организацию по имени через алиасы
-                    with db.get_cursor() as cursor:
-                        cursor.execute("""
-                            SELECT DISTINCT e.entity_id, e.display_name, e.canonical_full
-                            FROM entities e
-                            JOIN aliases a ON e.entity_id = a.entity_id
-                            WHERE e.entity_type = 'org' 
-                            AND (LOWER(a.alias_text) LIKE LOWER(?) OR LOWER(e.display_name) LIKE LOWER(?))
-                            LIMIT 1
-                        """, (f"%{org_info['name']}%", f"%{org_info['name']}%"))
-                        
-                        result = cursor.fetchone()
-                        if result:
-                            entity_id = result['entity_id']
-                            print(f"Найдена организация: {result['display_name']} (ID: {entity_id})")
-                        else:
-                            print(f"  ✗ Организация '{org_info['name']}' не найдена")
-                            continue
+            # Если entity_id не указан, берем результат поиска по имени
+            if not entity_id:
+                result = found_orgs.get(org_info['name'])
+                if result and result['entity_id'] is not None:
+                    entity_id = result['entity_id']
+                    out.append(f"Найдена организация: {result['display_name']} (ID: {entity_id})")
+                else:
+                    out.append(f"  ✗ Организация '{org_info['name']}' не найдена")
+                    continue
+            
+            if entity_id:
+                # Полный контекст из пакета
+                context = contexts.get(entity_id)
                 
-                if entity_id:
-                    # Получаем полный контекст
-                    context = db.get_entity_context(entity_id)
+                if context:
+                    entity = context['entity']
+                    aliases = context['aliases']
+                    affiliations = context['affiliations']
                     
-                    if context:
-                        entity = context['entity']
-                        aliases = context['aliases']
-                        affiliations = context['affiliations']
-                        
-                        print(f"Контекст:")
-                        print(f"  Entity ID: {entity['entity_id']}")
-                        print(f"  Type: {entity['entity_type']}")
-                        print(f"  Canonical: {entity['canonical_full']}")
-                        print(f"  Display: {entity['display_name']}")
-                        
-                        # Проверяем long_business_summary
-                        if entity['long_business_summary']:
-                            print(f"  Business Summary:")
-                            print(f"    {entity['long_business_summary']}")
-                        else:
-                            print(f"  Business Summary: НЕТ")
-                        
-                        # Дополнительная информация для организаций
-                        if entity['sector']:
-                            print(f"  Sector: {entity['sector']}")
-                        if entity['industry']:
-                            print(f"  Industry: {entity['industry']}")
-                        if entity['full_time_employees']:
-                            print(f"  Employees: {entity['full_time_employees']:,}")
-                        if entity['website']:
-                            print(f"  Website: {entity['website']}")
-                        
-                        if aliases:
-                            print(f"  Алиасы ({len(aliases)}):")
-                            for alias in aliases[:5]:  # Показываем только первые 5
-                                primary_mark = "⭐" if alias['is_primary'] else "  "
-                                print(f"    {primary_mark} {alias['alias_type']}: {alias['alias_text']}")
-                            if len(aliases) > 5:
-                                print(f"    ... и еще {len(aliases) - 5} алиасов")
-                        
-                        if affiliations:
-                            print(f"  Связанные персоны ({len(affiliations)}):")
-                            for aff in affiliations[:3]:  # Показываем только первые 3
-                                print(f"    - {aff['role_title']}: {aff['person']['given']} {aff['person']['family']}")
-                            if len(affiliations) > 3:
-                                print(f"    ... и еще {len(affiliations) - 3} персон")
+                    out.append(f"Контекст:")
+                    out.append(f"  Entity ID: {entity['entity_id']}")
+                    out.append(f"  Type: {entity['entity_type']}")
+                    out.append(f"  Canonical: {entity['canonical_full']}")
+                    out.append(f"  Display: {entity['display_name']}")
+                    
+                    # Проверяем long_business_summary
+                    if entity['long_business_summary']:
+                        out.append(f"  Business Summary:")
+                        out.append(f"    {entity['long_business_summary']}")
                     else:
-                        print("  ✗ Контекст не найден")
-                        
-            except Exception as e:
-                print(f"  ❌ Ошибка при получении контекста: {e}")
+                        out.append(f"  Business Summary: НЕТ")
+                    
+                    # Дополнительная информация для организаций
+                    if entity['sector']:
+                        out.append(f"  Sector: {entity['sector']}")
+                    if entity['industry']:
+                        out.append(f"  Industry: {entity['industry']}")
+                    if entity['full_time_employees']:
+                        out.append(f"  Employees: {entity['full_time_employees']:,}")
+                    if entity['website']:
+                        out.append(f"  Website: {entity['website']}")
+                    
+                    if aliases:
+                        out.append(f"  Алиасы ({len(aliases)}):")
+                        # Показываем только первые 5
+                        out.extend(
+                            f"    {'⭐' if alias['is_primary'] else '  '} {alias['alias_type']}: {alias['alias_text']}"
+                            for alias in aliases[:5]
+                        )
+                        if len(aliases) > 5:
+                            out.append(f"    ... и еще {len(aliases) - 5} алиасов")
+                    
+                    if affiliations:
+                        out.append(f"  Связанные персоны ({len(affiliations)}):")
+                        # Показываем только первые 3
+                        out.extend(
+                            f"    - {aff['role_title']}: {aff['person']['given']} {aff['person']['family']}"
+                            for aff in affiliations[:3]
+                        )
+                        if len(affiliations) > 3:
+                            out.append(f"    ... и еще {len(affiliations) - 3} персон")
+                else:
+                    out.append("  ✗ Контекст не найден")
+                    
+        except Exception as e:
+            out.append(f"  ❌ Ошибка при получении контекста: {e}")
 
 
-def interactive_person_search():
+def interactive_person_search(db: DatabaseConnection):
     """Интерактивный поиск персон"""
     print("\n" + "=" * 50)
     print("ИНТЕРАКТИВНЫЙ ПОИСК ПЕРСОН")
@@ -404,152 +551,193 @@ def interactive_person_search():
     print("Формат: фамилия [имя] [префикс]")
     print("Примеры: 'Cook', 'Cook Timothy', 'Cook T'")
     
-    with DatabaseConnection() as db:
-        while True:
-            try:
-                query = input("\n> ").strip()
-                
-                if query.lower() == 'quit':
-                    break
-                
-                if not query:
-                    continue
-                
-                # Парсим ввод
-                parts = query.split()
-                family = parts[0] if parts else None
-                given = parts[1] if len(parts) > 1 else None
-                given_prefix = None
-                
-                # Если второе слово короткое, считаем его префиксом
-                if given and len(given) <= 3:
-                    given_prefix = given
-                    given = None
-                
-                print(f"\nПоиск: family='{family}', given='{given}', prefix='{given_prefix}'")
-                print("-" * 50)
-                
-                results = db.find_person_by_name(family, given, given_prefix)
-                
-                if results:
-                    print(f"Найдено {len(results)} персон:")
-                    for i, person in enumerate(results, 1):
-                        print(f"\n{i}. {person['given']} {person['family']}")
-                        print(f"   Display: {person['display_name']}")
-                        print(f"   Canonical: {person['canonical_full']}")
-                        
-                        # Показываем аффилиации
-                        affiliations = db.find_person_affiliations(person['entity_id'], active_only=True)
-                        if affiliations:
-                            print(f"   Аффилиации:")
-                            for aff in affiliations[:3]:  # Показываем первые 3
-                                print(f"     - {aff['role_title']} в {aff['org']['display_name']}")
-                                if aff['symbol']:
-                                    print(f"       Символ: {aff['symbol']}")
-                else:
-                    print("Персоны не найдены")
-                
-            except KeyboardInterrupt:
-                print("\nВыход...")
+    while True:
+        try:
+            query = input("\n> ").strip()
+            
+            if query.lower() == 'quit':
                 break
-            except Exception as e:
-                print(f"Ошибка: {e}")
+            
+            if not query:
+                continue
+            
+            # Парсим ввод
+            parts = query.split()
+            family = parts[0] if parts else None
+            given = parts[1] if len(parts) > 1 else None
+            given_prefix = None
+            
+            # Если второе слово короткое, считаем его префиксом
+            if given and len(given) <= 3:
+                given_prefix = given
+                given = None
+            
+            print(f"\nПоиск: family='{family}', given='{given}', prefix='{given_prefix}'")
+            print("-" * 50)
+            
+            results = _cached_find_person(db, family, given, given_prefix)
+            
+            if results:
+                print(f"Найдено {len(results)} персон:")
+                for i, person in enumerate(results, 1):
+                    print(f"\n{i}. {person['given']} {person['family']}")
+                    print(f"   Display: {person['display_name']}")
+                    print(f"   Canonical: {person['canonical_full']}")
+                    
+                    # Показываем аффилиации
+                    affiliations = _cached_affiliations(db, person['entity_id'])
+                    if affiliations:
+                        print(f"   Аффилиации:")
+                        for aff in affiliations[:3]:  # Показываем первые 3
+                            print(f"     - {aff['role_title']} в {aff['org']['display_name']}")
+                            if aff['symbol']:
+                                print(f"       Символ: {aff['symbol']}")
+            else:
+                print("Персоны не найдены")
+            
+        except KeyboardInterrupt:
+            print("\nВыход...")
+            break
+        except Exception as e:
+            print(f"Ошибка: {e}")
 
 
 
 
-def interactive_search():
+def interactive_search(db: DatabaseConnection):
     """Интерактивный поиск"""
     print("\n" + "=" * 50)
     print("ИНТЕРАКТИВНЫЙ ПОИСК")
     print("=" * 50)
     print("Введите поисковый запрос (или 'quit' для выхода)")
     
-    with DatabaseConnection() as db:
-        while True:
-            try:
-                query = input("\n> ").strip()
-                
-                if query.lower() == 'quit':
-                    break
-                
-                if not query:
-                    continue
-                
-                print(f"\nПоиск: '{query}'")
-                print("-" * 30)
-                
-                # Точный поиск
-                exact_results = db.find_entity_by_alias(query, fuzzy=False)
-                print(f"Точный поиск: {len(exact_results)} результатов")
-                
-                # FTS поиск
-                fts_results = db.find_entity_by_alias(query, fuzzy=True)
-                print(f"FTS поиск: {len(fts_results)} результатов")
-                
-                if fts_results:
-                    print("\nНайденные сущности:")
-                    for i, result in enumerate(fts_results, 1):
-                        entity = result['entity']
-                        print(f"  {i}. {entity['display_name']} ({entity['entity_type']})")
-                        print(f"     Alias: '{result['alias_text']}' ({result['alias_type']})")
-                        print(f"     Confidence: {result['confidence']}")
-                
-            except KeyboardInterrupt:
-                print("\nВыход...")
+    while True:
+        try:
+            query = input("\n> ").strip()
+            
+            if query.lower() == 'quit':
                 break
-            except Exception as e:
-                print(f"Ошибка: {e}")
+            
+            if not query:
+                continue
+            
+            print(f"\nПоиск: '{query}'")
+            print("-" * 30)
+            
+            # Точный поиск
+            exact_results = _cached_find(db, query, False)
+            print(f"Точный поиск: {len(exact_results)} результатов")
+            
+            # FTS поиск
+            fts_results = _cached_find(db, query, True)
+            print(f"FTS поиск: {len(fts_results)} результатов")
+            
+            # Поиск по подстроке (trigram индекс) - когда по словам ничего не нашлось
+            if not fts_results and len(query) >= 3:
+                fts_results = db.find_entity_by_alias_substring(query)
+                print(f"Поиск по подстроке: {len(fts_results)} результатов")
+            
+            if fts_results:
+                print("\nНайденные сущности:")
+                print("\n".join(
+                    f"  {i}. {r['entity']['display_name']} ({r['entity']['entity_type']})\n"
+                    f"     Alias: '{r['alias_text']}' ({r['alias_type']})\n"
+                    f"     Confidence: {r['confidence']}"
+                    for i, r in enumerate(fts_results, 1)
+                ))
+            
+        except KeyboardInterrupt:
+            print("\nВыход...")
+            break
+        except Exception as e:
+            print(f"Ошибка: {e}")
 
 
-def show_database_info():
+@_buffered_output
+def show_database_info(db: DatabaseConnection, out: list):
     """Показать информацию о базе данных"""
-    print("\n" + "=" * 50)
-    print("ИНФОРМАЦИЯ О БАЗЕ ДАННЫХ")
-    print("=" * 50)
+    out.append("\n" + "=" * 50)
+    out.append("ИНФОРМАЦИЯ О БАЗЕ ДАННЫХ")
+    out.append("=" * 50)
     
-    with DatabaseConnection() as db:
-        with db.get_cursor() as cursor:
-            # Проверяем FTS таблицу
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='alias_fts'")
-            if cursor.fetchone():
-                print("✓ FTS таблица 'alias_fts' существует")
-                
-                # Количество записей в FTS
-                cursor.execute("SELECT COUNT(*) as count FROM alias_fts")
-                fts_count = cursor.fetchone()['count']
-                print(f"✓ Записей в FTS: {fts_count}")
-                
-                # Количество записей в aliases
-                cursor.execute("SELECT COUNT(*) as count FROM aliases")
-                aliases_count = cursor.fetchone()['count']
-                print(f"✓ Записей в aliases: {aliases_count}")
-                
-                # Количество записей в entities
-                cursor.execute("SELECT COUNT(*) as count FROM entities")
-                entities_count = cursor.fetchone()['count']
-                print(f"✓ Записей в entities: {entities_count}")
-                
-                # Количество персон
-                cursor.execute("SELECT COUNT(*) as count FROM entities WHERE entity_type = 'person'")
-                persons_count = cursor.fetchone()['count']
-                print(f"✓ Записей персон: {persons_count}")
-                
-                # Примеры алиасов
-                cursor.execute("SELECT alias_text, alias_type FROM aliases LIMIT 10")
-                print("\nПримеры алиасов:")
-                for row in cursor.fetchall():
-                    print(f"  - '{row['alias_text']}' ({row['alias_type']})")
+    with db.get_cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('aliases', 'alias_trigram_fts')")
+        existing = {row['name'] for row in cursor.fetchall()}
+    # Одноразовая миграция: trigram индекс алиасов для поиска по подстроке
+    if 'aliases' in existing and 'alias_trigram_fts' not in existing:
+        db.ensure_entities_tables()
+    
+    with db.get_cursor() as cursor:
+        # Проверяем FTS таблицу
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='alias_fts'")
+        if cursor.fetchone():
+            out.append("✓ FTS таблица 'alias_fts' существует")
+            
+            # Количество записей в FTS, aliases, entities и персон одним запросом
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM alias_fts) AS fts_count,
+                    (SELECT COUNT(*) FROM aliases) AS aliases_count,
+                    (SELECT COUNT(*) FROM entities) AS entities_count,
+                    (SELECT COUNT(*) FROM entities WHERE entity_type = 'person') AS persons_count
+            """)
+            fts_count, aliases_count, entities_count, persons_count = cursor.fetchone()
+            out.append(f"✓ Записей в FTS: {fts_count}")
+            out.append(f"✓ Записей в aliases: {aliases_count}")
+            out.append(f"✓ Записей в entities: {entities_count}")
+            out.append(f"✓ Записей персон: {persons_count}")
+            
+            # Примеры алиасов
+            cursor.execute("SELECT alias_text, alias_type FROM aliases LIMIT 10")
+            out.append("\nПримеры алиасов:")
+            out.extend(f"  - '{row['alias_text']}' ({row['alias_type']})" for row in cursor.fetchall())
+            
+            # Примеры персон
+            if persons_count > 0:
+                cursor.execute("SELECT given, family, display_name FROM entities WHERE entity_type = 'person' LIMIT 5")
+                out.append("\nПримеры персон:")
+                out.extend(f"  - {row['given']} {row['family']} (display: {row['display_name']})"
+                           for row in cursor.fetchall())
                 
-                # Примеры персон
-                if persons_count > 0:
-                    cursor.execute("SELECT given, family, display_name FROM entities WHERE entity_type = 'person' LIMIT 5")
-                    print("\nПримеры персон:")
-                    for row in cursor.fetchall():
-                        print(f"  - {row['given']} {row['family']} (display: {row['display_name']})")
-                    
-            else:
-                print("✗ FTS таблица 'alias_fts' не найдена")
+        else:
+            out.append("✗ FTS таблица 'alias_fts' не найдена")
+
+
+def _open_db(db_path: str = None) -> DatabaseConnection:
+    """Подключение для playground: WAL (читатели не блокируют друг друга), кэш страниц и temp в памяти"""
+    db = DatabaseConnection(db_path) if db_path else DatabaseConnection()
+    conn = db.get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return db
+
+
+def _run_parallel(db_path: str, tests: list, max_workers: int = PARALLEL_WORKERS):
+    """
+    Запустить независимые тесты в пуле потоков
+    
+    У каждого потока свое подключение: DatabaseConnection сериализует курсоры одного
+    подключения, а отдельные подключения в WAL читают параллельно. Вывод тестов
+    буферизуется (_buffered_output), так что блоки не перемешиваются.
+    """
+    local = threading.local()
+    opened = []
+    
+    def run(test):
+        worker_db = getattr(local, 'db', None)
+        if worker_db is None:
+            worker_db = local.db = _open_db(db_path)
+            opened.append(worker_db)
+        test(worker_db)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(run, tests))
+    finally:
+        for worker_db in opened:
+            worker_db.close()
 
 
 def main():
@@ -557,77 +745,81 @@ def main():
     print("FTS ALIAS SEARCH PLAYGROUND")
     print("Простой playground для экспериментов с поиском по алиасам и персонам")
     
-    try:
-        # Показываем информацию о БД
-        show_database_info()
-        
-        # Базовые тесты для алиасов
-        test_basic_search()
-        test_fts_operators()
-        compare_search_methods()
-        
-        # Тесты для персон (компактные)
-        test_person_search()
-        test_person_search_variations()
-        
-        # Пропускаем длинные тесты по умолчанию
-        print("\n" + "=" * 60)
-        print("ДОПОЛНИТЕЛЬНЫЕ ТЕСТЫ")
-        print("=" * 60)
-        print("Хотите запустить дополнительные тесты?")
-        print("1. Тесты аффилиаций персон")
-        print("2. Тесты контекста персон")
-        print("3. Тесты контекста организаций")
-        print("4. Пропустить дополнительные тесты")
-        
-        choice = input("\nВыберите опцию (1-4): ").strip()
-        
-        if choice == '1':
-            test_person_affiliations()
-        elif choice == '2':
-            test_person_context()
-        elif choice == '3':
-            test_organization_context()
-        elif choice == '4':
-            print("Пропускаем дополнительные тесты")
-        else:
-            print("Неверный выбор, пропускаем дополнительные тесты")
-        
-        # Интерактивные режимы
-        print("\n" + "=" * 60)
-        print("ИНТЕРАКТИВНЫЕ РЕЖИМЫ")
-        print("=" * 60)
-        print("1. Поиск по алиасам (компании, символы)")
-        print("2. Поиск по персонам")
-        print("3. Выход")
-        
-        while True:
-            try:
-                choice = input("\nВыберите режим (1-3): ").strip()
-                
-                if choice == '1':
-                    interactive_search()
-                elif choice == '2':
-                    interactive_person_search()
-                elif choice == '3':
-                    print("До свидания!")
-                    break
-                else:
-                    print("Неверный выбор. Введите 1, 2 или 3.")
+    # Одно подключение на все последовательные тесты: без повторных connect/close и с прогретым кэшем страниц
+    with _open_db() as db:
+        try:
+            # Показываем информацию о БД
+            show_database_info(db)
+            
+            # Базовые тесты для алиасов и компактные тесты для персон независимы и только читают БД
+            _run_parallel(db.db_path, [
+                test_basic_search,
+                test_fts_operators,
+                compare_search_methods,
+                test_person_search,
+                test_person_search_variations,
+            ])
+            
+            # Пропускаем длинные тесты по умолчанию
+            print("\n" + "=" * 60)
+            print("ДОПОЛНИТЕЛЬНЫЕ ТЕСТЫ")
+            print("=" * 60)
+            print("Хотите запустить дополнительные тесты?")
+            print("1. Тесты аффилиаций персон")
+            print("2. Тесты контекста персон")
+            print("3. Тесты контекста организаций")
+            print("4. Пропустить дополнительные тесты")
+            
+            choice = input("\nВыберите опцию (1-4): ").strip()
+            
+            if choice == '1':
+                test_person_affiliations(db)
+            elif choice == '2':
+                test_person_context(db)
+            elif choice == '3':
+                test_organization_context(db)
+            elif choice == '4':
+                print("Пропускаем дополнительные тесты")
+            else:
+                print("Неверный выбор, пропускаем дополнительные тесты")
+            
+            # Интерактивные режимы
+            print("\n" + "=" * 60)
+            print("ИНТЕРАКТИВНЫЕ РЕЖИМЫ")
+            print("=" * 60)
+            print("1. Поиск по алиасам (компании, символы)")
+            print("2. Поиск по персонам")
+            print("3. Выход")
+            
+            while True:
+                try:
+                    choice = input("\nВыберите режим (1-3): ").strip()
                     
-            except KeyboardInterrupt:
-                print("\nВыход...")
-                break
-            except Exception as e:
-                print(f"Ошибка: {e}")
-        
-    except Exception as e:
-        print(f"\nОшибка: {e}")
-        print("\nВозможные причины:")
-        print("1. База данных не существует")
-        print("2. Схема БД не создана")
-        print("3. Нет данных в таблице aliases")
-        print("4. Нет данных в таблице entities")
+                    if choice == '1':
+                        interactive_search(db)
+                    elif choice == '2':
+                        interactive_person_search(db)
+                    elif choice == '3':
+                        print("До свидания!")
+                        break
+                    else:
+                        print("Неверный выбор. Введите 1, 2 или 3.")
+                        
+                except KeyboardInterrupt:
+                    print("\nВыход...")
+                    break
+                except Exception as e:
+                    print(f"Ошибка: {e}")
+            
+        except Exception as e:
+            print(f"\nОшибка: {e}")
+            print("\nВозможные причины:")
+            print("1. База данных не существует")
+            print("2. Схема БД не создана")
+            print("3. Нет данных в таблице aliases")
+            print("4. Нет данных в таблице entities")
+        finally:
+            _clear_caches()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,27 @@
 import sqlite3
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Literal, List, Dict, Any, get_origin
 from contextlib import contextmanager
 import hashlib
 import json
+import orjson
 from datetime import datetime, timezone, timedelta
 
+# Fuzzy web search cache lookup: FTS candidates fetched per query and the
+# minimal trigram Jaccard similarity for a cached query to count as a match
+FUZZY_CANDIDATES = 50
+FUZZY_MIN_SIMILARITY = 0.5
+
 class DatabaseConnection:
     def __init__(self, db_path: str = "data/db/news.db"):
         self.db_path = db_path
         self._connection: Optional[sqlite3.Connection] = None
+        # Один connection используется из нескольких потоков (параллельные запросы к провайдерам)
+        self._lock = threading.RLock()
+        # Вложенность пакетных транзакций (см. batch()): пока > 0, commit откладывается
+        self._batch_depth = 0
         
     def get_connection(self) -> sqlite3.Connection:
         """Получить подключение к БД"""
@@ -18,7 +30,9 @@ class DatabaseConnection:
             db_dir = Path(self.db_path).parent
             db_dir.mkdir(parents=True, exist_ok=True)
             
-            self._connection = sqlite3.connect(self.db_path, timeout=30)
+            # Кэш подготовленных выражений больше дефолтных 128: запросов с разным текстом много
+            self._connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                                               cached_statements=256)
             self._connection.row_factory = sqlite3.Row  # Для удобного доступа к колонкам
             
             # self._connection.execute("PRAGMA journal_mode=WAL;")
@@ -29,17 +43,45 @@ class DatabaseConnection:
     
     @contextmanager
     def get_cursor(self):
-        """Контекстный менеджер для работы с курсором"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Контекстный менеджер для работы с курсором (сериализован между потоками)"""
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                if not self._batch_depth:
+                    conn.commit()
+            except Exception:
+                # Внутри пакета не откатываем чужие записи: ошибочный оператор SQLite уже отменил сам
+                if not self._batch_depth:
+                    conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Пакетная транзакция: записи из всех потоков внутри блока фиксируются одним commit в конце
+        
+        Блокировка на время блока не удерживается, так что рабочие потоки продолжают
+        писать через get_cursor().
+        """
+        with self._lock:
+            self._batch_depth += 1
         try:
-            yield cursor
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
+            yield self
         finally:
-            cursor.close()
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._connection is not None:
+                    self._connection.commit()
+    
+    def commit(self):
+        """Зафиксировать накопленные записи сейчас, в том числе внутри batch()"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
     
     def close(self):
         """Закрыть подключение"""
@@ -907,9 +949,19 @@ class DatabaseConnection:
             
             # Execute entities schema
             with self.get_cursor() as cursor:
+                # Trigram-индекс алиасов, появившийся позже: для существующей БД заполняем из aliases
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'aliases'")
+                has_aliases = cursor.fetchone() is not None
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'alias_trigram_fts'")
+                build_trigram = has_aliases and cursor.fetchone() is None
+                
                 cursor.executescript(entities_sql)
                 print("Таблицы entities созданы успешно!")
                 
+                if build_trigram:
+                    cursor.execute("INSERT INTO alias_trigram_fts(alias_trigram_fts) VALUES('rebuild')")
+                    print("FTS-индекс alias_trigram_fts построен (trigram)")
+                
                 # Ensure UNIQUE constraint exists for affiliations (for existing databases)
                 try:
                     cursor.execute("""
@@ -1636,18 +1688,22 @@ class DatabaseConnection:
             return None
 
             
-    def find_entity_by_alias(self, alias_text: str, fuzzy: bool = False) -> list[dict]:
+    def find_entity_by_alias(self, alias_text: str, fuzzy: bool = False, limit: Optional[int] = None,
+                             pre_normalized: bool = False) -> list[dict]:
         """
         Search entities by any alias text
         
         Args:
             alias_text: Text to search for
             fuzzy: If True, use FTS5 for partial matching
+            limit: Max number of rows to fetch (None = all), applied in SQL
+            pre_normalized: alias_text is already _normalize_text() output, skip normalizing it again
             
         Returns:
             list: List of dicts with entity, alias_type, confidence, alias_text
         """
         try:
+            limit_sql, limit_params = (" LIMIT ?", (limit,)) if limit is not None else ("", ())
             with self.get_cursor() as cursor:
                 if fuzzy:
                     # Use FTS5 for fuzzy matching
@@ -1660,17 +1716,17 @@ class DatabaseConnection:
                         JOIN alias_fts fts ON a.alias_id = fts.rowid
                         WHERE alias_fts MATCH ?
                         ORDER BY a.confidence DESC, a.is_primary DESC
-                    """, (escaped_text,))
+                    """ + limit_sql, (escaped_text, *limit_params))
                 else:
                     # Exact match on normalized field
-                    normalized = self._normalize_text(alias_text)
+                    normalized = alias_text if pre_normalized else self._normalize_text(alias_text)
                     cursor.execute("""
                         SELECT e.*, a.alias_type, a.confidence, a.alias_text
                         FROM entities e 
                         JOIN aliases a ON e.entity_id = a.entity_id
                         WHERE a.normalized = ?
                         ORDER BY a.confidence DESC
-                    """, (normalized,))
+                    """ + limit_sql, (normalized, *limit_params))
                 
                 results = []
                 for row in cursor.fetchall():
@@ -1687,6 +1743,40 @@ class DatabaseConnection:
             print(f"Ошибка при поиске entity по alias {alias_text}: {e}")
             return []
     
+    def find_entity_by_alias_substring(self, text: str, limit: Optional[int] = None) -> list[dict]:
+        """
+        Search entities whose alias text contains the given substring (trigram FTS index)
+        
+        Args:
+            text: Substring to search for (at least 3 characters, shorter text matches nothing)
+            limit: Max number of rows to fetch (None = all), applied in SQL
+            
+        Returns:
+            list: List of dicts with entity, alias_type, confidence, alias_text
+        """
+        try:
+            limit_sql, limit_params = (" LIMIT ?", (limit,)) if limit is not None else ("", ())
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT e.*, a.alias_type, a.confidence, a.alias_text
+                    FROM alias_trigram_fts fts
+                    JOIN aliases a ON a.alias_id = fts.rowid
+                    JOIN entities e ON e.entity_id = a.entity_id
+                    WHERE alias_trigram_fts MATCH ?
+                    ORDER BY a.confidence DESC, a.is_primary DESC
+                """ + limit_sql, (self._escape_fts5_query(text), *limit_params))
+                
+                return [{
+                    'entity': dict(row),
+                    'alias_type': row['alias_type'],
+                    'confidence': row['confidence'],
+                    'alias_text': row['alias_text']
+                } for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Ошибка при поиске entity по подстроке alias {text}: {e}")
+            return []
+    
     def find_person_by_name(self, family: str, given: str = None, given_prefix: str = None) -> list[dict]:
         """
         Search for persons by name components
@@ -1907,7 +1997,116 @@ class DatabaseConnection:
             print(f"Ошибка при получении context для entity {entity_id}: {e}")
             return {}
     
-    def _normalize_text(self, text: str) -> str:
+    def get_entity_contexts(self, entity_ids: List[int]) -> Dict[int, dict]:
+        """
+        Get contexts for several entities at once (same shape as get_entity_context)
+        
+        Instead of 3 queries per entity runs one query per table with WHERE ... IN (...)
+        and groups the rows by entity_id in Python.
+        
+        Args:
+            entity_ids: IDs of entities
+            
+        Returns:
+            dict: entity_id -> {'entity', 'aliases', 'affiliations'}; missing entities are omitted
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        if not ids:
+            return {}
+        
+        try:
+            with self.get_cursor() as cursor:
+                placeholders = ",".join("?" * len(ids))
+                cursor.execute(f"SELECT * FROM entities WHERE entity_id IN ({placeholders})", ids)
+                contexts = {
+                    row['entity_id']: {'entity': dict(row), 'aliases': [], 'affiliations': []}
+                    for row in cursor.fetchall()
+                }
+                if not contexts:
+                    return {}
+                
+                # Aliases of all entities (order inside each entity as in get_entity_context)
+                cursor.execute(f"""
+                    SELECT entity_id, alias_text, alias_type, is_primary 
+                    FROM aliases 
+                    WHERE entity_id IN ({placeholders}) 
+                    ORDER BY entity_id, is_primary DESC, alias_type
+                """, ids)
+                for row in cursor.fetchall():
+                    contexts[row['entity_id']]['aliases'].append({
+                        'alias_text': row['alias_text'],
+                        'alias_type': row['alias_type'],
+                        'is_primary': row['is_primary']
+                    })
+                
+                org_ids = [eid for eid, ctx in contexts.items() if ctx['entity']['entity_type'] == 'org']
+                person_ids = [eid for eid, ctx in contexts.items() if ctx['entity']['entity_type'] == 'person']
+                
+                if org_ids:
+                    # Affiliated persons of all organizations
+                    cursor.execute(f"""
+                        SELECT 
+                            e.*,
+                            a.org_id AS _context_id,
+                            a.role_title,
+                            a.valid_from,
+                            a.valid_to,
+                            a.confidence
+                        FROM affiliations a
+                        JOIN entities e ON a.person_id = e.entity_id
+                        WHERE a.org_id IN ({",".join("?" * len(org_ids))})
+                        ORDER BY a.confidence DESC
+                    """, org_ids)
+                    
+                    for row in cursor.fetchall():
+                        person_data = {key: value for key, value in dict(row).items()
+                                       if key not in ['_context_id', 'role_title', 'valid_from', 'valid_to', 'confidence']}
+                        contexts[row['_context_id']]['affiliations'].append({
+                            'person': person_data,
+                            'role_title': row['role_title'],
+                            'valid_from': row['valid_from'],
+                            'valid_to': row['valid_to'],
+                            'confidence': row['confidence']
+                        })
+                
+                if person_ids:
+                    # Affiliated organizations of all persons
+                    cursor.execute(f"""
+                        SELECT 
+                            e.*,
+                            a.person_id AS _context_id,
+                            s.alias_text as symbol,
+                            a.role_title,
+                            a.valid_from,
+                            a.valid_to,
+                            a.confidence
+                        FROM affiliations a
+                        JOIN entities e ON a.org_id = e.entity_id
+                        LEFT JOIN aliases s ON a.symbol_alias_id = s.alias_id
+                        WHERE a.person_id IN ({",".join("?" * len(person_ids))})
+                        ORDER BY a.confidence DESC
+                    """, person_ids)
+                    
+                    for row in cursor.fetchall():
+                        org_data = {key: value for key, value in dict(row).items()
+                                    if key not in ['_context_id', 'symbol', 'role_title', 'valid_from', 'valid_to', 'confidence']}
+                        contexts[row['_context_id']]['affiliations'].append({
+                            'org': org_data,
+                            'symbol': row['symbol'],
+                            'role_title': row['role_title'],
+                            'valid_from': row['valid_from'],
+                            'valid_to': row['valid_to'],
+                            'confidence': row['confidence']
+                        })
+                
+                return contexts
+                
+        except Exception as e:
+            print(f"Ошибка при получении context для entities {ids}: {e}")
+            return {}
+    
+    @staticmethod
+    def _normalize_text(text: str) -> str:
         """
         Normalize text using NFKD decomposition, remove diacritics, and convert to lowercase.
         Helper method for search functionality.
@@ -1915,6 +2114,10 @@ class DatabaseConnection:
         if not text:
             return ""
         
+        # ASCII fast path: NFKD and diacritics removal leave ASCII text unchanged
+        if text.isascii():
+            return text.lower().strip()
+        
         import unicodedata
         
         # NFKD normalization
@@ -1954,6 +2157,13 @@ class DatabaseConnection:
 
     # ========== Web Search Cache Functions ==========
     
+    @staticmethod
+    def _json_default(obj: Any) -> Any:
+        """orjson.dumps fallback for result objects exposing as_dict() (e.g. SearchResult)"""
+        if hasattr(obj, 'as_dict'):
+            return obj.as_dict()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
     def ensure_web_search_tables(self) -> bool:
         """Create web_search_cache table from web_search.sql schema"""
         try:
@@ -1968,7 +2178,42 @@ class DatabaseConnection:
             
             # Execute web_search schema
             with self.get_cursor() as cursor:
+                # WAL: читатели не блокируют писателя; synchronous=NORMAL - без fsync на каждый commit
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                
+                # FTS-индекс со старым токенайзером (unicode61) пересоздаем как trigram
+                cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'web_search_cache_fts'")
+                fts_row = cursor.fetchone()
+                rebuild_fts = fts_row is not None and 'trigram' not in fts_row[0]
+                if rebuild_fts:
+                    cursor.execute("DROP TABLE web_search_cache_fts")
+                
                 cursor.executescript(web_search_sql)
+                
+                if rebuild_fts:
+                    cursor.execute("INSERT INTO web_search_cache_fts(web_search_cache_fts) VALUES('rebuild')")
+                    print("FTS-индекс web_search_cache_fts перестроен (trigram)")
+                
+                # Колонки, добавленные после создания таблицы
+                cursor.execute("PRAGMA table_info(web_search_cache)")
+                existing_columns = {row[1] for row in cursor.fetchall()}
+                if 'valid_until_utc' not in existing_columns:
+                    cursor.execute("ALTER TABLE web_search_cache ADD COLUMN valid_until_utc TEXT")
+                    print("Добавлена колонка: valid_until_utc (TEXT)")
+                if 'entity_type' not in existing_columns:
+                    cursor.execute("ALTER TABLE web_search_cache ADD COLUMN entity_type TEXT")
+                    print("Добавлена колонка: entity_type (TEXT)")
+                
+                cursor.execute("PRAGMA table_info(provider_state)")
+                state_columns = {row[1] for row in cursor.fetchall()}
+                if 'backoff_until' not in state_columns:
+                    cursor.execute("ALTER TABLE provider_state ADD COLUMN backoff_until INTEGER")
+                    print("Добавлена колонка: provider_state.backoff_until (INTEGER)")
+                if 'attempts' not in state_columns:
+                    cursor.execute("ALTER TABLE provider_state ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+                    print("Добавлена колонка: provider_state.attempts (INTEGER)")
+                
                 print("Таблицы web_search_cache созданы успешно!")
                 
             return True
@@ -1976,73 +2221,112 @@ class DatabaseConnection:
             print(f"Ошибка при создании таблиц web_search: {e}")
             return False
 
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        """Set of 3-character substrings (same units as the FTS trigram tokenizer)"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _fuzzy_cache_candidates(self, cursor, normalized_query: str, provider: Optional[str] = None,
+                                now: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Cached rows whose query is similar to normalized_query (trigram FTS lookup)
+        
+        The index is queried with the query's trigrams OR-ed together (best bm25
+        first), then candidates are kept if their trigram Jaccard similarity is
+        at least FUZZY_MIN_SIMILARITY (typos) or one query contains the other as
+        whole words ("apple" / "apple inc"). Queries shorter than 3 characters
+        have no trigrams and match nothing.
+        
+        Returns:
+            Row dicts with 'similarity', most similar first
+        """
+        query_trigrams = self._trigrams(normalized_query)
+        if not query_trigrams:
+            return []
+        match = ' OR '.join('"' + t.replace('"', '""') + '"' for t in sorted(query_trigrams))
+        
+        cursor.execute("""
+            SELECT c.* FROM (
+                SELECT rowid, rank FROM web_search_cache_fts 
+                WHERE web_search_cache_fts MATCH ? 
+                ORDER BY rank LIMIT ?
+            ) fts
+            INNER JOIN web_search_cache c ON c.id = fts.rowid
+            WHERE (? IS NULL OR c.provider = ?)
+            AND (? IS NULL OR c.valid_until_utc IS NULL OR c.valid_until_utc > ?)
+            ORDER BY fts.rank
+        """, (match, FUZZY_CANDIDATES, provider, provider, now, now))
+        
+        padded_query = f" {normalized_query} "
+        candidates = []
+        for row in cursor.fetchall():
+            row_query = row['normalized_query']
+            row_trigrams = self._trigrams(row_query)
+            similarity = len(query_trigrams & row_trigrams) / len(query_trigrams | row_trigrams)
+            padded_row = f" {row_query} "
+            if (similarity >= FUZZY_MIN_SIMILARITY
+                    or padded_query in padded_row or padded_row in padded_query):
+                candidate = dict(row)
+                candidate['similarity'] = similarity
+                candidates.append(candidate)
+        candidates.sort(key=lambda r: r['similarity'], reverse=True)
+        return candidates
+
     def get_cached_search(self, normalized_query: str, provider: Optional[str] = None, fuzzy: bool = False, 
                          filter_empty: bool = False) -> Optional[dict]:
         """
         Retrieve cached search result by normalized query
-        If fuzzy=True, uses FTS5 search for flexible matching
+        If fuzzy=True, uses the FTS5 trigram index for flexible matching
         
         Args:
             normalized_query: Normalized query string
             provider: Optional provider filter ('wikipedia', 'wikidata', etc.)
-            fuzzy: If True, use FTS search for partial matching
+            fuzzy: If True, match similar cached queries (most similar first, then status/recency)
             filter_empty: If True, filter out results with status 'empty', 'error', or 'ratelimited'
             
         Returns:
-            Dict with cached result or None if not found (or filtered out)
+            Dict with cached result or None if not found (or filtered out / expired)
         """
+        now = datetime.now(timezone.utc).isoformat()
         try:
             with self.get_cursor() as cursor:
                 if fuzzy:
-                    # Use FTS5 for flexible search
-                    if provider:
-                        cursor.execute("""
-                            SELECT c.* FROM web_search_cache c
-                            INNER JOIN web_search_cache_fts fts ON c.id = fts.rowid
-                            WHERE web_search_cache_fts MATCH ? AND c.provider = ?
-                            ORDER BY 
-                                CASE WHEN c.status = 'ok' AND c.results_json != '[]' THEN 0 ELSE 1 END,
-                                c.fetched_at_utc DESC
-                            LIMIT 1
-                        """, (normalized_query, provider))
-                    else:
-                        cursor.execute("""
-                            SELECT c.* FROM web_search_cache c
-                            INNER JOIN web_search_cache_fts fts ON c.id = fts.rowid
-                            WHERE web_search_cache_fts MATCH ?
-                            ORDER BY 
-                                CASE WHEN c.status = 'ok' AND c.results_json != '[]' THEN 0 ELSE 1 END,
-                                c.fetched_at_utc DESC
-                            LIMIT 1
-                        """, (normalized_query,))
+                    # Trigram FTS lookup; among equally similar queries prefer ok, then newest
+                    candidates = self._fuzzy_cache_candidates(cursor, normalized_query, provider, now)
+                    candidates.sort(key=lambda r: r['fetched_at_utc'], reverse=True)
+                    candidates.sort(key=lambda r: (-r['similarity'],
+                                                   0 if r['status'] == 'ok' and r['results_json'] != '[]' else 1))
+                    row = candidates[0] if candidates else None
                 else:
                     # Exact match - prioritize results with status='ok' and non-empty results
                     if provider:
                         cursor.execute("""
                             SELECT * FROM web_search_cache 
                             WHERE normalized_query = ? AND provider = ?
+                            AND (valid_until_utc IS NULL OR valid_until_utc > ?)
                             ORDER BY 
                                 CASE WHEN status = 'ok' AND results_json != '[]' THEN 0 ELSE 1 END,
                                 fetched_at_utc DESC
                             LIMIT 1
-                        """, (normalized_query, provider))
+                        """, (normalized_query, provider, now))
                     else:
                         cursor.execute("""
                             SELECT * FROM web_search_cache 
                             WHERE normalized_query = ?
+                            AND (valid_until_utc IS NULL OR valid_until_utc > ?)
                             ORDER BY 
                                 CASE WHEN status = 'ok' AND results_json != '[]' THEN 0 ELSE 1 END,
                                 fetched_at_utc DESC
                             LIMIT 1
-                        """, (normalized_query,))
+                        """, (normalized_query, now))
+                    row = cursor.fetchone()
                 
-                row = cursor.fetchone()
                 if row:
                     result = dict(row)
-                    result['results'] = json.loads(result['results_json'])
+                    result['results'] = orjson.loads(result['results_json'])
                     
                     # Filter out empty/invalid results if requested
-                    if filter_empty and result.get('status') in ('empty', 'error', 'ratelimited'):
+                    if filter_empty and result.get('status') in ('empty', 'error', 'ratelimited', 'empty_global'):
                         return None
                     
                     return result
@@ -2051,6 +2335,53 @@ class DatabaseConnection:
             print(f"Ошибка при получении кэша для '{normalized_query}': {e}")
             return None
 
+    def get_cached_searches(self, normalized_queries: List[str], filter_empty: bool = False) -> Dict[str, dict]:
+        """
+        Retrieve cached search results for many normalized queries at once (exact match)
+        
+        Same row priority and expiry rules as get_cached_search, but one IN query
+        per chunk of 900 parameters instead of one query per string (SQLite variable limit).
+        
+        Args:
+            normalized_queries: Normalized query strings
+            filter_empty: If True, filter out results with status 'empty', 'error', or 'ratelimited'
+            
+        Returns:
+            Dict {normalized_query: cached result}; queries without a (valid) hit are absent
+        """
+        unique = list(dict.fromkeys(normalized_queries))
+        now = datetime.now(timezone.utc).isoformat()
+        found = {}
+        try:
+            with self.get_cursor() as cursor:
+                for i in range(0, len(unique), 899):
+                    chunk = unique[i:i + 899]  # +1 parameter for the expiry check
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f"""
+                        SELECT * FROM web_search_cache 
+                        WHERE normalized_query IN ({placeholders})
+                        AND (valid_until_utc IS NULL OR valid_until_utc > ?)
+                        ORDER BY 
+                            normalized_query,
+                            CASE WHEN status = 'ok' AND results_json != '[]' THEN 0 ELSE 1 END,
+                            fetched_at_utc DESC
+                    """, (*chunk, now))
+                    for row in cursor.fetchall():
+                        key = row['normalized_query']
+                        if key in found:
+                            continue  # Best row for this query already taken
+                        result = dict(row)
+                        result['results'] = orjson.loads(result['results_json'])
+                        found[key] = result
+            
+            if filter_empty:
+                found = {k: r for k, r in found.items() 
+                         if r.get('status') not in ('empty', 'error', 'ratelimited', 'empty_global')}
+            return found
+        except Exception as e:
+            print(f"Ошибка при пакетном получении кэша ({len(unique)} запросов): {e}")
+            return {}
+
     def get_all_cached_searches(self, normalized_query: str, fuzzy: bool = False, 
                                filter_empty: bool = True) -> List[Dict[str, Any]]:
         """
@@ -2058,7 +2389,7 @@ class DatabaseConnection:
         
         Args:
             normalized_query: Normalized query string
-            fuzzy: If True, use FTS search for partial matching
+            fuzzy: If True, include similar cached queries (trigram FTS lookup)
             filter_empty: If True, filter out empty/error results
             
         Returns:
@@ -2068,18 +2399,10 @@ class DatabaseConnection:
         try:
             with self.get_cursor() as cursor:
                 if fuzzy:
-                    cursor.execute("""
-                        SELECT c.* FROM web_search_cache c
-                        INNER JOIN web_search_cache_fts fts ON c.id = fts.rowid
-                        WHERE web_search_cache_fts MATCH ?
-                        ORDER BY 
-                            CASE 
-                                WHEN c.status = 'ok' AND c.results_json != '[]' THEN 0
-                                WHEN c.status = 'empty' THEN 1
-                                ELSE 2
-                            END,
-                            c.fetched_at_utc DESC
-                    """, (normalized_query,))
+                    rows = self._fuzzy_cache_candidates(cursor, normalized_query)
+                    rows.sort(key=lambda r: r['fetched_at_utc'], reverse=True)
+                    rows.sort(key=lambda r: 0 if r['status'] == 'ok' and r['results_json'] != '[]'
+                              else 1 if r['status'] == 'empty' else 2)
                 else:
                     cursor.execute("""
                         SELECT * FROM web_search_cache 
@@ -2092,13 +2415,14 @@ class DatabaseConnection:
                             END,
                             fetched_at_utc DESC
                     """, (normalized_query,))
+                    rows = cursor.fetchall()
                 
                 results = []
-                for row in cursor.fetchall():
+                for row in rows:
                     result = dict(row)
-                    result['results'] = json.loads(result['results_json'])
+                    result['results'] = orjson.loads(result['results_json'])
                     
-                    if filter_empty and result.get('status') in ('empty', 'error', 'ratelimited'):
+                    if filter_empty and result.get('status') in ('empty', 'error', 'ratelimited', 'empty_global'):
                         continue
                     
                     results.append(result)
@@ -2110,7 +2434,8 @@ class DatabaseConnection:
 
     def save_search_result(self, provider: str, normalized_query: str, results_json: list, status: str, 
                           http_code: Optional[int] = None, error: Optional[str] = None, 
-                          backoff_until_utc: Optional[str] = None) -> bool:
+                          backoff_until_utc: Optional[str] = None, valid_until_utc: Optional[str] = None,
+                          entity_type: Optional[str] = None) -> bool:
         """
         Save search result to cache
         
@@ -2122,6 +2447,8 @@ class DatabaseConnection:
             http_code: HTTP response code if applicable
             error: Error message if applicable
             backoff_until_utc: ISO8601 timestamp when to retry after backoff
+            valid_until_utc: ISO8601 expiry of the cached row (None = no expiry)
+            entity_type: Type of the searched entity (used to learn provider order)
         """
         try:
             now = datetime.now(timezone.utc).isoformat()
@@ -2130,38 +2457,208 @@ class DatabaseConnection:
                 cursor.execute("""
                     INSERT OR REPLACE INTO web_search_cache 
                     (provider, normalized_query, results_json, status, http_code, error, 
-                     fetched_at_utc, attempts, backoff_until_utc)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                     fetched_at_utc, attempts, backoff_until_utc, valid_until_utc, entity_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
                 """, (
                     provider,
                     normalized_query,
-                    json.dumps(results_json),
+                    # orjson serializes straight to UTF-8; decoded so the column stays TEXT
+                    # (status queries compare results_json with the text '[]')
+                    orjson.dumps(results_json, default=self._json_default,
+                                 option=orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS).decode(),
                     status,
                     http_code,
                     error,
                     now,
-                    backoff_until_utc
+                    backoff_until_utc,
+                    valid_until_utc,
+                    entity_type
                 ))
             return True
         except Exception as e:
             print(f"Ошибка при сохранении результата поиска для '{normalized_query}': {e}")
             return False
 
+    def record_failure(self, provider: str, normalized_query: str, status: str,
+                       http_code: Optional[int] = None, error: Optional[str] = None,
+                       valid_until_utc: Optional[str] = None) -> bool:
+        """
+        Record failed search attempt (no results payload)
+        
+        Upsert of the status columns only: results_json is a constant '[]' and
+        the attempts counter maintained by update_search_attempts is kept.
+        
+        Args:
+            provider: Search provider name
+            normalized_query: Normalized query string
+            status: 'empty' | 'error' | 'ratelimited' | 'empty_global'
+            http_code: HTTP response code if applicable
+            error: Error message if applicable
+            valid_until_utc: ISO8601 expiry of the row (None = no expiry)
+        """
+        try:
+            now = datetime.now(timezone.utc).isoformat()
+            
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO web_search_cache 
+                    (provider, normalized_query, results_json, status, http_code, error, 
+                     fetched_at_utc, valid_until_utc)
+                    VALUES (?, ?, '[]', ?, ?, ?, ?, ?)
+                    ON CONFLICT(provider, normalized_query) DO UPDATE SET
+                        results_json = '[]',
+                        status = excluded.status,
+                        http_code = excluded.http_code,
+                        error = excluded.error,
+                        fetched_at_utc = excluded.fetched_at_utc,
+                        valid_until_utc = excluded.valid_until_utc
+                """, (provider, normalized_query, status, http_code, error, now, valid_until_utc))
+            return True
+        except Exception as e:
+            print(f"Ошибка при сохранении неудачного поиска для '{normalized_query}': {e}")
+            return False
+
+    def get_globally_empty(self) -> Dict[str, int]:
+        """
+        All unexpired negative cache entries, in one query
+        
+        Returns:
+            Dict {normalized_query: valid_until Unix seconds} (converted by SQLite, no parsing in Python)
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT normalized_query, CAST(strftime('%s', valid_until_utc) AS INTEGER) AS valid_until
+                    FROM web_search_cache 
+                    WHERE provider = 'none' AND status = 'empty_global' AND valid_until_utc > ?
+                """, (datetime.now(timezone.utc).isoformat(),))
+                return {row['normalized_query']: row['valid_until'] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Ошибка при загрузке негативного кэша: {e}")
+            return {}
+
+    def get_provider_success_counts(self) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        Number of cached 'ok' results per entity type and provider, in one query
+        
+        Returns:
+            Dict {entity_type: {provider: count}}; None key for rows saved without entity type
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT entity_type, provider, COUNT(*) AS n FROM web_search_cache 
+                    WHERE status = 'ok'
+                    GROUP BY entity_type, provider
+                """)
+                counts: Dict[Optional[str], Dict[str, int]] = {}
+                for row in cursor.fetchall():
+                    counts.setdefault(row['entity_type'], {})[row['provider']] = row['n']
+                return counts
+        except Exception as e:
+            print(f"Ошибка при подсчете успешных ответов провайдеров: {e}")
+            return {}
+
+    def get_search_etag(self, provider: str, query_hash: str) -> Optional[dict]:
+        """Get stored ETag and response body for provider request (None if absent)"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT etag, response_json FROM web_search_etag_cache 
+                    WHERE provider = ? AND query_hash = ?
+                """, (provider, query_hash))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            print(f"Ошибка при получении ETag для '{provider}': {e}")
+            return None
+
+    def save_search_etag(self, provider: str, query_hash: str, etag: str, response_json: bytes) -> bool:
+        """Store ETag and response body for provider request"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO web_search_etag_cache 
+                    (provider, query_hash, etag, response_json, updated_at_utc)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (provider, query_hash, etag, response_json, datetime.now(timezone.utc).isoformat()))
+            return True
+        except Exception as e:
+            print(f"Ошибка при сохранении ETag для '{provider}': {e}")
+            return False
+
+    def set_provider_backoff(self, provider: str, backoff_until: int) -> bool:
+        """Set backoff deadline (Unix seconds) for provider (single-row upsert into provider_state)"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO provider_state (provider, backoff_until) VALUES (?, ?)
+                    ON CONFLICT(provider) DO UPDATE SET backoff_until = excluded.backoff_until
+                """, (provider, backoff_until))
+                return True
+        except Exception as e:
+            print(f"Ошибка при установке backoff для '{provider}': {e}")
+            return False
+
     def is_provider_in_backoff(self, provider: str) -> bool:
         """Check if provider is currently in backoff period"""
         try:
             with self.get_cursor() as cursor:
                 cursor.execute("""
-                    SELECT backoff_until_utc FROM web_search_cache 
-                    WHERE provider = ? AND backoff_until_utc IS NOT NULL AND backoff_until_utc > ?
-                    LIMIT 1
-                """, (provider, datetime.now(timezone.utc).isoformat()))
-                row = cursor.fetchone()
-                return row is not None
+                    SELECT 1 FROM provider_state 
+                    WHERE provider = ? AND backoff_until > ?
+                """, (provider, int(time.time())))
+                return cursor.fetchone() is not None
         except Exception as e:
             print(f"Ошибка при проверке backoff для '{provider}': {e}")
             return False
 
+    def get_provider_backoffs(self) -> Dict[str, int]:
+        """
+        Backoff deadline per provider, in one query
+        
+        Returns:
+            Dict {provider: backoff_until Unix seconds}; only providers still in backoff
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT provider, backoff_until FROM provider_state 
+                    WHERE backoff_until > ?
+                """, (int(time.time()),))
+                return {row['provider']: row['backoff_until'] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Ошибка при получении backoff провайдеров: {e}")
+            return {}
+
+    def increment_provider_attempts(self, provider: str) -> int:
+        """Increment consecutive server error counter of provider and return new value"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO provider_state (provider, attempts) VALUES (?, 1)
+                    ON CONFLICT(provider) DO UPDATE SET attempts = attempts + 1
+                    RETURNING attempts
+                """, (provider,))
+                row = cursor.fetchone()
+                return row['attempts'] if row else 1
+        except Exception as e:
+            print(f"Ошибка при обновлении attempts для '{provider}': {e}")
+            return 1
+
+    def reset_provider_attempts(self, provider: str) -> bool:
+        """Reset consecutive server error counter of provider"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                    UPDATE provider_state SET attempts = 0 
+                    WHERE provider = ? AND attempts > 0
+                """, (provider,))
+                return True
+        except Exception as e:
+            print(f"Ошибка при сбросе attempts для '{provider}': {e}")
+            return False
+
     def update_search_attempts(self, provider: str, normalized_query: str) -> int:
         """Increment attempt counter for search and return new value"""
         try:
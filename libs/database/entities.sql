@@ -141,3 +141,23 @@ CREATE TRIGGER IF NOT EXISTS trg_aliases_au AFTER UPDATE ON aliases BEGIN
   INSERT INTO alias_fts(alias_fts, rowid, alias_text) VALUES ('delete', OLD.alias_id, OLD.alias_text);
   INSERT INTO alias_fts(rowid, alias_text) VALUES (NEW.alias_id, NEW.alias_text);
 END;
+
+-- Substring lookup over alias_text: trigram index, so partial names ('app' -> 'Apple Inc.')
+-- are index probes instead of LIKE '%x%' scans; alias_fts keeps word matching for grounding
+CREATE VIRTUAL TABLE IF NOT EXISTS alias_trigram_fts USING fts5(
+  alias_text,
+  content='aliases',
+  content_rowid='alias_id',
+  tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_aliases_trigram_ai AFTER INSERT ON aliases BEGIN
+  INSERT INTO alias_trigram_fts(rowid, alias_text) VALUES (NEW.alias_id, NEW.alias_text);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_aliases_trigram_ad AFTER DELETE ON aliases BEGIN
+  INSERT INTO alias_trigram_fts(alias_trigram_fts, rowid, alias_text) VALUES ('delete', OLD.alias_id, OLD.alias_text);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_aliases_trigram_au AFTER UPDATE ON aliases BEGIN
+  INSERT INTO alias_trigram_fts(alias_trigram_fts, rowid, alias_text) VALUES ('delete', OLD.alias_id, OLD.alias_text);
+  INSERT INTO alias_trigram_fts(rowid, alias_text) VALUES (NEW.alias_id, NEW.alias_text);
+END;
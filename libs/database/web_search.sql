@@ -10,17 +10,19 @@ CREATE TABLE IF NOT EXISTS web_search_cache (
   fetched_at_utc TEXT NOT NULL,           -- ISO8601
   attempts INTEGER NOT NULL DEFAULT 1,
   backoff_until_utc TEXT,                 -- when to try again (after 429, etc.)
+  valid_until_utc TEXT,                   -- ISO8601 expiry (NULL = no expiry)
+  entity_type TEXT,                       -- type of the searched entity ('company', 'person', 'symbol', ...)
   UNIQUE(provider, normalized_query)
 );
 
--- If necessary, quick search by requests
+-- Fuzzy lookup of cached queries: trigram index, so typos and partial
+-- names still share most of their trigrams with the cached query
 CREATE VIRTUAL TABLE IF NOT EXISTS web_search_cache_fts
 USING fts5(
   normalized_query,
   content='web_search_cache',
   content_rowid='id',
-  tokenize='unicode61 remove_diacritics 2',
-  prefix='2 3 4'  -- allows fast prefix searching normalized_query LIKE 'micr*'
+  tokenize='trigram'
 );
 
 -- Triggers for FTS synchronization
@@ -34,3 +36,20 @@ CREATE TRIGGER IF NOT EXISTS web_search_cache_au AFTER UPDATE ON web_search_cach
   INSERT INTO web_search_cache_fts(web_search_cache_fts, rowid, normalized_query) VALUES('delete', old.id, old.normalized_query);
   INSERT INTO web_search_cache_fts(rowid, normalized_query) VALUES (new.id, new.normalized_query);
 END;
+
+-- Last ETag + response body per provider request (conditional GET / If-None-Match)
+CREATE TABLE IF NOT EXISTS web_search_etag_cache (
+  provider TEXT NOT NULL,
+  query_hash TEXT NOT NULL,               -- blake2b hash of the full request URL
+  etag TEXT NOT NULL,
+  response_json BLOB NOT NULL,            -- raw response body
+  updated_at_utc TEXT NOT NULL,           -- ISO8601
+  PRIMARY KEY (provider, query_hash)
+);
+
+-- Per-provider state (one row per provider; backoff after 429/5xx)
+CREATE TABLE IF NOT EXISTS provider_state (
+  provider TEXT PRIMARY KEY,
+  backoff_until INTEGER,                  -- Unix seconds (UTC), when to try again
+  attempts INTEGER NOT NULL DEFAULT 0     -- consecutive server errors (exponential backoff)
+);